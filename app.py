@@ -1,123 +1,202 @@
 # app.py
 
+import os
+import secrets
+import time
+
 import streamlit as st
 
-from flow_tuinaanleg import TuinaanlegFlow
-from pricing import PRIJZEN, estimate_tuinaanleg_costs, format_tuinaanleg_costs_for_customer
 from bedrijf import BEDRIJFSNAAM, REGIO, CONTACT_EMAIL, CONTACT_TELEFOON
-
-from savings import (
-    post_offer_choices_text,
-    lower_costs_menu_text,
-    more_green_choice_text,
-    extras_select_menu_text,
-    material_part_menu_text,
-    material_choice_menu_text_cheaper,
-    vlonder_choice_menu_text,
-    erf_remove_select_menu_text,
-    apply_set_ratio,
-    apply_remove_selected_extras,
-    apply_material_change,
-    apply_vlonder_change,
-    apply_erf_changes,
-    parse_multi_digits,
-    parse_single_digit,
-    parse_material_parts,   # ✅ NEW
-    is_back,
-    has_vlonder,
-    has_erfafscheiding,
-    soft_limit_message,
-    limit_followup_text,
+from build_system_prompt import build_system_prompt
+from chat_memory import (
+    QUOTES,
+    SESSION_KB_BUDGET,
+    assistant_record,
+    compact,
+    session_memory_report,
+    text_record,
+    user_record,
 )
+from budget import ENGINE_BUDGET, configure_from_env as configure_budget_from_env
+from hotpath import HOTPATH, configure_from_env as configure_hotpath_from_env, top_paths
+from conversation import (
+    FLOW_STEPS,
+    initial_state,
+    handle_turn_budgeted,
+    menu_options,
+    record_abandoned,
+    warm_profile_quotes,
+)
+from pricing import PRICE_VERSION, PRIJZEN, answers_fingerprint, compute_tuinaanleg_costs, set_estimate_cache
+from profiles import profiles_hint_text
+from telemetry import configure_from_env
+from eventlog import configure_from_env as configure_eventlog_from_env
 
-# =====================
-# Config
-# =====================
-st.set_page_config(page_title=f"{BEDRIJFSNAAM} – Tuinaanleg demo", page_icon="🌿")
-st.title("🌿 Tuinaanleg prijsindicatie (demo)")
-st.caption(f"{BEDRIJFSNAAM} • {REGIO}")
+configure_from_env()
+configure_budget_from_env()
+configure_hotpath_from_env()
+configure_eventlog_from_env()
 
-MAX_RECALC = 5
+ESTIMATE_CACHE_MAX = 5000  # st.cache_data entries (berekeningen + bespaar-previews)
+BUDGET_PRUNE_INTERVAL_S = 300.0  # Streamlit kent geen sessie-einde: volle buckets periodiek opruimen
+DEBUG_SIDEBAR = os.getenv("DEBUG_SIDEBAR", "").strip() in {"1", "true", "True", "yes", "YES"}
 
 
 # =====================
-# Render helper (fix: netjes onder elkaar)
+# Gedeeld tussen alle sessies in dit proces
 # =====================
-def render_text(text: str) -> None:
+@st.cache_resource
+def engine_resources() -> dict:
     """
-    Streamlit markdown kan soms newlines 'samenvoegen' afhankelijk van context.
-    Met '  \\n' forceren we harde line breaks.
+    Eén keer per serverproces: prijstabel + versie, de gecompileerde intake-stappen
+    (dezelfde tuple die conversation.new_flow() aan elke flow meegeeft) en de systeemprompt.
     """
-    safe = (text or "").replace("\n", "  \n")
-    st.markdown(safe)
+    return {
+        "prijzen": PRIJZEN,
+        "price_version": PRICE_VERSION,
+        "flow_steps": FLOW_STEPS,
+        "system_prompt": build_system_prompt(),
+        "estimate_stats": {"calls": 0, "misses": 0},
+        "budget_prune_at": [time.time() + BUDGET_PRUNE_INTERVAL_S],
+    }
+
+
+@st.cache_data(max_entries=ESTIMATE_CACHE_MAX, show_spinner=False)
+def _cached_costs(price_version: str, fingerprint: str, _answers: dict) -> dict:
+    # alleen price_version + fingerprint vormen de sleutel (_answers wordt niet gehasht)
+    engine_resources()["estimate_stats"]["misses"] += 1
+    return compute_tuinaanleg_costs(_answers)
+
+
+def _estimate_with_cache(answers: dict) -> dict:
+    engine_resources()["estimate_stats"]["calls"] += 1
+    return _cached_costs(PRICE_VERSION, answers_fingerprint(answers), answers)
 
 
-def remaining_recalcs() -> int:
-    return max(0, MAX_RECALC - st.session_state.recalc_count)
+set_estimate_cache(_estimate_with_cache)
 
 
-def ensure_prefix(explanation: str) -> str:
+@st.cache_resource
+def _warm_profiles() -> bool:
     """
-    Zorgt dat de eerste zin overal consistent start met:
-    '✅ Doorgevoerde kostenbesparing: ...'
-    (ook als een apply_* functie nog oude tekst teruggeeft).
+    Standaardtuinen één keer per proces vooraf berekenen (na set_estimate_cache, dus via de gedeelde cache):
+    niet op de eerste klant laten drukken, en een kapot profiel valt bij het opstarten op.
     """
-    t = (explanation or "").strip()
-    if not t:
-        return "✅ Doorgevoerde kostenbesparing."
-    low = t.lower()
+    warm_profile_quotes()
+    return True
 
-    if "doorgevoerde kostenbesparing" in low:
-        return t
 
-    if low.startswith("ik heb aangepast:"):
-        rest = t.split(":", 1)[1].strip() if ":" in t else t
-        return f"✅ Doorgevoerde kostenbesparing: {rest}"
+_warm_profiles()
 
-    if low.startswith("ik heb de ") or low.startswith("ik heb het "):
-        return f"✅ Doorgevoerde kostenbesparing: {t[0].lower() + t[1:]}" if len(t) > 1 else "✅ Doorgevoerde kostenbesparing."
 
-    return f"✅ Doorgevoerde kostenbesparing: {t}"
+def _prune_budget_periodically() -> None:
+    """
+    De server ruimt buckets op in zijn expire-loop; Streamlit heeft die niet. Eens per
+    BUDGET_PRUNE_INTERVAL_S doet de eerste run die langskomt het (gedeeld tijdstip via cache_resource).
+    """
+    due = engine_resources()["budget_prune_at"]
+    now = time.time()
+    if now >= due[0]:
+        due[0] = now + BUDGET_PRUNE_INTERVAL_S
+        ENGINE_BUDGET.prune()
+
+
+_prune_budget_periodically()
+
+# =====================
+# Config
+# =====================
+st.set_page_config(page_title=f"{BEDRIJFSNAAM} – Tuinaanleg demo", page_icon="🌿")
+st.title("🌿 Tuinaanleg prijsindicatie (demo)")
+st.caption(f"{BEDRIJFSNAAM} • {REGIO}")
+
+
+HISTORY_WINDOW = 12  # zoveel laatste berichten altijd volledig; oudere per blok bij te laden
+MAX_INPUT_CHARS = 2000  # harde grens in het invoerveld (opgeslagen wordt ingekort, zie chat_memory)
+
+
+def _eur(v) -> str:
+    return f"€{int(v):,}".replace(",", ".")
+
+
+def _greeting(hello: str):
+    return text_record(
+        "assistant",
+        f"{hello} Ik stel u een paar korte vragen over uw tuin, zodat ik u een gerichte indicatie kan geven.\n\n"
+        "Hoe groot is uw tuin in m²? (geef een getal)\n\n"
+        + profiles_hint_text()
+    )
 
 
 # =====================
 # Session init
 # =====================
-if "flow" not in st.session_state:
-    st.session_state.flow = TuinaanlegFlow(prijzen=PRIJZEN)
+if "conv" not in st.session_state:
+    st.session_state.conv = initial_state(start_intake=True)
+
+if "budget_key" not in st.session_state:
+    # blijft gelijk bij een reset: opnieuw beginnen vult het rekenbudget niet aan
+    st.session_state.budget_key = secrets.token_urlsafe(12)
 
 if "messages" not in st.session_state:
-    st.session_state.messages = [{
-        "role": "assistant",
-        "content": (
-            "Hallo! Ik stel u een paar korte vragen over uw tuin, zodat ik u een gerichte indicatie kan geven.\n\n"
-            "Hoe groot is uw tuin in m²? (geef een getal)"
-        )
-    }]
+    st.session_state.messages = [_greeting("Hallo!")]
+
+if "history_shown" not in st.session_state:
+    st.session_state.history_shown = HISTORY_WINDOW
+
+if "compacted" not in st.session_state:
+    st.session_state.compacted = 0
+
+if "appended" not in st.session_state:
+    # teller van alle records ooit toegevoegd; render_mark = stand bij de laatste volledige run
+    st.session_state.appended = len(st.session_state.messages)
+    st.session_state.render_mark = st.session_state.appended
+
+
+# =====================
+# Callbacks (draaien vóór het script, dus geen extra st.rerun nodig)
+# =====================
+def _reset_conversation() -> None:
+    record_abandoned(st.session_state.conv)
+    st.session_state.conv = initial_state(start_intake=True)
+    st.session_state.messages = [_greeting("Hoi!")]
+    st.session_state.history_shown = HISTORY_WINDOW
+    st.session_state.compacted = 0
+    st.session_state.appended = st.session_state.render_mark = 1
+
 
-if "done" not in st.session_state:
-    st.session_state.done = False
+def _show_more_history() -> None:
+    st.session_state.history_shown += HISTORY_WINDOW
 
-if "post_offer_mode" not in st.session_state:
-    st.session_state.post_offer_mode = False
 
-if "post_offer_stage" not in st.session_state:
-    st.session_state.post_offer_stage = None
-    # "menu" | "lower_costs_menu" | "lc_more_green_choice" | "lc_extras_select"
-    # "lc_material_part" | "lc_material_choice" | "lc_vlonder_choice" | "lc_erf_remove_select"
-    # "limit_followup" | "contact_details" | "end"
+def _submit(text: str, shown: str | None = None) -> None:
+    """Eén beurt: klantinvoer + antwoorden als records bewaren, daarna compacteren."""
+    messages = st.session_state.messages
+    messages.append(user_record(shown or text))
 
-if "last_answers" not in st.session_state:
-    st.session_state.last_answers = None
+    # Alle gesprekslogica zit in conversation.py; hier alleen state bijwerken + records bewaren.
+    st.session_state.conv, replies = handle_turn_budgeted(
+        st.session_state.conv, text, ENGINE_BUDGET, st.session_state.budget_key,
+        getattr(st.context, "ip_address", None),  # st.context.ip_address pas vanaf Streamlit 1.45
+    )
+    for reply in replies:
+        messages.append(assistant_record(reply))
+    st.session_state.appended += 1 + len(replies)
+    st.session_state.compacted += compact(messages)
 
-if "last_costs" not in st.session_state:
-    st.session_state.last_costs = None
 
-if "recalc_count" not in st.session_state:
-    st.session_state.recalc_count = 0
+def _submit_multi(key: str, labels: dict) -> None:
+    picked = st.session_state.get(key) or []
+    if picked:
+        _submit(",".join(picked), "; ".join(labels[v] for v in picked))
 
-if "_pending_material_part" not in st.session_state:
-    st.session_state._pending_material_part = None  # ✅ kan nu tuple ("2","3")
+
+# =====================
+# Chat input: eerst verwerken, daarna alles in dezelfde run tekenen
+# =====================
+user_text = st.chat_input("Typ je antwoord…", max_chars=MAX_INPUT_CHARS)
+if user_text:
+    _submit(user_text)
 
 
 # =====================
@@ -125,23 +204,41 @@ if "_pending_material_part" not in st.session_state:
 # =====================
 with st.sidebar:
     st.subheader("Demo controls")
-    if st.button("🔄 Reset gesprek", use_container_width=True):
-        st.session_state.flow = TuinaanlegFlow(prijzen=PRIJZEN)
-        st.session_state.messages = [{
-            "role": "assistant",
-            "content": (
-                "Hoi! Ik stel u een paar korte vragen over uw tuin, zodat ik u een gerichte indicatie kan geven.\n\n"
-                "Hoe groot is uw tuin in m²? (geef een getal)"
-            )
-        }]
-        st.session_state.done = False
-        st.session_state.post_offer_mode = False
-        st.session_state.post_offer_stage = None
-        st.session_state.last_answers = None
-        st.session_state.last_costs = None
-        st.session_state.recalc_count = 0
-        st.session_state._pending_material_part = None
-        st.rerun()
+    st.button("🔄 Reset gesprek", use_container_width=True, on_click=_reset_conversation)
+
+    running = st.session_state.conv.running_total_range()
+    if running is not None:
+        st.divider()
+        st.metric("Voorlopige indicatie", f"{_eur(running[0])} – {_eur(running[1])}")
+        st.caption("Wordt bijgewerkt na elk antwoord; onbekende onderdelen rekenen met standaardwaarden.")
+
+    if DEBUG_SIDEBAR or st.query_params.get("debug") == "1":
+        res = engine_resources()
+        stats = res["estimate_stats"]
+        hits = stats["calls"] - stats["misses"]
+        st.divider()
+        st.caption("Debug – gedeelde cache (alle sessies)")
+        st.write(f"- Prijsversie: `{res['price_version']}`")
+        st.write(f"- Intake-stappen: {len(res['flow_steps'])}, systeemprompt: {len(res['system_prompt'])} tekens")
+        st.write(f"- Berekeningen: {stats['calls']} aanroepen, {hits} hits, {stats['misses']} misses")
+        if stats["calls"]:
+            st.write(f"- Hit rate: {hits / stats['calls']:.0%}")
+
+        mem = session_memory_report(
+            st.session_state.conv,
+            st.session_state.messages,
+            shared_objects=(res["flow_steps"], res["prijzen"]),
+        )
+        st.caption("Debug – geheugen deze sessie")
+        st.write(f"- Eigen: {mem['own_kb']} KB (state {mem['conv_kb']} KB, {mem['records']} records {mem['records_kb']} KB)")
+        st.write(f"- Varianten: {mem['variants']} ({mem['variants_kb']} KB, in de state)")
+        st.write(f"- Gedeeld: {mem['shared_kb']} KB, offertes in proces: {len(QUOTES)}")
+        st.write(f"- Budget: {SESSION_KB_BUDGET} KB " + ("✅" if mem["within_budget"] else "⚠️ overschreden"))
+
+        if HOTPATH.enabled:
+            st.caption("Debug – hot paths (dit proces, totale tijd)")
+            for name, calls, total_ms in top_paths(8):
+                st.write(f"- `{name}`: {calls}× {total_ms:.1f} ms")
 
     st.divider()
     st.write("**Contact:**")
@@ -151,431 +248,58 @@ with st.sidebar:
 
 
 # =====================
-# Render chat history
+# Render chat history (venster: laatste berichten volledig, oudere op verzoek)
 # =====================
-for msg in st.session_state.messages:
-    with st.chat_message(msg["role"]):
-        render_text(msg["content"])
+messages = st.session_state.messages
+hidden = max(0, len(messages) - st.session_state.history_shown)
+if st.session_state.compacted:
+    st.caption(f"{st.session_state.compacted} oudere berichten zijn opgeruimd.")
+if hidden:
+    st.button(f"⬆️ Toon eerdere berichten ({hidden} verborgen)", on_click=_show_more_history)
+
+for rec in messages[hidden:]:
+    with st.chat_message(rec.role):
+        st.markdown(rec.markdown())
+st.session_state.render_mark = st.session_state.appended
 
 
 # =====================
-# Chat input
+# Klikbare menu's (fragment: een klik draait alleen dit blok opnieuw, niet de hele geschiedenis)
 # =====================
-user_text = st.chat_input("Typ je antwoord…")
-if not user_text:
-    st.stop()
-
-st.session_state.messages.append({"role": "user", "content": user_text})
-t_raw = user_text.strip()
-t_low = t_raw.lower()
-
-
-def push_assistant(text: str):
-    st.session_state.messages.append({"role": "assistant", "content": text})
-
-
-# -----------------------------------------
-# Post-offer menu logic
-# -----------------------------------------
-if st.session_state.post_offer_mode:
-    # global contact shortcut
-    if t_low in {"contact", "offerte", "advies"}:
-        st.session_state.post_offer_stage = "contact_details"
-        push_assistant("Top. Wilt u uw naam + postcode + telefoon/e-mail + een korte omschrijving sturen?")
-        st.rerun()
-
-    # limit follow-up
-    if st.session_state.post_offer_stage == "limit_followup":
-        if t_raw == "1":
-            st.session_state.post_offer_stage = "contact_details"
-            push_assistant("Top. Wilt u uw naam + postcode + telefoon/e-mail + een korte omschrijving sturen?")
-            st.rerun()
-        elif t_raw == "2":
-            push_assistant("Helemaal goed. Fijn dat u even heeft gekeken. 👋")
-            st.session_state.post_offer_mode = False
-            st.session_state.post_offer_stage = "end"
-            st.rerun()
-        else:
-            push_assistant(limit_followup_text())
-            st.rerun()
-
-    # main menu
-    if st.session_state.post_offer_stage == "menu":
-        if t_raw == "1":
-            if remaining_recalcs() <= 0:
-                push_assistant(soft_limit_message())
-                st.session_state.post_offer_stage = "limit_followup"
-                push_assistant(limit_followup_text())
-                st.rerun()
-
-            st.session_state.post_offer_stage = "lower_costs_menu"
-            push_assistant(lower_costs_menu_text(st.session_state.last_answers))
-            st.rerun()
-
-        elif t_raw == "2":
-            st.session_state.post_offer_stage = "contact_details"
-            push_assistant("Top. Wilt u uw naam + postcode + telefoon/e-mail + een korte omschrijving sturen?")
-            st.rerun()
-
-        elif t_raw == "3":
-            push_assistant("Helemaal goed. Fijn dat u even heeft gekeken. 👋")
-            st.session_state.post_offer_mode = False
-            st.session_state.post_offer_stage = "end"
-            st.rerun()
-
-        else:
-            push_assistant(post_offer_choices_text())
-            st.rerun()
-
-    # category menu
-    if st.session_state.post_offer_stage == "lower_costs_menu":
-        if is_back(t_raw):
-            st.session_state.post_offer_stage = "menu"
-            push_assistant(post_offer_choices_text())
-            st.rerun()
-
-        # dynamic numbering 1..3 + optional vlonder/erf
-        allowed = {"1", "2", "3"}
-        dyn_v = None
-        dyn_e = None
-        idx = 4
-        if has_vlonder(st.session_state.last_answers):
-            dyn_v = str(idx)
-            allowed.add(dyn_v)
-            idx += 1
-        if has_erfafscheiding(st.session_state.last_answers):
-            dyn_e = str(idx)
-            allowed.add(dyn_e)
-
-        if t_raw not in allowed:
-            push_assistant(lower_costs_menu_text(st.session_state.last_answers))
-            st.rerun()
-
-        if t_raw == "1":
-            menu, mapping = more_green_choice_text(st.session_state.last_answers, st.session_state.last_costs)
-            if not mapping:
-                push_assistant(menu)
-                push_assistant(lower_costs_menu_text(st.session_state.last_answers))
-                st.rerun()
-            st.session_state.post_offer_stage = "lc_more_green_choice"
-            push_assistant(menu)
-            st.rerun()
-
-        if t_raw == "2":
-            menu, mapping = extras_select_menu_text(st.session_state.last_answers, st.session_state.last_costs)
-            if not mapping:
-                push_assistant(menu)
-                push_assistant(lower_costs_menu_text(st.session_state.last_answers))
-                st.rerun()
-            st.session_state.post_offer_stage = "lc_extras_select"
-            push_assistant(menu)
-            st.rerun()
-
-        if t_raw == "3":
-            st.session_state.post_offer_stage = "lc_material_part"
-            push_assistant(material_part_menu_text(st.session_state.last_answers))
-            st.rerun()
-
-        if dyn_v and t_raw == dyn_v:
-            menu, mapping = vlonder_choice_menu_text(st.session_state.last_answers, st.session_state.last_costs)
-            if not mapping:
-                push_assistant(menu)
-                push_assistant(lower_costs_menu_text(st.session_state.last_answers))
-                st.rerun()
-            st.session_state.post_offer_stage = "lc_vlonder_choice"
-            push_assistant(menu)
-            st.rerun()
-
-        if dyn_e and t_raw == dyn_e:
-            menu, mapping = erf_remove_select_menu_text(st.session_state.last_answers, st.session_state.last_costs)
-            if not mapping:
-                push_assistant(menu)
-                push_assistant(lower_costs_menu_text(st.session_state.last_answers))
-                st.rerun()
-            st.session_state.post_offer_stage = "lc_erf_remove_select"
-            push_assistant(menu)
-            st.rerun()
-
-    # (1) ratio
-    if st.session_state.post_offer_stage == "lc_more_green_choice":
-        menu, mapping = more_green_choice_text(st.session_state.last_answers, st.session_state.last_costs)
-        if not mapping:
-            push_assistant(menu)
-            st.session_state.post_offer_stage = "lower_costs_menu"
-            push_assistant(lower_costs_menu_text(st.session_state.last_answers))
-            st.rerun()
-
-        picked = parse_single_digit(t_raw, allowed=tuple(mapping.keys()))
-        if picked is None:
-            push_assistant(menu)
-            st.rerun()
-        if picked == "nee":
-            st.session_state.post_offer_stage = "lower_costs_menu"
-            push_assistant(lower_costs_menu_text(st.session_state.last_answers))
-            st.rerun()
-
-        if remaining_recalcs() <= 0:
-            push_assistant(soft_limit_message())
-            st.session_state.post_offer_stage = "limit_followup"
-            push_assistant(limit_followup_text())
-            st.rerun()
-
-        before_a = dict(st.session_state.last_answers or {})
-        new_a, expl = apply_set_ratio(before_a, mapping[picked])
-
-        st.session_state.recalc_count += 1
-        new_c = estimate_tuinaanleg_costs(new_a)
-
-        push_assistant(ensure_prefix(expl))
-        push_assistant(format_tuinaanleg_costs_for_customer(new_c))
-
-        st.session_state.last_answers = dict(new_a)
-        st.session_state.last_costs = dict(new_c)
-
-        st.session_state.post_offer_stage = "menu"
-        push_assistant(post_offer_choices_text())
-        st.rerun()
-
-    # (2) extras multi-select
-    if st.session_state.post_offer_stage == "lc_extras_select":
-        menu, mapping = extras_select_menu_text(st.session_state.last_answers, st.session_state.last_costs)
-        if not mapping:
-            push_assistant(menu)
-            st.session_state.post_offer_stage = "lower_costs_menu"
-            push_assistant(lower_costs_menu_text(st.session_state.last_answers))
-            st.rerun()
-
-        if is_back(t_raw):
-            st.session_state.post_offer_stage = "lower_costs_menu"
-            push_assistant(lower_costs_menu_text(st.session_state.last_answers))
-            st.rerun()
-
-        parsed = parse_multi_digits(t_raw, allowed=tuple(mapping.keys()))
-        if parsed is None:
-            push_assistant(menu)
-            st.rerun()
-        if parsed == ("nee",):
-            st.session_state.post_offer_stage = "lower_costs_menu"
-            push_assistant(lower_costs_menu_text(st.session_state.last_answers))
-            st.rerun()
-
-        actions = [mapping[d] for d in parsed if d in mapping]
-        if not actions:
-            push_assistant(menu)
-            st.rerun()
-
-        if remaining_recalcs() <= 0:
-            push_assistant(soft_limit_message())
-            st.session_state.post_offer_stage = "limit_followup"
-            push_assistant(limit_followup_text())
-            st.rerun()
-
-        before_a = dict(st.session_state.last_answers or {})
-        new_a, expl = apply_remove_selected_extras(before_a, actions)
-
-        st.session_state.recalc_count += 1
-        new_c = estimate_tuinaanleg_costs(new_a)
-
-        push_assistant(ensure_prefix(expl))
-        push_assistant(format_tuinaanleg_costs_for_customer(new_c))
-
-        st.session_state.last_answers = dict(new_a)
-        st.session_state.last_costs = dict(new_c)
-
-        st.session_state.post_offer_stage = "menu"
-        push_assistant(post_offer_choices_text())
-        st.rerun()
-
-    # (3) material part (✅ multi-select 1/2/3, geen 4 meer)
-    if st.session_state.post_offer_stage == "lc_material_part":
-        if is_back(t_raw):
-            st.session_state.post_offer_stage = "lower_costs_menu"
-            push_assistant(lower_costs_menu_text(st.session_state.last_answers))
-            st.rerun()
-
-        picked_parts = parse_material_parts(t_raw)  # ✅ NEW
-        if picked_parts is None:
-            push_assistant(material_part_menu_text(st.session_state.last_answers))
-            st.rerun()
-        if picked_parts == ("nee",):
-            st.session_state.post_offer_stage = "lower_costs_menu"
-            push_assistant(lower_costs_menu_text(st.session_state.last_answers))
-            st.rerun()
-
-        st.session_state._pending_material_part = picked_parts
-        menu, allowed_choices = material_choice_menu_text_cheaper(
-            st.session_state.last_answers, st.session_state.last_costs, picked_parts
+@st.fragment
+def menu_fragment() -> None:
+    # berichten die sinds de laatste volledige run via knoppen zijn bijgekomen
+    messages = st.session_state.messages
+    fresh = st.session_state.appended - st.session_state.render_mark
+    if fresh:
+        for rec in messages[max(0, len(messages) - fresh):]:
+            with st.chat_message(rec.role):
+                st.markdown(rec.markdown())
+
+    menu = menu_options(st.session_state.conv)
+    if menu is None:
+        return
+
+    # zelfde nummers als bij typen; keys per beurt zodat een nieuw menu schone widgets krijgt
+    turn = st.session_state.appended
+    labels = dict(menu.options)
+    if menu.multi:
+        key = f"menu_multi_{turn}"
+        st.multiselect(
+            "Kies een of meer opties",
+            list(labels),
+            format_func=labels.get,
+            key=key,
+            placeholder="Maak een keuze",
         )
-        if not allowed_choices:
-            push_assistant(menu)
-            push_assistant(material_part_menu_text(st.session_state.last_answers))
-            st.rerun()
-
-        st.session_state.post_offer_stage = "lc_material_choice"
-        push_assistant(menu)
-        st.rerun()
-
-    # (3) material choice
-    if st.session_state.post_offer_stage == "lc_material_choice":
-        part = st.session_state._pending_material_part or ("1", "2", "3")
-        menu, allowed_choices = material_choice_menu_text_cheaper(
-            st.session_state.last_answers, st.session_state.last_costs, part
-        )
-        if not allowed_choices:
-            push_assistant(menu)
-            st.session_state.post_offer_stage = "lc_material_part"
-            push_assistant(material_part_menu_text(st.session_state.last_answers))
-            st.rerun()
-
-        picked = parse_single_digit(t_raw, allowed=tuple(sorted(allowed_choices)))
-        if picked is None:
-            push_assistant(menu)
-            st.rerun()
-        if picked == "nee":
-            st.session_state.post_offer_stage = "lc_material_part"
-            push_assistant(material_part_menu_text(st.session_state.last_answers))
-            st.rerun()
-
-        if remaining_recalcs() <= 0:
-            push_assistant(soft_limit_message())
-            st.session_state.post_offer_stage = "limit_followup"
-            push_assistant(limit_followup_text())
-            st.rerun()
-
-        before_a = dict(st.session_state.last_answers or {})
-        new_a, expl = apply_material_change(before_a, part, picked)
-
-        st.session_state.recalc_count += 1
-        new_c = estimate_tuinaanleg_costs(new_a)
-
-        push_assistant(ensure_prefix(expl))
-        push_assistant(format_tuinaanleg_costs_for_customer(new_c))
-
-        st.session_state.last_answers = dict(new_a)
-        st.session_state.last_costs = dict(new_c)
-        st.session_state._pending_material_part = None
-
-        st.session_state.post_offer_stage = "menu"
-        push_assistant(post_offer_choices_text())
-        st.rerun()
-
-    # (4) vlonder
-    if st.session_state.post_offer_stage == "lc_vlonder_choice":
-        menu, mapping = vlonder_choice_menu_text(st.session_state.last_answers, st.session_state.last_costs)
-        if not mapping:
-            push_assistant(menu)
-            st.session_state.post_offer_stage = "lower_costs_menu"
-            push_assistant(lower_costs_menu_text(st.session_state.last_answers))
-            st.rerun()
-
-        picked = parse_single_digit(t_raw, allowed=tuple(mapping.keys()))
-        if picked is None:
-            push_assistant(menu)
-            st.rerun()
-        if picked == "nee":
-            st.session_state.post_offer_stage = "lower_costs_menu"
-            push_assistant(lower_costs_menu_text(st.session_state.last_answers))
-            st.rerun()
-
-        if remaining_recalcs() <= 0:
-            push_assistant(soft_limit_message())
-            st.session_state.post_offer_stage = "limit_followup"
-            push_assistant(limit_followup_text())
-            st.rerun()
-
-        before_a = dict(st.session_state.last_answers or {})
-        new_a, expl = apply_vlonder_change(before_a, mapping[picked])
-
-        st.session_state.recalc_count += 1
-        new_c = estimate_tuinaanleg_costs(new_a)
-
-        push_assistant(ensure_prefix(expl))
-        push_assistant(format_tuinaanleg_costs_for_customer(new_c))
-
-        st.session_state.last_answers = dict(new_a)
-        st.session_state.last_costs = dict(new_c)
-
-        st.session_state.post_offer_stage = "menu"
-        push_assistant(post_offer_choices_text())
-        st.rerun()
-
-    # (5) erf multi-select
-    if st.session_state.post_offer_stage == "lc_erf_remove_select":
-        menu, mapping = erf_remove_select_menu_text(st.session_state.last_answers, st.session_state.last_costs)
-        if not mapping:
-            push_assistant(menu)
-            st.session_state.post_offer_stage = "lower_costs_menu"
-            push_assistant(lower_costs_menu_text(st.session_state.last_answers))
-            st.rerun()
-
-        if is_back(t_raw):
-            st.session_state.post_offer_stage = "lower_costs_menu"
-            push_assistant(lower_costs_menu_text(st.session_state.last_answers))
-            st.rerun()
-
-        parsed = parse_multi_digits(t_raw, allowed=tuple(mapping.keys()))
-        if parsed is None:
-            push_assistant(menu)
-            st.rerun()
-        if parsed == ("nee",):
-            st.session_state.post_offer_stage = "lower_costs_menu"
-            push_assistant(lower_costs_menu_text(st.session_state.last_answers))
-            st.rerun()
-
-        actions = [mapping[d] for d in parsed if d in mapping]
-        if not actions:
-            push_assistant(menu)
-            st.rerun()
-
-        if remaining_recalcs() <= 0:
-            push_assistant(soft_limit_message())
-            st.session_state.post_offer_stage = "limit_followup"
-            push_assistant(limit_followup_text())
-            st.rerun()
-
-        before_a = dict(st.session_state.last_answers or {})
-        new_a, expl = apply_erf_changes(before_a, actions)
-
-        st.session_state.recalc_count += 1
-        new_c = estimate_tuinaanleg_costs(new_a)
-
-        push_assistant(ensure_prefix(expl))
-        push_assistant(format_tuinaanleg_costs_for_customer(new_c))
-
-        st.session_state.last_answers = dict(new_a)
-        st.session_state.last_costs = dict(new_c)
-
-        st.session_state.post_offer_stage = "menu"
-        push_assistant(post_offer_choices_text())
-        st.rerun()
-
-    # contact details
-    if st.session_state.post_offer_stage == "contact_details":
-        push_assistant("Dank u wel! We nemen zo snel mogelijk contact met u op!")
-        st.session_state.post_offer_mode = False
-        st.session_state.post_offer_stage = "end"
-        st.rerun()
-
-
-# -----------------------------------------
-# Flow logic (intake)
-# -----------------------------------------
-if not st.session_state.done and not st.session_state.post_offer_mode:
-    reply, done = st.session_state.flow.handle(user_text)
-    push_assistant(reply)
-    st.session_state.done = done
-
-    if done:
-        ans = st.session_state.flow.answers
-        costs = estimate_tuinaanleg_costs(ans)
-
-        push_assistant(format_tuinaanleg_costs_for_customer(costs))
-
-        st.session_state.last_answers = dict(ans)
-        st.session_state.last_costs = dict(costs)
-
-        st.session_state.post_offer_mode = True
-        st.session_state.post_offer_stage = "menu"
-        push_assistant(post_offer_choices_text())
-
-    st.rerun()
+        st.button(menu.submit_label, key=f"menu_{turn}_ok", on_click=_submit_multi, args=(key, labels), type="primary")
+    else:
+        for value, label in menu.options:
+            st.button(label, key=f"menu_{turn}_{value}", on_click=_submit, args=(value, label), use_container_width=True)
+    for value, label in menu.commands:
+        st.button(label, key=f"menu_{turn}_cmd_{value}", on_click=_submit, args=(value, label))
+    if menu.back:
+        st.button("↩️ Terug", key=f"menu_{turn}_back", on_click=_submit, args=("nee", "Terug"))
+
+
+menu_fragment()
@@ -0,0 +1,55 @@
+# batching.py
+from __future__ import annotations
+
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import islice
+from typing import Any, Callable, Deque, Iterable, Iterator, List, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+
+def _run_chunk(fn: Callable[[Any], Any], chunk: List[Any]) -> List[Any]:
+    return [fn(x) for x in chunk]
+
+
+def _chunks(items: Iterable[T], size: int) -> Iterator[List[T]]:
+    it = iter(items)
+    while True:
+        chunk = list(islice(it, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def bounded_parallel_map(
+    fn: Callable[[T], R],
+    items: Iterable[T],
+    *,
+    workers: int = 1,
+    chunksize: int = 64,
+    max_inflight: int | None = None,
+) -> Iterator[R]:
+    """
+    Zoals executor.map, maar:
+    - leest de input lui (in chunks), zodat het geheugen begrensd blijft hoe groot de input ook is
+    - houdt maximaal max_inflight chunks tegelijk onderweg
+    - levert resultaten in dezelfde volgorde als de input
+    fn moet op module-niveau staan (pickle). workers <= 1 draait alles in dit proces.
+    """
+    if workers <= 1:
+        for x in items:
+            yield fn(x)
+        return
+
+    max_inflight = max_inflight or workers * 4
+    pending: Deque[Future] = deque()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for chunk in _chunks(items, chunksize):
+            pending.append(pool.submit(_run_chunk, fn, chunk))
+            if len(pending) >= max_inflight:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
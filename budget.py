@@ -0,0 +1,305 @@
+# budget.py
+from __future__ import annotations
+
+import atexit
+import os
+import threading
+import time
+from dataclasses import dataclass
+from typing import Dict, Iterable, List, Optional, Tuple
+
+
+# ============================================================
+# ✅ Rekenbudget per sessie én per clientadres (token bucket)
+#    Vervangt de vaste limiet van 5 herberekeningen. Een bucket is gevuld met
+#    milliseconden engine-tijd; elke beurt kost wat hij echt aan CPU gebruikte
+#    (thread_time), en de bucket loopt langzaam weer vol.
+#    - sessie:  een eerlijke klant merkt niets (een heel gesprek kost ~5–10 ms)
+#    - client:  alle sessies vanaf één adres samen; remt scripts die steeds
+#               een nieuwe sessie openen
+#    Gedeelde stand in SQLite (ENGINE_BUDGET_DB), zodat alle serverprocessen
+#    dezelfde limiet handhaven. Zonder DB: per proces in het geheugen.
+# ============================================================
+@dataclass(frozen=True)
+class BucketPolicy:
+    capacity_ms: float        # maximale voorraad (= wat je in één keer mag opmaken)
+    refill_ms_per_s: float    # bijvullen per seconde wandklok
+
+
+# Gemeten (replay, 1-core container): p99 ~9 ms engine-tijd per volledig gesprek incl. 5 herberekeningen,
+# één herberekening ~0,5 ms. Sessie: ruim 5 gesprekken vooraf, daarna 30 ms per minuut.
+# Client: ~60 gesprekken tegelijk achter één adres (kantoor/NAT), duurzaam 1% van een core.
+SESSION_POLICY = BucketPolicy(capacity_ms=60.0, refill_ms_per_s=0.5)
+CLIENT_POLICY = BucketPolicy(capacity_ms=600.0, refill_ms_per_s=10.0)
+
+# Kleine beurten (intake ~0,1 ms) lokaal optellen en pas vanaf deze som wegschrijven:
+# scheelt een schrijfactie naar de gedeelde store per beurt. Hooguit dit bedrag per sessie gaat verloren.
+MIN_CHARGE_MS = 1.0
+
+# Een bucket die zo lang niet gebruikt is, is weer vol: de regel kan weg
+PRUNE_IDLE_S = 3600.0
+# Zo vaak (hooguit) kijkt charge() of er openstaande kleine beurten van verdwenen sessies zijn
+PENDING_SWEEP_S = 60.0
+
+
+def _refilled(tokens: float, ts: float, now: float, policy: BucketPolicy) -> float:
+    return min(policy.capacity_ms, tokens + max(0.0, now - ts) * policy.refill_ms_per_s)
+
+
+# =====================
+# Stores
+# =====================
+class MemoryBudgetStore:
+    """Buckets in het geheugen van dit proces (console, één Streamlit-proces, tests)."""
+
+    blocking = False  # lock wordt alleen microseconden vastgehouden
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+
+    def peek(self, keys: Iterable[Tuple[str, BucketPolicy]], now: float) -> List[float]:
+        with self._lock:
+            out = []
+            for key, policy in keys:
+                tokens, ts = self._buckets.get(key, (policy.capacity_ms, now))
+                out.append(_refilled(tokens, ts, now, policy))
+            return out
+
+    def charge(self, keys: Iterable[Tuple[str, BucketPolicy]], cost_ms: float, now: float) -> List[float]:
+        with self._lock:
+            out = []
+            for key, policy in keys:
+                tokens, ts = self._buckets.get(key, (policy.capacity_ms, now))
+                # mag negatief worden: een dure beurt wordt achteraf terugbetaald
+                tokens = _refilled(tokens, ts, now, policy) - cost_ms
+                self._buckets[key] = (tokens, now)
+                out.append(tokens)
+            return out
+
+    def prune(self, now: float, idle_s: float = PRUNE_IDLE_S) -> int:
+        with self._lock:
+            old = [k for k, (_tokens, ts) in self._buckets.items() if now - ts > idle_s]
+            for k in old:
+                del self._buckets[k]
+            return len(old)
+
+
+class SqliteBudgetStore:
+    """
+    Buckets in één SQLite-bestand (WAL), gedeeld door alle processen op deze machine.
+    Eén verbinding per thread; bijvullen en afschrijven gebeurt in één UPSERT, dus atomair.
+    Kan tot timeout_s wachten op de schrijflock van een ander proces (`blocking`: niet vanaf een event loop).
+    """
+
+    blocking = True
+
+    _CHARGE_SQL = (
+        "INSERT INTO buckets(key, tokens, ts) VALUES (?1, ?2 - ?4, ?5) "
+        "ON CONFLICT(key) DO UPDATE SET "
+        "tokens = MIN(?2, tokens + MAX(0.0, ?5 - ts) * ?3) - ?4, ts = ?5 "
+        "RETURNING tokens"
+    )
+
+    def __init__(self, path: str, *, timeout_s: float = 0.5) -> None:
+        self.path = path
+        self.timeout_s = timeout_s
+        self._local = threading.local()
+        self._conn()  # tabel direct aanmaken: een fout in het pad valt bij het starten op
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            import sqlite3  # pas bij gebruik: scheelt importtijd als er geen DB is ingesteld
+
+            conn = sqlite3.connect(self.path, timeout=self.timeout_s, isolation_level=None, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")  # een crash mag de laatste afschrijvingen kosten
+            conn.execute("CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, ts REAL NOT NULL)")
+            self._local.conn = conn
+        return conn
+
+    def peek(self, keys: Iterable[Tuple[str, BucketPolicy]], now: float) -> List[float]:
+        keys = list(keys)
+        marks = ",".join("?" * len(keys))
+        rows = dict((k, (t, ts)) for k, t, ts in self._conn().execute(
+            f"SELECT key, tokens, ts FROM buckets WHERE key IN ({marks})", [k for k, _p in keys]))
+        out = []
+        for key, policy in keys:
+            tokens, ts = rows.get(key, (policy.capacity_ms, now))
+            out.append(_refilled(tokens, ts, now, policy))
+        return out
+
+    def charge(self, keys: Iterable[Tuple[str, BucketPolicy]], cost_ms: float, now: float) -> List[float]:
+        conn = self._conn()
+        out = []
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for key, policy in keys:
+                (tokens,) = conn.execute(self._CHARGE_SQL, (key, policy.capacity_ms, policy.refill_ms_per_s,
+                                                           cost_ms, now)).fetchone()
+                out.append(tokens)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return out
+
+    def prune(self, now: float, idle_s: float = PRUNE_IDLE_S) -> int:
+        return self._conn().execute("DELETE FROM buckets WHERE ts < ?", (now - idle_s,)).rowcount
+
+
+# =====================
+# Budget
+# =====================
+class EngineBudget:
+    """
+    allows() vóór een beurt, charge() erna met de gemeten engine-tijd.
+    Lukt de gedeelde store niet (lock-timeout, schijf vol), dan laten we de klant door:
+    het budget is een rem, geen reden om het gesprek te breken. Zie `errors`.
+    """
+
+    def __init__(self, store=None, *, session_policy: BucketPolicy = SESSION_POLICY,
+                 client_policy: BucketPolicy = CLIENT_POLICY, min_charge_ms: float = MIN_CHARGE_MS) -> None:
+        self.errors = 0
+        self._pending_lock = threading.Lock()
+        # (sessie, client) -> (nog niet weggeschreven ms, tijdstip laatste beurt)
+        self._pending: Dict[Tuple[str, str], Tuple[float, float]] = {}
+        self._next_sweep = 0.0
+        self.configure(store, session_policy=session_policy, client_policy=client_policy, min_charge_ms=min_charge_ms)
+
+    def configure(self, store=None, *, session_policy: BucketPolicy = SESSION_POLICY,
+                  client_policy: BucketPolicy = CLIENT_POLICY, min_charge_ms: float = MIN_CHARGE_MS) -> None:
+        self.store = store if store is not None else MemoryBudgetStore()
+        self.session_policy = session_policy
+        self.client_policy = client_policy
+        self.min_charge_ms = min_charge_ms
+
+    @property
+    def blocking(self) -> bool:
+        """Kan een aanroep op I/O wachten? Dan hoort hij niet op een event loop (server.py: _budget_call)."""
+        return getattr(self.store, "blocking", True)
+
+    def _keys(self, session: str, client: Optional[str]) -> List[Tuple[str, BucketPolicy]]:
+        keys = [("s:" + session, self.session_policy)]
+        if client:
+            keys.append(("c:" + client, self.client_policy))
+        return keys
+
+    def remaining(self, session: str, client: Optional[str] = None) -> Dict[str, float]:
+        """Resterende ms per scope (sessie/client), incl. nog niet weggeschreven kleine beurten."""
+        try:
+            left = self.store.peek(self._keys(session, client), time.time())
+        except Exception:
+            self.errors += 1
+            return {}
+        pending = self._pending.get((session, client or ""), (0.0, 0.0))[0]
+        out = {"session_ms": round(left[0] - pending, 3)}
+        if client:
+            out["client_ms"] = round(left[1] - pending, 3)
+        return out
+
+    def allows(self, session: str, client: Optional[str] = None) -> bool:
+        left = self.remaining(session, client)
+        return all(v > 0 for v in left.values())
+
+    def client_remaining_ms(self, client: str) -> float:
+        """Alleen het adres (bijv. vóór een nieuwe sessie of een batch); bij een storefout: onbeperkt."""
+        try:
+            (left,) = self.store.peek([("c:" + client, self.client_policy)], time.time())
+        except Exception:
+            self.errors += 1
+            return float("inf")
+        return left
+
+    def client_retry_after_s(self, client: str) -> int:
+        """Seconden tot de client-bucket weer boven nul is (0 = nu al)."""
+        left = self.client_remaining_ms(client)
+        if left > 0:
+            return 0
+        return int(-left / self.client_policy.refill_ms_per_s) + 1
+
+    def charge_client(self, client: str, cost_ms: float) -> None:
+        """Werk buiten een sessie (batch-prijsberekening) telt alleen mee voor het adres."""
+        try:
+            self.store.charge([("c:" + client, self.client_policy)], cost_ms, time.time())
+        except Exception:
+            self.errors += 1
+
+    def charge(self, session: str, client: Optional[str], cost_ms: float) -> None:
+        key = (session, client or "")
+        now = time.time()
+        with self._pending_lock:
+            cost_ms += self._pending.pop(key, (0.0, 0.0))[0]
+            if now >= self._next_sweep:
+                self._sweep_pending(now)
+            if cost_ms < self.min_charge_ms:
+                self._pending[key] = (cost_ms, now)
+                return
+        try:
+            self.store.charge(self._keys(session, client), cost_ms, now)
+        except Exception:
+            self.errors += 1
+
+    def _sweep_pending(self, now: float) -> None:
+        """
+        Sessies die eindigen zonder forget() (Streamlit: tab dicht) laten hier een regel achter.
+        Na PRUNE_IDLE_S is hun bucket toch weer vol, dus het openstaande bedrag (< min_charge_ms) mag weg.
+        Aanroepen met _pending_lock.
+        """
+        self._next_sweep = now + PENDING_SWEEP_S
+        stale = [k for k, (_ms, ts) in self._pending.items() if now - ts > PRUNE_IDLE_S]
+        for k in stale:
+            del self._pending[k]
+
+    def forget(self, session: str, client: Optional[str] = None) -> None:
+        """Sessie voorbij: openstaande kleine beurten nog afschrijven."""
+        with self._pending_lock:
+            cost_ms = self._pending.pop((session, client or ""), (0.0, 0.0))[0]
+        if cost_ms > 0:
+            try:
+                self.store.charge(self._keys(session, client), cost_ms, time.time())
+            except Exception:
+                self.errors += 1
+
+    def prune(self) -> int:
+        try:
+            return self.store.prune(time.time())
+        except Exception:
+            self.errors += 1
+            return 0
+
+    def flush(self) -> None:
+        """Alle openstaande kleine beurten afschrijven (bij afsluiten)."""
+        for session, client in list(self._pending):
+            self.forget(session, client or None)
+
+
+ENGINE_BUDGET = EngineBudget()
+_ENV_CONFIGURED = False
+
+
+def configure_from_env() -> bool:
+    """
+    ENGINE_BUDGET_DB=/pad/budget.sqlite3 deelt de buckets tussen processen (anders per proces),
+    ENGINE_BUDGET_SESSION_MS / ENGINE_BUDGET_CLIENT_MS overschrijven de capaciteit (ms engine-tijd).
+    """
+    global _ENV_CONFIGURED
+    if _ENV_CONFIGURED:
+        return True  # Streamlit voert app.py per run opnieuw uit
+    path = os.getenv("ENGINE_BUDGET_DB", "").strip()
+    session_ms = os.getenv("ENGINE_BUDGET_SESSION_MS", "").strip()
+    client_ms = os.getenv("ENGINE_BUDGET_CLIENT_MS", "").strip()
+    if not (path or session_ms or client_ms):
+        return False
+
+    session_policy, client_policy = SESSION_POLICY, CLIENT_POLICY
+    if session_ms:
+        session_policy = BucketPolicy(float(session_ms), SESSION_POLICY.refill_ms_per_s)
+    if client_ms:
+        client_policy = BucketPolicy(float(client_ms), CLIENT_POLICY.refill_ms_per_s)
+    store = SqliteBudgetStore(path) if path else MemoryBudgetStore()
+    ENGINE_BUDGET.configure(store, session_policy=session_policy, client_policy=client_policy)
+    atexit.register(ENGINE_BUDGET.flush)
+    _ENV_CONFIGURED = True
+    return True
@@ -0,0 +1,229 @@
+# chat_memory.py
+from __future__ import annotations
+
+import hashlib
+import sys
+import threading
+import weakref
+from dataclasses import dataclass, fields, is_dataclass
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+
+# ============================================================
+# ✅ Compacte chatgeschiedenis per sessie (Streamlit)
+#    Een sessie bewaart alleen kleine records. Offertes verwijzen naar een
+#    gedeeld Quote-object (één per unieke offertetekst in het proces), de
+#    markdown wordt pas gemaakt als het bericht echt getoond wordt.
+#    Assistent-teksten (vragen, menu's) worden geïnterned: dezelfde tekst
+#    staat één keer in het geheugen, hoeveel sessies hem ook tonen.
+# ============================================================
+MAX_RECORDS = 60         # daarna vallen de oudste records weg
+KEEP_FULL_OFFERS = 2     # oudere offertes -> één regel met het totaalbedrag
+MAX_USER_CHARS = 500     # langere klantinvoer wordt ingekort opgeslagen
+
+# Bovengrens per sessie (eigen geheugen, zie README en session_memory_report):
+# state max ~30 KB (midden in de intake, met lopende schatting; na de offerte ~11 KB plus de
+# variantenboom, ≤ conversation.MAX_VARIANTS varianten ≈ 14 KB) + records max ~36 KB
+# (60 records, de helft klanttekst van MAX_USER_CHARS) -> 80 KB met marge.
+SESSION_KB_BUDGET = 80
+
+
+def prepare_markdown(text: str) -> str:
+    """
+    Streamlit markdown kan soms newlines 'samenvoegen' afhankelijk van context.
+    Met '  \\n' forceren we harde line breaks.
+    """
+    return (text or "").replace("\n", "  \n")
+
+
+def _eur(v) -> str:
+    return f"€{int(v):,}".replace(",", ".")
+
+
+class Quote:
+    """Gedeelde offerte: tekst + totaalrange; markdown lui en één keer."""
+
+    __slots__ = ("text", "total", "_md", "__weakref__")
+
+    def __init__(self, text: str, total: Tuple[int, int]) -> None:
+        self.text = text
+        self.total = total
+        self._md: Optional[str] = None
+
+    def markdown(self) -> str:
+        md = self._md
+        if md is None:
+            md = self._md = prepare_markdown(self.text)
+        return md
+
+
+class QuoteStore:
+    """
+    Interning van offertes over alle sessies. Zwakke referenties: een Quote
+    verdwijnt vanzelf zodra geen enkele sessie er nog naar verwijst.
+    """
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._quotes: "weakref.WeakValueDictionary[bytes, Quote]" = weakref.WeakValueDictionary()
+
+    def intern(self, text: str, costs: Optional[dict]) -> Quote:
+        key = hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+        with self._lock:
+            q = self._quotes.get(key)
+            if q is None:
+                total = tuple((costs or {}).get("total_range_eur") or (0, 0))
+                q = self._quotes[key] = Quote(text, (int(total[0]), int(total[1])))
+            return q
+
+    def __len__(self) -> int:
+        return len(self._quotes)
+
+    def quotes(self) -> List[Quote]:
+        with self._lock:
+            return list(self._quotes.values())
+
+
+QUOTES = QuoteStore()
+
+
+@dataclass(frozen=True, slots=True)
+class ChatRecord:
+    """
+    Eén chatbericht. Precies één van text/quote is gevuld.
+    Tekst van de assistent is geïnterned (gedeeld), klanttekst is eigen.
+    """
+    role: str
+    text: Optional[str] = None
+    quote: Optional[Quote] = None
+
+    def markdown(self) -> str:
+        if self.quote is not None:
+            return self.quote.markdown()
+        return prepare_markdown(self.text or "")
+
+    def plain(self) -> str:
+        return self.quote.text if self.quote is not None else (self.text or "")
+
+
+def user_record(text: str) -> ChatRecord:
+    t = text or ""
+    if len(t) > MAX_USER_CHARS:
+        t = t[:MAX_USER_CHARS] + "…"
+    return ChatRecord("user", text=t)
+
+
+def assistant_record(message: Any) -> ChatRecord:
+    """Maakt een record van een conversation.Message (kind/text/costs)."""
+    if message.kind == "offer":
+        return ChatRecord("assistant", quote=QUOTES.intern(message.text, message.costs))
+    return ChatRecord("assistant", text=sys.intern(message.text))
+
+
+def text_record(role: str, text: str) -> ChatRecord:
+    return ChatRecord(role, text=sys.intern(text) if role == "assistant" else text)
+
+
+def compact(records: List[ChatRecord], *, max_records: int = MAX_RECORDS,
+            keep_full_offers: int = KEEP_FULL_OFFERS) -> int:
+    """
+    Compacteert in-place:
+    - alleen de laatste `keep_full_offers` offertes blijven volledig; oudere worden
+      één regel met het totaalbedrag (de verwijzing naar de Quote vervalt)
+    - boven `max_records` vallen de oudste records weg
+    Geeft het aantal weggevallen records terug.
+    """
+    seen = 0
+    for i in range(len(records) - 1, -1, -1):
+        q = records[i].quote
+        if q is None:
+            continue
+        seen += 1
+        if seen > keep_full_offers:
+            lo, hi = q.total
+            records[i] = ChatRecord("assistant", text=sys.intern(f"(Eerdere indicatie: {_eur(lo)} – {_eur(hi)})"))
+
+    dropped = max(0, len(records) - max_records)
+    if dropped:
+        del records[:dropped]
+    return dropped
+
+
+# =====================
+# Geheugenrapport
+# =====================
+def _deep_sizeof(obj: Any, seen: Set[int], shared: Set[int]) -> int:
+    """Diepe grootte in bytes; objecten in `shared` (of al gezien) tellen niet mee."""
+    oid = id(obj)
+    if oid in seen or oid in shared:
+        return 0
+    seen.add(oid)
+    size = sys.getsizeof(obj)
+
+    if isinstance(obj, (str, bytes, int, float, bool, type(None))):
+        return size
+    if isinstance(obj, dict):
+        for k, v in obj.items():
+            size += _deep_sizeof(k, seen, shared) + _deep_sizeof(v, seen, shared)
+        return size
+    if isinstance(obj, (list, tuple, set, frozenset)):
+        for x in obj:
+            size += _deep_sizeof(x, seen, shared)
+        return size
+    if is_dataclass(obj):
+        for f in fields(obj):
+            size += _deep_sizeof(getattr(obj, f.name, None), seen, shared)
+        return size
+    d = getattr(obj, "__dict__", None)
+    if d is not None:
+        size += _deep_sizeof(d, seen, shared)
+    for cls in type(obj).__mro__:
+        for name in getattr(cls, "__slots__", ()):
+            if name != "__weakref__" and hasattr(obj, name):
+                size += _deep_sizeof(getattr(obj, name), seen, shared)
+    return size
+
+
+def session_memory_report(conv: Any, records: Iterable[ChatRecord], *,
+                          shared_objects: Iterable[Any] = ()) -> Dict[str, Any]:
+    """
+    Bytes per sessie, gesplitst in:
+    - conv:     ConversationState (flow, antwoorden, lopende schatting, varianten, ...)
+    - variants: aantal varianten + hun deel van conv (patches + wortel-antwoorden)
+    - records:  chatrecords incl. klanttekst
+    - shared:   geïnternde assistent-teksten + Quotes waar deze sessie naar wijst
+                (één keer per proces, telt niet mee in own_kb)
+    `shared_objects` (bijv. FLOW_STEPS, PRIJZEN) worden volledig overgeslagen.
+    """
+    records = list(records)
+    shared_ids: Set[int] = {id(o) for o in shared_objects}
+    shared_parts: List[Any] = []
+    for r in records:
+        if r.quote is not None:
+            shared_parts.append(r.quote)
+        elif r.role == "assistant" and r.text is not None:
+            shared_parts.append(r.text)
+
+    seen: Set[int] = set()
+    shared_bytes = 0
+    for obj in shared_parts:
+        shared_bytes += _deep_sizeof(obj, seen, shared_ids)
+    shared_ids |= seen
+
+    conv_bytes = _deep_sizeof(conv, set(), shared_ids)
+    records_bytes = _deep_sizeof(records, set(), shared_ids)
+    # variantenboom (zit al in conv_kb): apart getoond, hij groeit met elke herberekening tot MAX_VARIANTS
+    variants = getattr(conv, "variants", ())
+    variants_bytes = _deep_sizeof((variants, getattr(conv, "variant_root", None)), set(), shared_ids)
+    own = conv_bytes + records_bytes
+    return {
+        "records": len(records),
+        "variants": len(variants),
+        "variants_kb": round(variants_bytes / 1024, 1),
+        "conv_kb": round(conv_bytes / 1024, 1),
+        "records_kb": round(records_bytes / 1024, 1),
+        "own_kb": round(own / 1024, 1),
+        "shared_kb": round(shared_bytes / 1024, 1),
+        "budget_kb": SESSION_KB_BUDGET,
+        "within_budget": own <= SESSION_KB_BUDGET * 1024,
+    }
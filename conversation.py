@@ -0,0 +1,1093 @@
+# conversation.py
+from __future__ import annotations
+
+import copy
+import re
+import time
+from dataclasses import dataclass, replace
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, Optional, Tuple
+
+from pricing import PRIJZEN, RunningEstimate, estimate_tuinaanleg_costs, format_tuinaanleg_costs_for_customer
+from flow_tuinaanleg import PREFILL_LABELS, TuinaanlegFlow, compile_steps, extract_answers
+from profiles import PROFILES, PROFILES_BY_KEY, GardenProfile, match_profile, profiles_hint_text
+from telemetry import INTAKE_TELEMETRY
+from eventlog import EVENT_LOG
+
+from savings import (
+    post_offer_choices_text,
+    lower_costs_menu_text,
+    more_green_choice_text,
+    extras_select_menu_text,
+    material_part_menu_text,
+    material_choice_menu_text_cheaper,
+    vlonder_choice_menu_text,
+    erf_remove_select_menu_text,
+    all_savings_menu_text,
+    basket_menu_text,
+    basket_summary_text,
+    basket_slot,
+    saving_action_labels,
+    SavingAction,
+    BASKET_APPLY_WORDS,
+    BASKET_CLEAR_WORDS,
+    apply_set_ratio,
+    apply_remove_selected_extras,
+    apply_material_change,
+    apply_vlonder_change,
+    apply_erf_changes,
+    apply_saving_action,
+    apply_saving_actions,
+    parse_multi_digits,
+    parse_multi_numbers,
+    parse_single_digit,
+    parse_material_parts,
+    is_back,
+    has_vlonder,
+    has_erfafscheiding,
+    soft_limit_message,
+    limit_followup_text,
+    variants_hint_text,
+    variants_overview_text,
+    variant_compare_text,
+    VARIANT_UNDO_WORDS,
+    VARIANT_REDO_WORDS,
+    VARIANT_LIST_WORDS,
+)
+
+if TYPE_CHECKING:  # alleen voor de annotatie; budget.py laadt pas in de front-ends (koude start)
+    from budget import EngineBudget
+
+
+# =====================
+# Vaste teksten (console + Streamlit)
+# =====================
+INTAKE_INTRO_TEXT = "Ik stel u een paar korte vragen over uw tuin, zodat ik u een gerichte indicatie kan geven."
+CONTACT_PROMPT_TEXT = "Top. Wilt u uw naam + postcode + telefoon/e-mail + een korte omschrijving sturen?"
+CONTACT_THANKS_TEXT = "Dank u wel! We nemen zo snel mogelijk contact met u op!"
+GOODBYE_TEXT = "Helemaal goed. Fijn dat u even heeft gekeken. 👋"
+FALLBACK_TEXT = "Typ bijvoorbeeld: tuinaanleg"
+
+CONTACT_SHORTCUTS = {"contact", "offerte", "advies"}
+
+# "idle" | "intake" | "menu" | "lower_costs_menu" | "lc_*" | "limit_followup" | "contact_details" | "end"
+POST_OFFER_STAGES = frozenset({
+    "menu",
+    "lower_costs_menu",
+    "lc_more_green_choice",
+    "lc_extras_select",
+    "lc_material_part",
+    "lc_material_choice",
+    "lc_vlonder_choice",
+    "lc_erf_remove_select",
+    "lc_overview",
+    "lc_basket",
+    "limit_followup",
+    "contact_details",
+})
+
+# Stages die previews/herberekeningen doen: alleen met rekenbudget (zie budget.py)
+BUDGETED_STAGES = POST_OFFER_STAGES - {"menu", "limit_followup", "contact_details"}
+
+# Stappen één keer per proces opbouwen en delen tussen alle gesprekken
+FLOW_STEPS = compile_steps(PRIJZEN)
+
+
+def new_flow() -> TuinaanlegFlow:
+    return TuinaanlegFlow(prijzen=PRIJZEN, steps=FLOW_STEPS)
+
+
+# =====================
+# State + berichten
+# =====================
+@dataclass(frozen=True)
+class Message:
+    """
+    Eén assistent-bericht.
+    kind: "text" | "saving" (doorgevoerde besparing) | "offer" (kostenindicatie)
+    Bij "offer" zitten de kosten (en bij een herberekening de oude kosten) erbij,
+    zodat een front-end zelf kan kiezen hoe het getoond wordt.
+    """
+    kind: str
+    text: str
+    costs: Optional[dict] = None
+    before_costs: Optional[dict] = None
+
+
+# Bovengrens van de variantenboom per sessie: ~0,6 KB per gewone herberekening, dus ≤ ~14 KB
+MAX_VARIANTS = 20
+
+# Sentinel in een variant-patch: de sleutel bestaat niet (meer) in deze variant
+_MISSING = object()
+
+
+@dataclass(frozen=True, slots=True)
+class Variant:
+    """
+    Eén offerte-variant in de boom: alleen de antwoorden die afwijken van de ouder (patch).
+    Waarden worden gedeeld met de antwoorden-dicts (die nooit gemuteerd worden), dus een
+    variant kost een paar honderd bytes, geen kopie van alle antwoorden.
+    """
+    parent: int                               # index in ConversationState.variants, -1 voor de wortel
+    patch: Tuple[Tuple[str, Any], ...]        # (key, nieuwe waarde of _MISSING)
+    total: Tuple[int, int]                    # totaalrange, voor het overzicht zonder herberekening
+
+
+@dataclass(frozen=True)
+class ConversationState:
+    stage: str = "idle"
+    flow: Optional[TuinaanlegFlow] = None
+
+    last_answers: Optional[dict] = None
+    last_costs: Optional[dict] = None
+
+    recalc_count: int = 0
+    # Rekenbudget (budget.py): de front-end zet dit vóór elke beurt; False = geen nieuwe herberekeningen
+    budget_ok: bool = True
+
+    pending_material_part: Optional[Tuple[str, ...]] = None  # bv ("2","3")
+
+    # Lopende schatting tijdens de intake (None buiten de intake)
+    running: Optional[RunningEstimate] = None
+
+    # Standaardtuin: profiel-key + de ruwe invoer waar de huidige offerte op gebaseerd is
+    profile: Optional[str] = None
+    profile_inputs: Optional[Tuple[Tuple[str, str], ...]] = None
+
+    # Bespaarmandje (stage lc_basket): verzamelde acties + incrementele preview
+    basket: Tuple[SavingAction, ...] = ()
+    basket_estimate: Optional[RunningEstimate] = None
+
+    # Varianten: elke offerte is een knoop (patch t.o.v. de ouder); de wortel bewaart de volledige antwoorden
+    variants: Tuple[Variant, ...] = ()
+    variant_root: Optional[dict] = None
+    current_variant: int = 0
+    redo: Tuple[int, ...] = ()
+
+    @property
+    def post_offer_mode(self) -> bool:
+        return self.stage in POST_OFFER_STAGES
+
+    @property
+    def ended(self) -> bool:
+        return self.stage == "end"
+
+    def running_total_range(self) -> Optional[Tuple[int, int]]:
+        """Voorlopige (min, max) in euro's tijdens de intake, anders None."""
+        if self.stage != "intake" or self.running is None:
+            return None
+        return self.running.total_range()
+
+
+Turn = Tuple[ConversationState, List[Message]]
+
+
+def initial_state(*, start_intake: bool = False) -> ConversationState:
+    """
+    Console start in "idle" (wacht op tuinaanleg-intentie),
+    Streamlit start direct in de intake.
+    """
+    if start_intake:
+        return ConversationState(stage="intake", flow=new_flow())
+    return ConversationState()
+
+
+def looks_like_tuinaanleg_intent(text: str) -> bool:
+    t = text.lower()
+    triggers = [
+        "tuinaanleg", "tuin aanleggen", "tuin aanleg", "tuin renoveren",
+        "herinrichten", "nieuwe tuin", "aanleg", "tuin vernieuwen"
+    ]
+    return any(w in t for w in triggers)
+
+
+def _ensure_prefix(explanation: str) -> str:
+    """
+    Zorgt dat de eerste zin overal consistent start met:
+    '✅ Doorgevoerde kostenbesparing: ...'
+    (ook als een apply_* functie nog oude tekst teruggeeft).
+    """
+    t = (explanation or "").strip()
+    if not t:
+        return "✅ Doorgevoerde kostenbesparing."
+    low = t.lower()
+
+    if "doorgevoerde kostenbesparing" in low:
+        return t
+
+    if low.startswith("ik heb aangepast:"):
+        rest = t.split(":", 1)[1].strip() if ":" in t else t
+        return f"✅ Doorgevoerde kostenbesparing: {rest}"
+
+    if low.startswith("ik heb de ") or low.startswith("ik heb het "):
+        return f"✅ Doorgevoerde kostenbesparing: {t[0].lower() + t[1:]}" if len(t) > 1 else "✅ Doorgevoerde kostenbesparing."
+
+    return f"✅ Doorgevoerde kostenbesparing: {t}"
+
+
+def _text(*texts: str) -> List[Message]:
+    return [Message("text", t) for t in texts]
+
+
+def _copy_answer_value(v):
+    # answers bevat scalars, tuples, lijsten met strings en lijsten met item-dicts (erfafscheiding)
+    if isinstance(v, list):
+        return [dict(x) if isinstance(x, dict) else x for x in v]
+    if isinstance(v, dict):
+        return dict(v)
+    return v
+
+
+def _clone_flow(flow: TuinaanlegFlow) -> TuinaanlegFlow:
+    """
+    Flow is mutable: we werken op een kopie zodat de oude state onaangetast blijft.
+    Steps zijn immutable en worden gedeeld. (Bewust geen deepcopy: die kost ~4x zoveel per turn.)
+    """
+    clone = copy.copy(flow)
+    clone.answers = {k: _copy_answer_value(v) for k, v in flow.answers.items()}
+    return clone
+
+
+# =====================
+# Varianten (boom van patches, undo/redo)
+# =====================
+# Afgeleide antwoorden zonder eigen intakestap: omschrijving in het variantenoverzicht
+_VARIANT_KEY_LABELS = {
+    "bestrating_pct": PREFILL_LABELS["verhouding_bestrating_groen"],
+    "groen_pct": PREFILL_LABELS["verhouding_bestrating_groen"],
+    "gazon_pct": PREFILL_LABELS["verhouding_gazon_beplanting"],
+    "beplanting_pct": PREFILL_LABELS["verhouding_gazon_beplanting"],
+    "oprit_pct": "verdeling oprit/paden/terras",
+    "paden_pct": "verdeling oprit/paden/terras",
+    "terras_pct": "verdeling oprit/paden/terras",
+    "erfafscheiding_items": "erfafscheiding",
+    "beregening_scope": "beregening",
+}
+
+
+def _answers_patch(old: dict, new: dict) -> Tuple[Tuple[str, Any], ...]:
+    patch = [(k, v) for k, v in new.items() if k not in old or old[k] != v]
+    patch += [(k, _MISSING) for k in old if k not in new]
+    return tuple(patch)
+
+
+def _total_of(costs: Optional[dict]) -> Tuple[int, int]:
+    lo, hi = (costs or {}).get("total_range_eur") or (0, 0)
+    return int(lo), int(hi)
+
+
+def _prune_variants(variants: Tuple[Variant, ...], root: dict, current: int) -> Tuple[Tuple[Variant, ...], dict, int]:
+    """
+    Eén variant minder (aanroepen als de boom vol is): de oudste eindknoop die niet op het pad naar
+    `current` ligt. Is de boom één rechte lijn tot `current`, dan gaat de wortel op in zijn enige kind.
+    Indexen schuiven op; geeft (varianten, wortel-antwoorden, nieuwe index van current).
+    """
+    on_path = set()
+    vid = current
+    while vid >= 0:
+        on_path.add(vid)
+        vid = variants[vid].parent
+    parents = {v.parent for v in variants}
+    drop = next((i for i in range(len(variants)) if i not in on_path and i not in parents), None)
+
+    if drop is None:
+        # rechte lijn: wortel + patch van het eerste kind wordt de nieuwe wortel (patch blijft voor de omschrijving)
+        child = variants[1]
+        root = dict(root)
+        for k, v in child.patch:
+            if v is _MISSING:
+                root.pop(k, None)
+            else:
+                root[k] = v
+        variants = (Variant(-1, child.patch, child.total),) + variants[2:]
+        drop = 0
+    else:
+        variants = variants[:drop] + variants[drop + 1:]
+    variants = tuple(
+        v if v.parent < drop else Variant(v.parent - 1, v.patch, v.total)
+        for v in variants
+    )
+    return variants, root, current - 1 if current > drop else current
+
+
+def _with_variant(state: ConversationState, answers: dict, costs: dict) -> ConversationState:
+    """
+    Registreert een nieuwe offerte als kind van de huidige variant (de eerste wordt de wortel).
+    Aanroepen vóórdat last_answers vervangen wordt; de redo-stapel vervalt.
+    Maximaal MAX_VARIANTS: daarna valt per nieuwe variant de oudste zijtak weg (zie _prune_variants),
+    zodat de state per sessie begrensd blijft (chat_memory.SESSION_KB_BUDGET), ook zonder limiet op herberekeningen.
+    """
+    if state.variant_root is None or state.last_answers is None:
+        return replace(state, variants=(Variant(-1, (), _total_of(costs)),), variant_root=answers,
+                       current_variant=0, redo=())
+    patch = _answers_patch(state.last_answers, answers)
+    if not patch:
+        return state
+    for vid, variant in enumerate(state.variants):
+        if variant.parent == state.current_variant and variant.patch == patch:
+            return replace(state, current_variant=vid, redo=())  # dezelfde keuze nogmaals: bestaande tak
+    variants, root, current = state.variants, state.variant_root, state.current_variant
+    if len(variants) >= MAX_VARIANTS:
+        variants, root, current = _prune_variants(variants, root, current)
+    variants = variants + (Variant(current, patch, _total_of(costs)),)
+    return replace(state, variants=variants, variant_root=root, current_variant=len(variants) - 1, redo=())
+
+
+def _variant_answers(state: ConversationState, vid: int) -> dict:
+    """Antwoorden van een variant: wortel + patches langs het pad ernaartoe."""
+    if vid == state.current_variant and state.last_answers is not None:
+        return state.last_answers
+    chain = []
+    while vid >= 0:
+        variant = state.variants[vid]
+        chain.append(variant.patch)
+        vid = variant.parent
+    answers = dict(state.variant_root or {})
+    for patch in reversed(chain):
+        for k, v in patch:
+            if v is _MISSING:
+                answers.pop(k, None)
+            else:
+                answers[k] = v
+    return answers
+
+
+def _variant_costs(state: ConversationState, vid: int) -> dict:
+    if vid == state.current_variant and state.last_costs is not None:
+        return state.last_costs
+    return estimate_tuinaanleg_costs(_variant_answers(state, vid))
+
+
+def _variant_description(variant: Variant) -> str:
+    if variant.parent < 0 and not variant.patch:
+        return "Eerste offerte"
+    labels: List[str] = []
+    for k, _v in variant.patch:
+        if k.startswith("_") or k.startswith("confirm_"):
+            continue
+        label = PREFILL_LABELS.get(k) or _VARIANT_KEY_LABELS.get(k) or k.replace("_", " ")
+        if label not in labels:
+            labels.append(label)
+    return "Aangepast: " + ", ".join(labels) if labels else "Aangepast"
+
+
+def _switch_variant(state: ConversationState, vid: int, redo: Tuple[int, ...], intro: str) -> Turn:
+    """Naar een bestaande variant: telt niet als herberekening (de klant heeft hem al gezien)."""
+    answers = _variant_answers(state, vid)
+    costs = estimate_tuinaanleg_costs(answers)
+    msgs = _text(intro)
+    msgs.append(Message("offer", format_tuinaanleg_costs_for_customer(costs), costs=costs,
+                        before_costs=state.last_costs or {}))
+    state = replace(
+        state,
+        last_answers=answers,
+        last_costs=costs,
+        current_variant=vid,
+        redo=redo,
+        pending_material_part=None,
+        profile=None,
+        profile_inputs=None,
+    )
+    return _to_menu(state, msgs)
+
+
+_VARIANT_PICK = re.compile(r"^(variant|vergelijk)\s*(\d+)(?:\s*(?:,|en|met|&)?\s*(\d+))?$")
+
+
+def _variant_command(state: ConversationState, t_raw: str, prompt: str) -> Optional[Turn]:
+    """
+    Opdrachten voor varianten (menu en limiet-vervolg); None als de invoer geen opdracht is.
+    ongedaan / opnieuw / varianten / variant N / vergelijk N [M]
+    """
+    if not state.variants:
+        return None
+    t = " ".join(t_raw.lower().split())
+
+    if t in VARIANT_UNDO_WORDS:
+        parent = state.variants[state.current_variant].parent
+        if parent < 0:
+            return state, _text("Dit is de eerste offerte; er is niets om ongedaan te maken.", prompt)
+        return _switch_variant(state, parent, state.redo + (state.current_variant,),
+                               f"↩️ Ongedaan gemaakt: terug naar variant {parent + 1}.")
+    if t in VARIANT_REDO_WORDS:
+        if not state.redo:
+            return state, _text("Er is niets om opnieuw door te voeren.", prompt)
+        vid = state.redo[-1]
+        return _switch_variant(state, vid, state.redo[:-1], f"↪️ Opnieuw doorgevoerd: variant {vid + 1}.")
+    if t in VARIANT_LIST_WORDS:
+        rows = [
+            (i + 1, v.parent + 1 if v.parent >= 0 else None, _variant_description(v), v.total, i == state.current_variant)
+            for i, v in enumerate(state.variants)
+        ]
+        return state, _text(variants_overview_text(rows), prompt)
+
+    m = _VARIANT_PICK.match(t)
+    if m is None:
+        return None
+    numbers = [int(x) - 1 for x in m.group(2, 3) if x is not None]
+    missing = [n + 1 for n in numbers if not 0 <= n < len(state.variants)]
+    if missing:
+        return state, _text(f"Variant {missing[0]} bestaat niet; er zijn {len(state.variants)} varianten.", prompt)
+
+    if m.group(1) == "variant":
+        if len(numbers) != 1:
+            return None
+        vid = numbers[0]
+        if vid == state.current_variant:
+            return state, _text(f"U kijkt al naar variant {vid + 1}.", prompt)
+        return _switch_variant(state, vid, (), f"🗂️ Terug naar variant {vid + 1}.")
+
+    a, b = (numbers[0], state.current_variant) if len(numbers) == 1 else numbers
+    text = variant_compare_text(f"Variant {a + 1}", _variant_costs(state, a), f"variant {b + 1}", _variant_costs(state, b))
+    return state, _text(text, prompt)
+
+
+# =====================
+# Gedeelde overgangen
+# =====================
+def _post_offer_text(state: ConversationState) -> str:
+    text = post_offer_choices_text()
+    if len(state.variants) > 1:
+        can_undo = state.variants[state.current_variant].parent >= 0
+        text += "\n" + variants_hint_text(len(state.variants), can_undo, bool(state.redo))
+    return text
+
+
+def _to_menu(state: ConversationState, msgs: List[Message]) -> Turn:
+    return replace(state, stage="menu"), msgs + _text(_post_offer_text(state))
+
+
+def _to_lower_costs_menu(state: ConversationState, msgs: List[Message]) -> Turn:
+    return replace(state, stage="lower_costs_menu"), msgs + _text(lower_costs_menu_text(state.last_answers))
+
+
+def _to_material_part(state: ConversationState, msgs: List[Message]) -> Turn:
+    return replace(state, stage="lc_material_part"), msgs + _text(material_part_menu_text(state.last_answers))
+
+
+def _to_limit(state: ConversationState) -> Turn:
+    return replace(state, stage="limit_followup"), _text(soft_limit_message(), limit_followup_text())
+
+
+def _to_contact(state: ConversationState) -> Turn:
+    return replace(state, stage="contact_details"), _text(CONTACT_PROMPT_TEXT)
+
+
+def _to_end(state: ConversationState, text: str) -> Turn:
+    return replace(state, stage="end", pending_material_part=None), _text(text)
+
+
+def _apply_recalc(state: ConversationState, new_answers: dict, explanation: str) -> Turn:
+    # kosten-dicts worden nergens gemuteerd: delen i.p.v. kopiëren (scheelt een kopie per sessie)
+    before_c = state.last_costs or {}
+    answers = dict(new_answers)
+    new_c = estimate_tuinaanleg_costs(answers)
+
+    msgs = [
+        Message("saving", _ensure_prefix(explanation)),
+        Message("offer", format_tuinaanleg_costs_for_customer(new_c), costs=new_c, before_costs=before_c),
+    ]
+    state = replace(
+        _with_variant(state, answers, new_c),
+        last_answers=answers,
+        last_costs=new_c,
+        recalc_count=state.recalc_count + 1,
+        pending_material_part=None,
+        profile=None,
+        profile_inputs=None,
+    )
+    return _to_menu(state, msgs)
+
+
+# =====================
+# Stage handlers
+# =====================
+def _stage_idle(state: ConversationState, t_raw: str) -> Turn:
+    profile, rest = match_profile(t_raw)
+    if profile is not None:
+        state = replace(state, recalc_count=0, pending_material_part=None)
+        return _quote_profile(state, profile, _profile_inputs_with(profile.input_map(), rest))
+
+    if looks_like_tuinaanleg_intent(t_raw):
+        flow = new_flow()
+        state = replace(
+            state, stage="intake", flow=flow, recalc_count=0, pending_material_part=None, running=None,
+            profile=None, profile_inputs=None,
+        )
+        return state, _text(INTAKE_INTRO_TEXT, first_question_text(flow))
+    return state, _text(FALLBACK_TEXT)
+
+
+def _stage_intake(state: ConversationState, t_raw: str) -> Turn:
+    if state.flow is None or state.flow.step_index == 0:
+        profile, rest = match_profile(t_raw)
+        if profile is not None:
+            return _quote_profile(state, profile, _profile_inputs_with(profile.input_map(), rest))
+
+    flow = _clone_flow(state.flow) if state.flow is not None else new_flow()
+    if state.profile_inputs is not None and not flow.is_done():
+        # aanvulling op een standaardtuin: invoer bewaren zodat latere afwijkingen opnieuw kunnen rekenen
+        inputs = dict(state.profile_inputs)
+        inputs[flow.steps[flow.step_index].key] = t_raw
+        state = replace(state, profile_inputs=tuple(inputs.items()))
+    reply, done = flow.handle(t_raw)
+    running = (state.running or RunningEstimate()).update(flow.answers)
+
+    msgs = _text(reply) if reply else []
+    if not done:
+        return replace(state, flow=flow, running=running), msgs
+
+    # Alleen de laatst gewijzigde secties zijn net herberekend; de offerte ligt al klaar.
+    costs = running.costs if running.costs is not None else estimate_tuinaanleg_costs(flow.answers)
+    msgs.append(Message("offer", format_tuinaanleg_costs_for_customer(costs), costs=costs))
+
+    answers = dict(flow.answers)
+    state = replace(_with_variant(state, answers, costs), flow=None, running=None, last_answers=answers, last_costs=costs)
+    return _to_menu(state, msgs)
+
+
+def _stage_menu(state: ConversationState, t_raw: str) -> Turn:
+    command = _variant_command(state, t_raw, _post_offer_text(state))
+    if command is not None:
+        return command
+
+    if t_raw == "1":
+        if not state.budget_ok:
+            return _to_limit(state)
+        return _to_lower_costs_menu(state, [])
+    if t_raw == "2":
+        return _to_contact(state)
+    if t_raw == "3":
+        return _to_end(state, GOODBYE_TEXT)
+
+    # Offerte op basis van een standaardtuin: afwijkingen in vrije tekst verwerken
+    if state.profile_inputs is not None and any(c.isalpha() for c in t_raw):
+        overrides = extract_answers(t_raw)
+        if overrides:
+            inputs = _merge_profile_inputs(dict(state.profile_inputs), overrides)
+            return _quote_profile(state, PROFILES_BY_KEY[state.profile], inputs)
+
+    return state, _text(_post_offer_text(state))
+
+
+def _stage_limit_followup(state: ConversationState, t_raw: str) -> Turn:
+    command = _variant_command(state, t_raw, limit_followup_text())
+    if command is not None:
+        return command
+
+    if t_raw == "1":
+        return _to_contact(state)
+    if t_raw == "2":
+        return _to_end(state, GOODBYE_TEXT)
+    return state, _text(limit_followup_text())
+
+
+def lower_costs_options(ans: dict | None) -> Dict[str, str]:
+    """
+    Nummer -> categorie, met dezelfde dynamische nummering als lower_costs_menu_text:
+    1..3 vast, daarna optioneel vlonder en erfafscheiding, als laatste het overzicht en het mandje.
+    """
+    options = {"1": "more_green", "2": "extras", "3": "material"}
+    idx = 4
+    if has_vlonder(ans):
+        options[str(idx)] = "vlonder"
+        idx += 1
+    if has_erfafscheiding(ans):
+        options[str(idx)] = "erf"
+        idx += 1
+    options[str(idx)] = "overview"
+    options[str(idx + 1)] = "basket"
+    return options
+
+
+# categorie -> (menu builder, stage als er opties zijn)
+_CATEGORY_MENUS: Dict[str, Tuple[Callable[[dict, dict], Tuple[str, dict]], str]] = {
+    "more_green": (more_green_choice_text, "lc_more_green_choice"),
+    "extras": (extras_select_menu_text, "lc_extras_select"),
+    "vlonder": (vlonder_choice_menu_text, "lc_vlonder_choice"),
+    "erf": (erf_remove_select_menu_text, "lc_erf_remove_select"),
+    "overview": (all_savings_menu_text, "lc_overview"),
+    "basket": (basket_menu_text, "lc_basket"),
+}
+
+
+def _stage_lower_costs_menu(state: ConversationState, t_raw: str) -> Turn:
+    if is_back(t_raw):
+        return _to_menu(state, [])
+
+    category = lower_costs_options(state.last_answers).get(t_raw)
+    if category is None:
+        return state, _text(lower_costs_menu_text(state.last_answers))
+
+    if category == "material":
+        return _to_material_part(state, [])
+
+    builder, next_stage = _CATEGORY_MENUS[category]
+    menu, mapping = _menu(state, builder)
+    if not mapping:
+        return _to_lower_costs_menu(state, _text(menu))
+    return replace(state, stage=next_stage), _text(menu)
+
+
+def _single_choice_stage(
+    builder: Callable[[dict, dict], Tuple[str, Dict[str, str]]],
+    apply_fn: Callable[[dict, str], Tuple[dict, str]],
+) -> Callable[[ConversationState, str], Turn]:
+    def handler(state: ConversationState, t_raw: str) -> Turn:
+        menu, mapping = _menu(state, builder)
+        if not mapping:
+            return _to_lower_costs_menu(state, _text(menu))
+
+        picked = parse_single_digit(t_raw, allowed=tuple(mapping.keys()))
+        if picked is None:
+            return state, _text(menu)
+        if picked == "nee":
+            return _to_lower_costs_menu(state, [])
+
+        new_a, expl = apply_fn(dict(state.last_answers or {}), mapping[picked])
+        return _apply_recalc(state, new_a, expl)
+
+    return handler
+
+
+def _multi_choice_stage(
+    builder: Callable[[dict, dict], Tuple[str, Dict[str, str]]],
+    apply_fn: Callable[[dict, List[str]], Tuple[dict, str]],
+) -> Callable[[ConversationState, str], Turn]:
+    def handler(state: ConversationState, t_raw: str) -> Turn:
+        menu, mapping = _menu(state, builder)
+        if not mapping:
+            return _to_lower_costs_menu(state, _text(menu))
+
+        if is_back(t_raw):
+            return _to_lower_costs_menu(state, [])
+
+        parsed = parse_multi_digits(t_raw, allowed=tuple(mapping.keys()))
+        if parsed is None:
+            return state, _text(menu)
+        if parsed == ("nee",):
+            return _to_lower_costs_menu(state, [])
+
+        actions = [mapping[d] for d in parsed if d in mapping]
+        if not actions:
+            return state, _text(menu)
+
+        new_a, expl = apply_fn(dict(state.last_answers or {}), actions)
+        return _apply_recalc(state, new_a, expl)
+
+    return handler
+
+
+def _stage_material_part(state: ConversationState, t_raw: str) -> Turn:
+    if is_back(t_raw):
+        return _to_lower_costs_menu(state, [])
+
+    picked_parts = parse_material_parts(t_raw)
+    if picked_parts is None:
+        return state, _text(material_part_menu_text(state.last_answers))
+    if picked_parts == ("nee",):
+        return _to_lower_costs_menu(state, [])
+
+    state = replace(state, pending_material_part=picked_parts)
+    menu, allowed_choices = _menu(state, material_choice_menu_text_cheaper, picked_parts)
+    if not allowed_choices:
+        return _to_material_part(state, _text(menu))
+
+    return replace(state, stage="lc_material_choice"), _text(menu)
+
+
+def _stage_material_choice(state: ConversationState, t_raw: str) -> Turn:
+    part = state.pending_material_part or ("1", "2", "3")  # fallback (zou normaal niet nodig zijn)
+    menu, allowed_choices = _menu(state, material_choice_menu_text_cheaper, part)
+    if not allowed_choices:
+        return _to_material_part(state, _text(menu))
+
+    picked = parse_single_digit(t_raw, allowed=tuple(sorted(allowed_choices)))
+    if picked is None:
+        return state, _text(menu)
+    if picked == "nee":
+        return _to_material_part(state, [])
+
+    new_a, expl = apply_material_change(dict(state.last_answers or {}), part, picked)
+    return _apply_recalc(state, new_a, expl)
+
+
+def _leave_basket(state: ConversationState) -> ConversationState:
+    return replace(state, basket=(), basket_estimate=None)
+
+
+def _stage_basket(state: ConversationState, t_raw: str) -> Turn:
+    menu, mapping = _menu(state, basket_menu_text)
+    if not mapping:
+        return _to_lower_costs_menu(_leave_basket(state), _text(menu))
+
+    t = t_raw.strip().lower()
+    if is_back(t):
+        return _to_lower_costs_menu(_leave_basket(state), [])
+
+    if t in BASKET_APPLY_WORDS:
+        if not state.basket:
+            return state, _text(basket_summary_text([], state.last_costs, None))
+        # het hele mandje telt als één herberekening
+        new_a, expl = apply_saving_actions(dict(state.last_answers or {}), list(state.basket))
+        return _apply_recalc(_leave_basket(state), new_a, expl)
+
+    if t in BASKET_CLEAR_WORDS:
+        return _leave_basket(state), _text(basket_summary_text([], state.last_costs, None))
+
+    parsed = parse_multi_numbers(t, allowed=tuple(mapping.keys()))
+    if parsed is None:
+        return state, _text(menu)
+
+    basket = list(state.basket)
+    for number in parsed:
+        action = mapping[number]
+        if action in basket:
+            basket.remove(action)  # nogmaals kiezen = eruit halen
+            continue
+        slot = basket_slot(action)
+        basket = [b for b in basket if basket_slot(b) != slot]
+        basket.append(action)
+
+    # Preview: alleen de secties die door het mandje geraakt worden opnieuw berekenen
+    base = dict(state.last_answers or {})
+    estimate = state.basket_estimate or RunningEstimate().update(base)
+    if basket:
+        preview_answers, _expl = apply_saving_actions(base, basket)
+        estimate = estimate.update(preview_answers)
+    else:
+        estimate = estimate.update(base)
+
+    labels = saving_action_labels(base)
+    text = basket_summary_text([labels.get(a, str(a)) for a in basket], state.last_costs, estimate.costs if basket else None)
+    return replace(state, basket=tuple(basket), basket_estimate=estimate), _text(text)
+
+
+# =====================
+# Klikbare menu's (front-ends met knoppen)
+# =====================
+@dataclass(frozen=True)
+class MenuOptions:
+    """
+    Het menu van de huidige stage als keuzes. `value` is precies wat een klant zou typen,
+    dus een klik gaat gewoon via handle_turn (zelfde parsing, zelfde mapping).
+    multi: meerdere keuzes tegelijk, in te sturen als "1,3". back: 'nee' gaat terug.
+    """
+    options: Tuple[Tuple[str, str], ...]  # (value, label)
+    multi: bool = False
+    back: bool = False
+    commands: Tuple[Tuple[str, str], ...] = ()  # vaste opdrachten naast de opties, bijv. ("ok", "Doorvoeren")
+    submit_label: str = "✅ Doorvoeren"          # knop onder een multi-select
+
+
+# stage -> menubuilder (zelfde builders als de stage-handlers)
+_CHOICE_STAGE_BUILDERS: Dict[str, Callable] = {stage: builder for builder, stage in _CATEGORY_MENUS.values()}
+_MULTI_STAGES = frozenset({"lc_extras_select", "lc_erf_remove_select", "lc_material_part", "lc_basket"})
+
+
+def _numbered_options(text: str, values) -> Tuple[Tuple[str, str], ...]:
+    """Labels uit de menutekst halen ("2) Paden ..."), in de volgorde van de tekst."""
+    wanted = set(values)
+    out = []
+    for line in text.splitlines():
+        head, sep, label = line.partition(") ")
+        if sep and head in wanted:
+            out.append((head, label.strip()))
+            wanted.discard(head)
+    return tuple(out)
+
+
+def _variant_commands(state: ConversationState) -> Tuple[Tuple[str, str], ...]:
+    if len(state.variants) < 2:
+        return ()
+    commands = []
+    if state.variants[state.current_variant].parent >= 0:
+        commands.append(("ongedaan", "↩️ Ongedaan maken"))
+    if state.redo:
+        commands.append(("opnieuw", "↪️ Opnieuw"))
+    commands.append(("varianten", f"🗂️ Varianten ({len(state.variants)})"))
+    return tuple(commands)
+
+
+def menu_options(state: ConversationState) -> Optional[MenuOptions]:
+    """Keuzes van het menu waar het gesprek nu staat, of None (intake, contact, einde)."""
+    stage = state.stage
+    if stage == "menu":
+        return MenuOptions(_numbered_options(post_offer_choices_text(), ("1", "2", "3")), commands=_variant_commands(state))
+    if stage == "limit_followup":
+        return MenuOptions(_numbered_options(limit_followup_text(), ("1", "2")), commands=_variant_commands(state))
+    if stage == "lower_costs_menu":
+        text = lower_costs_menu_text(state.last_answers)
+        return MenuOptions(_numbered_options(text, lower_costs_options(state.last_answers)), back=True)
+    if stage == "lc_material_part":
+        text = material_part_menu_text(state.last_answers)
+        return MenuOptions(_numbered_options(text, ("1", "2", "3")), multi=True, back=True)
+
+    if stage == "lc_material_choice":
+        part = state.pending_material_part or ("1", "2", "3")
+        text, values = _menu(state, material_choice_menu_text_cheaper, part)
+    elif stage in _CHOICE_STAGE_BUILDERS:
+        text, values = _menu(state, _CHOICE_STAGE_BUILDERS[stage])
+    else:
+        return None
+    if not values:
+        return None
+    options = _numbered_options(text, values)
+    if stage == "lc_basket":
+        commands: Tuple[Tuple[str, str], ...] = ()
+        if state.basket:
+            commands = (("ok", f"🧺 Mandje doorvoeren ({len(state.basket)})"), ("leeg", "Mandje leegmaken"))
+        return MenuOptions(options, multi=True, back=True, commands=commands, submit_label="➕ In/uit mandje")
+    return MenuOptions(options, multi=stage in _MULTI_STAGES, back=True)
+
+
+# =====================
+# Standaardtuinen (snelstart)
+# =====================
+@dataclass(frozen=True)
+class ProfileQuote:
+    """Bij het laden berekend: antwoorden, offerte en alle bespaarmenu's van één standaardtuin."""
+    answers: dict
+    costs: dict
+    offer_text: str
+    menus: Dict[Tuple, Tuple[str, object]]
+
+
+_MATERIAL_PART_COMBOS: Tuple[Tuple[str, ...], ...] = (
+    ("1",), ("2",), ("3",), ("1", "2"), ("1", "3"), ("2", "3"), ("1", "2", "3"),
+)
+
+
+def first_question_text(flow: TuinaanlegFlow) -> str:
+    """Eerste intakevraag, met de standaardtuinen als snelkoppeling."""
+    return flow.get_question() + "\n\n" + profiles_hint_text()
+
+
+def _merge_profile_inputs(inputs: Dict[str, str], overrides: Dict[str, str]) -> Dict[str, str]:
+    """
+    Afwijkingen overschrijven de standaardtuin; genoemde extra wensen komen erbij
+    ("ook beregening" haalt de erfafscheiding van het profiel niet weg).
+    """
+    merged = dict(inputs)
+    for k, v in overrides.items():
+        if k == "overige_wensen" and merged.get(k, "nee") != "nee" and v != "nee":
+            digits = sorted(set(merged[k].replace(",", "")) | set(v.replace(",", "")))
+            v = ",".join(digits)
+        merged[k] = v
+    return merged
+
+
+def _profile_inputs_with(inputs: Dict[str, str], text: str) -> Dict[str, str]:
+    if not any(c.isalpha() or c.isdigit() for c in text):
+        return dict(inputs)
+    return _merge_profile_inputs(inputs, extract_answers(text))
+
+
+def _run_profile_flow(inputs: Dict[str, str]) -> Tuple[TuinaanlegFlow, bool]:
+    """Speelt de ruwe invoer in één keer door de intake (zelfde validatie als bij typen)."""
+    flow = new_flow()
+    prefilled = dict(inputs)
+    first = prefilled.pop(flow.steps[0].key, "")
+    flow.answers["_prefilled"] = prefilled
+    _reply, done = flow.handle(first)
+    return flow, done
+
+
+def _precompute_profile(profile: GardenProfile) -> ProfileQuote:
+    flow, done = _run_profile_flow(profile.input_map())
+    if not done:
+        raise ValueError(f"Standaardtuin {profile.key!r} vult de intake niet volledig in")
+
+    answers = dict(flow.answers)
+    costs = estimate_tuinaanleg_costs(answers)
+
+    menus: Dict[Tuple, Tuple[str, object]] = {}
+    for builder, _next_stage in _CATEGORY_MENUS.values():
+        menus[(builder.__name__,)] = builder(answers, costs)
+    for parts in _MATERIAL_PART_COMBOS:
+        menus[(material_choice_menu_text_cheaper.__name__, parts)] = material_choice_menu_text_cheaper(answers, costs, parts)
+
+    return ProfileQuote(answers=answers, costs=costs, offer_text=format_tuinaanleg_costs_for_customer(costs), menus=menus)
+
+
+def _cached_profile(state: ConversationState) -> Optional[ProfileQuote]:
+    """Alleen bruikbaar zolang de offerte nog exact de standaardtuin is."""
+    if state.profile is None or state.profile_inputs != PROFILES_BY_KEY[state.profile].inputs:
+        return None
+    return _profile_quote(state.profile)
+
+
+def _menu(state: ConversationState, builder: Callable, *args):
+    pq = _cached_profile(state)
+    if pq is not None:
+        hit = pq.menus.get((builder.__name__,) + args)
+        if hit is not None:
+            return hit
+    return builder(state.last_answers, state.last_costs, *args)
+
+
+def _quote_profile(state: ConversationState, profile: GardenProfile, inputs: Dict[str, str]) -> Turn:
+    changed = [k for k, v in inputs.items() if profile.input_map().get(k) != v]
+    intro = f"Uitgegaan van de standaardtuin: {profile.label}."
+    labels = [PREFILL_LABELS.get(k, k) for k in changed if k in PREFILL_LABELS]
+    if labels:
+        intro += " Aangepast: " + ", ".join(labels) + "."
+
+    ordered = tuple(inputs.items())
+    if not changed:
+        pq = _profile_quote(profile.key)
+        answers, costs, offer_text = pq.answers, pq.costs, pq.offer_text
+    else:
+        flow, done = _run_profile_flow(inputs)
+        if not done:
+            # afwijking opent een vraag die de standaardtuin niet beantwoordt: gewoon verder met de intake
+            running = RunningEstimate().update(flow.answers)
+            state = replace(state, stage="intake", flow=flow, running=running, profile=profile.key, profile_inputs=ordered)
+            return state, _text(intro + "\n\n" + flow.get_question())
+        answers = flow.answers
+        costs = estimate_tuinaanleg_costs(answers)
+        offer_text = format_tuinaanleg_costs_for_customer(costs)
+
+    msgs = _text(intro + "\n\nWijkt er iets af? Typ het gewoon, bijv. 'maar 60 m²' of 'zonder overkapping'.")
+    msgs.append(Message("offer", offer_text, costs=costs))
+    answers = {k: _copy_answer_value(v) for k, v in answers.items()}
+    state = replace(
+        _with_variant(state, answers, costs),
+        stage="menu",
+        flow=None,
+        running=None,
+        last_answers=answers,
+        last_costs=costs,
+        profile=profile.key,
+        profile_inputs=ordered,
+    )
+    return _to_menu(state, msgs)
+
+
+# Per standaardtuin berekend bij het eerste gebruik (niet bij import: scheelt ~15 ms koude start).
+# Twee threads kunnen hetzelfde profiel tegelijk berekenen; dat is onschuldig (zelfde uitkomst).
+_PROFILE_QUOTES: Dict[str, ProfileQuote] = {}
+
+
+def _profile_quote(key: str) -> ProfileQuote:
+    pq = _PROFILE_QUOTES.get(key)
+    if pq is None:
+        pq = _PROFILE_QUOTES[key] = _precompute_profile(PROFILES_BY_KEY[key])
+    return pq
+
+
+def warm_profile_quotes() -> None:
+    """Alle standaardtuinen vooraf berekenen (bijv. na het opstarten, of om profielfouten te vinden)."""
+    for p in PROFILES:
+        _profile_quote(p.key)
+
+
+def _stage_contact_details(state: ConversationState, t_raw: str) -> Turn:
+    return _to_end(state, CONTACT_THANKS_TEXT)
+
+
+def _stage_end(state: ConversationState, t_raw: str) -> Turn:
+    return state, []
+
+
+STAGE_HANDLERS: Dict[str, Callable[[ConversationState, str], Turn]] = {
+    "idle": _stage_idle,
+    "intake": _stage_intake,
+    "menu": _stage_menu,
+    "limit_followup": _stage_limit_followup,
+    "lower_costs_menu": _stage_lower_costs_menu,
+    "lc_more_green_choice": _single_choice_stage(more_green_choice_text, apply_set_ratio),
+    "lc_extras_select": _multi_choice_stage(extras_select_menu_text, apply_remove_selected_extras),
+    "lc_material_part": _stage_material_part,
+    "lc_material_choice": _stage_material_choice,
+    "lc_vlonder_choice": _single_choice_stage(vlonder_choice_menu_text, apply_vlonder_change),
+    "lc_erf_remove_select": _multi_choice_stage(erf_remove_select_menu_text, apply_erf_changes),
+    "lc_overview": _single_choice_stage(all_savings_menu_text, apply_saving_action),
+    "lc_basket": _stage_basket,
+    "contact_details": _stage_contact_details,
+    "end": _stage_end,
+}
+
+
+# =====================
+# Engine
+# =====================
+def handle_turn(state: ConversationState, user_input: str) -> Tuple[ConversationState, Tuple[Message, ...]]:
+    """
+    Pure stap: (state, invoer) -> (nieuwe state, assistent-berichten).
+    De meegegeven state wordt nooit aangepast.
+    """
+    t_raw = (user_input or "").strip()
+
+    if state.post_offer_mode and t_raw.lower() in CONTACT_SHORTCUTS:
+        new_state, msgs = _to_contact(state)
+        return new_state, tuple(msgs)
+
+    # Budget op: geen bespaarmenu's meer (die rekenen previews door), ook niet halverwege
+    if not state.budget_ok and state.stage in BUDGETED_STAGES:
+        new_state, msgs = _to_limit(_leave_basket(state))
+        return new_state, tuple(msgs)
+
+    handler = STAGE_HANDLERS.get(state.stage, _stage_end)
+    new_state, msgs = handler(state, t_raw)
+    return new_state, tuple(msgs)
+
+
+def handle_turn_budgeted(
+    state: ConversationState,
+    user_input: str,
+    budget: EngineBudget,
+    session: str,
+    client: Optional[str] = None,
+) -> Tuple[ConversationState, Tuple[Message, ...]]:
+    """
+    handle_turn met rekenbudget: eerst kijken of sessie en clientadres nog budget hebben,
+    daarna de echt gebruikte CPU-tijd van deze beurt afschrijven.
+    """
+    new_state, msgs, cpu_ms = handle_turn_metered(state, user_input, session, budget.allows(session, client))
+    budget.charge(session, client, cpu_ms)
+    return new_state, msgs
+
+
+def handle_turn_metered(
+    state: ConversationState,
+    user_input: str,
+    session: str,
+    budget_ok: bool,
+) -> Tuple[ConversationState, Tuple[Message, ...], float]:
+    """
+    Het rekenwerk van handle_turn_budgeted zonder de budget-store: (state, berichten, CPU-tijd in ms).
+    Voor front-ends die allows()/charge() zelf buiten de beurt om doen (server.py: in een thread,
+    want de SQLite-store kan wachten op een lock).
+    """
+    if budget_ok != state.budget_ok:
+        state = replace(state, budget_ok=budget_ok)
+    w0 = time.perf_counter_ns()
+    t0 = time.thread_time_ns()
+    try:
+        new_state, msgs = handle_turn(state, user_input)
+    except Exception as e:
+        EVENT_LOG.record_error(session, state.stage, user_input, time.perf_counter_ns() - w0, e,
+                               quote_total(state), state.recalc_count)
+        raise
+    cpu_ns = time.thread_time_ns() - t0
+    latency_ns = time.perf_counter_ns() - w0
+    if EVENT_LOG.enabled:
+        EVENT_LOG.record_turn(session, state.stage, new_state.stage, user_input, latency_ns, cpu_ns,
+                              quote_total(new_state), new_state.recalc_count)
+    return new_state, msgs, cpu_ns / 1e6
+
+
+def quote_total(state: ConversationState) -> Optional[Tuple[int, int]]:
+    """(min, max) in euro's: lopend tijdens de intake, daarna de huidige offerte (None zonder bedrag)."""
+    running = state.running_total_range()
+    if running is not None:
+        return running
+    return _total_of(state.last_costs) if state.last_costs else None
+
+
+def record_abandoned(state: ConversationState) -> None:
+    """Telemetrie: het gesprek stopt midden in de intake (reset, stop, sessie verlopen)."""
+    if state.stage == "intake" and state.flow is not None:
+        key = state.flow.current_step_key()
+        if key is not None:
+            INTAKE_TELEMETRY.record_abandoned(key)
@@ -0,0 +1,240 @@
+# eventlog.py
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import re
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional, Tuple
+
+
+# ============================================================
+# ✅ Eventlog per beurt (JSONL)
+#    Eén regel per beurt en per fout: sessie (gehasht), stage voor/na, soort invoer,
+#    latency, lopende offertetotalen en het exceptietype. Gevoed vanuit
+#    conversation.handle_turn_metered (alle front-ends) en main.py (renderfouten).
+#    Op de beurt alleen een tuple op een deque; hashen, classificeren, JSON en
+#    schrijven doet een achtergrondthread per batch, met rotatie op bestandsgrootte.
+#    Uitgeschakeld (default) kost het één attribuut-check per beurt.
+#    Ruwe klantinvoer komt niet in de log (contactgegevens!), alleen de soort en lengte;
+#    de tekst van een exceptie wel (ingekort), die kan een stukje invoer bevatten.
+# ============================================================
+FLUSH_INTERVAL_S_DEFAULT = 1.0
+ROTATE_MB_DEFAULT = 50.0
+BACKUPS_DEFAULT = 5
+MAX_PENDING_EVENTS = 20_000  # daarboven vallen events weg (geteld in `dropped`) i.p.v. geheugen of latency
+WAKE_AT_EVENTS = 1_000       # writer eerder wekken bij een piek
+MESSAGE_MAX_CHARS = 200
+
+_DIGITS_RE = re.compile(r"^\d+(?:\s*[,;/ ]\s*\d+)+$")
+_NUMBER_RE = re.compile(r"^\d+(?:[.,]\d+)?\s*(?:m2|m²|%|meter|m)?$")
+_COMMAND_RE = re.compile(r"^(?:variant|vergelijk|terug|opnieuw|stop|contact|offerte|advies)\b")
+_YES_NO = frozenset({"ja", "j", "yes", "y", "nee", "n", "no"})
+
+
+def input_class(text: str) -> str:
+    """Soort invoer zonder de inhoud: empty, digit, digits, number, yes_no, command of text."""
+    t = text.strip().lower()
+    if not t:
+        return "empty"
+    if t.isdigit():
+        return "digit" if len(t) == 1 else "number"
+    if _DIGITS_RE.match(t):
+        return "digits"
+    if _NUMBER_RE.match(t):
+        return "number"
+    if t in _YES_NO:
+        return "yes_no"
+    if _COMMAND_RE.match(t):
+        return "command"
+    return "text"
+
+
+def session_hash(session: str) -> str:
+    """Sessiesleutels zijn geheimen (server: bearer-token); in de log alleen een korte hash."""
+    import hashlib  # pas hier (writer-thread): _hashlib/OpenSSL kost ~8 ms koude start
+
+    return hashlib.blake2b(session.encode("utf-8"), digest_size=6).hexdigest()
+
+
+def _where(exc: BaseException) -> Optional[str]:
+    import traceback  # alleen op het foutpad
+
+    tb = traceback.extract_tb(exc.__traceback__)
+    if not tb:
+        return None
+    frame = tb[-1]
+    return f"{os.path.basename(frame.filename)}:{frame.lineno}"
+
+
+class EventLog:
+    """
+    record_turn()/record_error() zetten een tuple op de deque (append is atomair, dus zonder lock
+    uit meerdere threads). De writer-thread haalt alles op, maakt er JSON-regels van en schrijft
+    ze met één write(); lukt schrijven niet, dan gaat die batch verloren (`errors`), de chat nooit.
+    """
+
+    def __init__(self) -> None:
+        self._events: deque = deque()
+        self._wake = threading.Event()
+        self._io_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self._fh = None
+        self._size = 0
+        self.path: Optional[str] = None
+        self.written = 0
+        self.dropped = 0
+        self.errors = 0
+        self.enabled = False
+
+    def configure(self, path: str, *, flush_interval_s: float = FLUSH_INTERVAL_S_DEFAULT,
+                  rotate_bytes: int = int(ROTATE_MB_DEFAULT * 1024 * 1024), backups: int = BACKUPS_DEFAULT) -> None:
+        self.path = path
+        self._interval_s = flush_interval_s
+        self._rotate_bytes = rotate_bytes
+        self._backups = backups
+        self._stopping = False
+        self.enabled = True
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="eventlog-writer", daemon=True)
+            self._thread.start()
+
+    # ---------- op de beurt ----------
+    def _push(self, event: Tuple[Any, ...]) -> None:
+        events = self._events
+        if len(events) >= MAX_PENDING_EVENTS:
+            self.dropped += 1
+            return
+        events.append(event)
+        if len(events) >= WAKE_AT_EVENTS:
+            self._wake.set()
+
+    def record_turn(self, session: str, stage: str, next_stage: str, text: str, latency_ns: int, cpu_ns: int,
+                    total: Optional[Tuple[int, int]], recalcs: int) -> None:
+        if not self.enabled:
+            return
+        self._push(("turn", time.time(), session, stage, next_stage, text, latency_ns, cpu_ns, total, recalcs,
+                    None, None, None, None))
+
+    def record_error(self, session: str, stage: str, text: str, latency_ns: int, exc: BaseException,
+                     total: Optional[Tuple[int, int]], recalcs: int, *, phase: str = "engine") -> None:
+        if not self.enabled:
+            return
+        self._push(("error", time.time(), session, stage, None, text, latency_ns, None, total, recalcs,
+                    type(exc).__name__, str(exc)[:MESSAGE_MAX_CHARS], _where(exc), phase))
+
+    # ---------- writer ----------
+    @staticmethod
+    def _to_dict(event: Tuple[Any, ...]) -> Dict[str, Any]:
+        (kind, ts, session, stage, next_stage, text, latency_ns, cpu_ns, total, recalcs,
+         error, message, where, phase) = event
+        out: Dict[str, Any] = {
+            "ts": round(ts, 3),
+            "event": kind,
+            "session": session_hash(session),
+            "stage": stage,
+        }
+        if next_stage is not None:
+            out["next_stage"] = next_stage
+        out["input"] = input_class(text)
+        out["input_len"] = len(text)
+        out["latency_ms"] = round(latency_ns / 1e6, 3)
+        if cpu_ns is not None:
+            out["cpu_ms"] = round(cpu_ns / 1e6, 3)
+        out["total_eur"] = list(total) if total else None
+        out["recalcs"] = recalcs
+        if error is not None:
+            out.update({"error": error, "message": message, "where": where, "phase": phase})
+        return out
+
+    def _rotate(self) -> None:
+        if self._fh is not None:
+            self._fh.close()
+            self._fh = None
+        for i in range(self._backups - 1, 0, -1):
+            src = f"{self.path}.{i}"
+            if os.path.exists(src):
+                os.replace(src, f"{self.path}.{i + 1}")
+        if self._backups > 0:
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+
+    def flush(self) -> None:
+        """Schrijft alles wat klaarstaat (writer-thread; bij afsluiten ook vanuit atexit)."""
+        events = self._events
+        if not events or self.path is None:
+            return
+        with self._io_lock:
+            batch = []
+            while events:
+                batch.append(events.popleft())
+            try:
+                data = "".join(json.dumps(self._to_dict(e), ensure_ascii=False) + "\n" for e in batch)
+                if self._fh is None:
+                    self._fh = open(self.path, "a", encoding="utf-8")
+                    self._size = self._fh.tell()
+                self._fh.write(data)
+                self._fh.flush()
+                self._size += len(data.encode("utf-8"))
+                self.written += len(batch)
+                if self._size >= self._rotate_bytes:
+                    self._rotate()
+            except (OSError, TypeError, ValueError):
+                self.errors += 1  # volgende batch opnieuw; de log mag de chat nooit breken
+                if self._fh is not None:
+                    try:
+                        self._fh.close()
+                    except OSError:
+                        pass
+                    self._fh = None
+
+    def _run(self) -> None:
+        while not self._stopping:
+            self._wake.wait(self._interval_s)
+            self._wake.clear()
+            self.flush()
+
+    def close(self) -> None:
+        self._stopping = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+        self.flush()
+        with self._io_lock:
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+        self.enabled = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {"enabled": self.enabled, "written": self.written, "pending": len(self._events),
+                "dropped": self.dropped, "errors": self.errors}
+
+
+EVENT_LOG = EventLog()
+
+
+def configure_from_env() -> bool:
+    """
+    EVENT_LOG_PATH=/pad/events_{pid}.jsonl zet de eventlog aan (`{pid}` = proces-id: rotatie per proces).
+    EVENT_LOG_FLUSH_S (default 1), EVENT_LOG_ROTATE_MB (default 50), EVENT_LOG_BACKUPS (default 5).
+    """
+    if EVENT_LOG.enabled:
+        return True  # Streamlit voert app.py per run opnieuw uit
+    path = os.getenv("EVENT_LOG_PATH", "").strip()
+    if not path:
+        return False
+    EVENT_LOG.configure(
+        path.replace("{pid}", str(os.getpid())),
+        flush_interval_s=float(os.getenv("EVENT_LOG_FLUSH_S", "") or FLUSH_INTERVAL_S_DEFAULT),
+        rotate_bytes=int(float(os.getenv("EVENT_LOG_ROTATE_MB", "") or ROTATE_MB_DEFAULT) * 1024 * 1024),
+        backups=int(os.getenv("EVENT_LOG_BACKUPS", "") or BACKUPS_DEFAULT),
+    )
+    atexit.register(EVENT_LOG.close)
+    return True
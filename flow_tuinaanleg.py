@@ -3,8 +3,12 @@ from __future__ import annotations
 
 from dataclasses import dataclass, field
 import re
+import time
 from typing import Any, Dict, Optional, Tuple, List
 
+from telemetry import INTAKE_TELEMETRY, OUTCOME_INVALID, OUTCOME_OK, OUTCOME_REENTRY
+from hotpath import timed
+
 
 _M2_RE = re.compile(r"(?P<num>\d+(?:[.,]\d+)?)\s*(?:m2|m²)?", re.IGNORECASE)
 _NUM_RE = re.compile(r"(?P<num>\d+(?:[.,]\d+)?)", re.IGNORECASE)
@@ -43,12 +47,27 @@ def parse_choice(text: str, allowed: Tuple[str, ...]) -> Optional[str]:
     return t if t in allowed else None
 
 
+# ✅ tolerant: "jaa", "ja hoor", "ja graag", "neen", "nee hoor", "nee dank u"
+_YES_RE = re.compile(
+    r"^(?:j+a+|j|y|yes|jep|jazeker|zeker|prima|graag|ok(?:e|ay)?)"
+    r"(?:[\s,]+(?:hoor|graag|zeker|prima|bedankt|dank\s*(?:je|u)(?:wel)?))*[\s.!]*$"
+)
+_NO_RE = re.compile(
+    r"^(?:n+e+n?|n|no|nope|liever\s+niet)"
+    r"(?:[\s,]+(?:hoor|bedankt|dank\s*(?:je|u)(?:wel)?))*[\s.!]*$"
+)
+
+
 def parse_yesno(text: str) -> Optional[bool]:
     t = text.strip().lower()
     if t in ("ja", "j", "yes", "y"):
         return True
     if t in ("nee", "n", "no"):
         return False
+    if _YES_RE.match(t):
+        return True
+    if _NO_RE.match(t):
+        return False
     return None
 
 
@@ -62,10 +81,352 @@ def parse_pct(text: str) -> Optional[int]:
     return v
 
 
+# =====================
+# ✅ Meerdere antwoorden uit één bericht
+# =====================
+_NUM_UNITS = {
+    "nul": 0, "een": 1, "eén": 1, "één": 1, "twee": 2, "drie": 3, "vier": 4, "vijf": 5, "zes": 6,
+    "zeven": 7, "acht": 8, "negen": 9, "tien": 10, "elf": 11, "twaalf": 12, "dertien": 13,
+    "veertien": 14, "vijftien": 15, "zestien": 16, "zeventien": 17, "achttien": 18, "negentien": 19,
+}
+_NUM_TENS = {
+    "twintig": 20, "dertig": 30, "veertig": 40, "vijftig": 50,
+    "zestig": 60, "zeventig": 70, "tachtig": 80, "negentig": 90,
+}
+
+
+def _dutch_below_100(w: str) -> Optional[int]:
+    if w in _NUM_UNITS:
+        return _NUM_UNITS[w]
+    if w in _NUM_TENS:
+        return _NUM_TENS[w]
+    for tens_word, tens in _NUM_TENS.items():
+        if w.endswith(tens_word):
+            prefix = w[: -len(tens_word)]
+            if prefix.endswith("en"):
+                unit = _NUM_UNITS.get(prefix[:-2])
+                if unit is not None and 1 <= unit <= 9:
+                    return tens + unit
+    return None
+
+
+def _dutch_below_1000(w: str) -> Optional[int]:
+    if "honderd" not in w:
+        return _dutch_below_100(w)
+    left, right = w.split("honderd", 1)
+    hundreds = _dutch_below_100(left) if left else 1
+    rest = _dutch_below_100(right) if right else 0
+    if hundreds is None or rest is None or not 1 <= hundreds <= 9:
+        return None
+    return hundreds * 100 + rest
+
+
+def parse_dutch_number_word(word: str) -> Optional[int]:
+    """
+    "tachtig" -> 80, "vijfentwintig" -> 25, "tweehonderdvijftig" -> 250, "duizend" -> 1000.
+    """
+    w = (word or "").strip().lower().replace("ë", "e").replace("é", "e").replace("-", "")
+    if not w:
+        return None
+    if "duizend" in w:
+        left, right = w.split("duizend", 1)
+        thousands = _dutch_below_1000(left) if left else 1
+        rest = _dutch_below_1000(right) if right else 0
+        if thousands is None or rest is None:
+            return None
+        return thousands * 1000 + rest
+    return _dutch_below_1000(w)
+
+
+# Eén precompiled regex, één pass over het bericht
+_TOKEN_RE = re.compile(
+    r"(?P<num>\d+(?:[.,]\d+)?)"
+    r"|(?P<m2>m2|m²|m\^2|vierkante\s+meters?|vierkant)"
+    r"|(?P<pct>%|procent)"
+    r"|(?P<word>[a-zà-ÿ]+)",
+    re.IGNORECASE,
+)
+
+_PART_WORDS = {"oprit": "oprit", "inrit": "oprit", "pad": "paden", "paden": "paden", "paadjes": "paden", "terras": "terras"}
+_ALL_PARTS_WORDS = {"overal", "alles", "allemaal", "helemaal"}
+_MATERIAL_WORDS = {
+    "grind": "1",
+    "beton": "2", "betonklinker": "2", "betonklinkers": "2", "klinker": "2", "klinkers": "2", "tegels": "2",
+    "gebakken": "3", "gebakkenklinkers": "3",
+    "keramiek": "4", "keramisch": "4", "keramische": "4",
+}
+_YESNO_EXTRAS = {
+    "verlichting": "verlichting", "tuinverlichting": "verlichting", "lampen": "verlichting", "spots": "verlichting",
+    "overkapping": "overkapping", "veranda": "overkapping",
+    "gevoegd": "onkruidwerend_gevoegd", "voegen": "onkruidwerend_gevoegd", "voegwerk": "onkruidwerend_gevoegd",
+}
+_OVERIGE_WORDS = {
+    "erfafscheiding": ("1", None), "schutting": ("1", None), "hek": ("1", None),
+    "haag": ("1", "1"), "heg": ("1", "1"),
+    "betonschutting": ("1", "2"),
+    "designschutting": ("1", "3"),
+    "vlonder": ("2", None), "vlonders": ("2", None),
+    "beregening": ("3", None), "sproeiers": ("3", None), "sproei": ("3", None),
+}
+_VLONDER_WORDS = {"zachthout": "1", "hardhout": "2", "composiet": "3"}
+_NEGATIONS = {"geen", "zonder", "niet"}
+_PAVING_WORDS = {"bestrating", "bestraat", "verharding", "verhard", "stenen"}
+_GREEN_WORDS = {"groen"}
+_GAZON_WORDS = {"gazon", "gras", "grasveld"}
+_BEPLANTING_WORDS = {"beplanting", "planten", "border", "borders"}
+_MUCH_WORDS = {"veel", "meer", "vooral", "voornamelijk"}
+_HALF_WORDS = {"half", "helft", "halfhalf"}
+
+_MATERIAL_STEPS = {"materiaal_oprit", "materiaal_paden", "materiaal_terras"}
+_ARTICLE_WORDS = {"een", "eén", "één"}
+_LIST_WORDS = {"en", "of"}
+_MATERIAL_NOUNS = {"tegels", "klinker", "klinkers"}  # na een materiaalwoord: "keramische tegels", "gebakken klinkers"
+
+
+def _tokenize(text: str) -> List[Tuple[str, Any]]:
+    """
+    -> [("num", 80.0), ("m2", None), ("word", "half"), ...]
+    Getalwoorden worden getallen; aangrenzende getalwoorden worden samengevoegd ("twee honderd",
+    "vijf en twintig"). "een" is meestal een lidwoord: alleen een getal vlak voor % ("één" ook voor m2).
+    """
+    tokens: List[Tuple[str, Any]] = []
+    prev_word_num: Optional[str] = None
+    matches = list(_TOKEN_RE.finditer((text or "").lower()))
+    skip_next = False
+    for idx, m in enumerate(matches):
+        if skip_next:
+            skip_next = False
+            continue
+        nxt = matches[idx + 1] if idx + 1 < len(matches) else None
+        kind = m.lastgroup
+        if kind == "num":
+            tokens.append(("num", float(m.group("num").replace(",", "."))))
+            prev_word_num = None
+            continue
+        if kind != "word":
+            tokens.append((kind, None))
+            prev_word_num = None
+            continue
+
+        w = m.group("word")
+        if w == "en" and prev_word_num is not None and nxt is not None and nxt.lastgroup == "word":
+            tens = nxt.group("word")
+            merged = parse_dutch_number_word(prev_word_num + "en" + tens) if tens in _NUM_TENS else None
+            if merged is not None:
+                tokens[-1] = ("num", float(merged))
+                prev_word_num = prev_word_num + "en" + tens
+                skip_next = True
+                continue
+
+        if w in _HALF_WORDS:
+            tokens.append(("num", 50.0))
+            tokens.append(("pct", None))
+            prev_word_num = None
+            continue
+
+        n = parse_dutch_number_word(w)
+        if n is not None and w in _ARTICLE_WORDS:
+            unit = nxt.lastgroup if nxt is not None else None
+            if not (unit == "pct" or (unit == "m2" and w != "een")):
+                n = None
+        if n is not None:
+            if prev_word_num is not None:
+                merged = parse_dutch_number_word(prev_word_num + w)
+                if merged is not None:
+                    tokens[-1] = ("num", float(merged))
+                    prev_word_num = prev_word_num + w
+                    continue
+            tokens.append(("num", float(n)))
+            prev_word_num = w
+            continue
+
+        tokens.append(("word", w))
+        prev_word_num = None
+    return tokens
+
+
+def _ratio_choice(pct: int, *, presets: Dict[int, str], custom: str) -> Tuple[str, Optional[str]]:
+    if pct in presets:
+        return presets[pct], None
+    return custom, str(pct)
+
+
+def extract_answers(text: str, *, current_key: Optional[str] = None) -> Dict[str, str]:
+    """
+    Haalt meerdere antwoorden uit één vrij bericht, bijv.
+    "ca 80 m2, half bestrating, terras keramiek, met verlichting en vlonder".
+
+    Geeft {step_key: ruwe invoer} terug in precies het formaat dat de betreffende Step
+    verwacht ("80", "2", "4", "ja", "2", ...), zodat TuinaanlegFlow._validate de
+    gewone controle doet. Onduidelijke stukken worden genegeerd (dan vragen we het gewoon).
+    """
+    tokens = _tokenize(text)
+    out: Dict[str, str] = {}
+    if not tokens:
+        return out
+
+    words = [v if k == "word" else None for k, v in tokens]
+    overige: List[str] = []
+    overige_neg: set = set()
+    erf_types: List[str] = []
+
+    negated_at: set = set()
+
+    def negated(i: int) -> bool:
+        # "zonder overkapping en verlichting": de ontkenning geldt voor de hele opsomming
+        if any(words[j] in _NEGATIONS for j in range(max(0, i - 2), i)) or (
+            i - 2 in negated_at and words[i - 1] in _LIST_WORDS
+        ):
+            negated_at.add(i)
+            return True
+        return False
+
+    def pct_at(i: int) -> Optional[int]:
+        # "<getal> % <woord>" of "<getal> <woord>" of "<woord> <getal> %"
+        for j in (i - 2, i - 1):
+            if 0 <= j < len(tokens) and tokens[j][0] == "num":
+                nxt = tokens[j + 1][0] if j + 1 < len(tokens) else None
+                if nxt == "pct" or j == i - 1:
+                    return parse_pct(str(int(tokens[j][1])))
+        if i + 2 < len(tokens) and tokens[i + 1][0] == "num" and tokens[i + 2][0] == "pct":
+            return parse_pct(str(int(tokens[i + 1][1])))
+        return None
+
+    def much_before(i: int) -> bool:
+        return any(words[j] in _MUCH_WORDS for j in range(max(0, i - 2), i))
+
+    materials: List[Tuple[int, int, str]] = []  # (eerste token, laatste token, keuze)
+    parts: List[Tuple[int, str]] = []
+    all_parts_at: List[int] = []
+
+    for i, (kind, val) in enumerate(tokens):
+        if kind == "num" and i + 1 < len(tokens) and tokens[i + 1][0] == "m2":
+            v = parse_m2(f"{val:g}")
+            if v is not None:
+                out["tuin_m2"] = f"{v:g}"
+            continue
+        if kind == "m2" and i + 2 < len(tokens) and words[i + 1] == "of" and tokens[i + 2][0] == "num":
+            # "een m2 of 80" (ongeveer 80 m²)
+            v = parse_m2(f"{tokens[i + 2][1]:g}")
+            if v is not None:
+                out["tuin_m2"] = f"{v:g}"
+            continue
+        if kind != "word":
+            continue
+
+        if val in _PAVING_WORDS or val in _GREEN_WORDS:
+            pct = pct_at(i)
+            if pct is not None:
+                b = pct if val in _PAVING_WORDS else 100 - pct
+                choice, custom = _ratio_choice(b, presets={70: "1", 50: "2", 30: "3"}, custom="4")
+                out["verhouding_bestrating_groen"] = choice
+                if custom is not None:
+                    out["bestrating_pct"] = custom  # de bevestigingsvraag stelt de flow zelf
+            elif much_before(i):
+                out["verhouding_bestrating_groen"] = "1" if val in _PAVING_WORDS else "3"
+            continue
+
+        if val in _GAZON_WORDS or val in _BEPLANTING_WORDS:
+            pct = pct_at(i)
+            if pct is not None:
+                ga = pct if val in _GAZON_WORDS else 100 - pct
+                choice, custom = _ratio_choice(ga, presets={70: "1", 50: "2", 30: "3"}, custom="4")
+                out["verhouding_gazon_beplanting"] = choice
+                if custom is not None:
+                    out["gazon_pct"] = custom
+            elif much_before(i):
+                out["verhouding_gazon_beplanting"] = "1" if val in _GAZON_WORDS else "3"
+            continue
+
+        if val in _PART_WORDS:
+            parts.append((i, _PART_WORDS[val]))
+            continue
+        if val in _ALL_PARTS_WORDS:
+            all_parts_at.append(i)
+            continue
+        if val in _MATERIAL_WORDS:
+            if val in _MATERIAL_NOUNS and materials and materials[-1][1] == i - 1:
+                materials[-1] = (materials[-1][0], i, materials[-1][2])  # het eerste woord bepaalt
+                continue
+            materials.append((i, i, _MATERIAL_WORDS[val]))
+            continue
+
+        if val in _YESNO_EXTRAS:
+            out[_YESNO_EXTRAS[val]] = "nee" if negated(i) else "ja"
+            continue
+
+        if val in _VLONDER_WORDS:
+            out["vlonder_type"] = _VLONDER_WORDS[val]
+            if "2" not in overige:
+                overige.append("2")
+            continue
+
+        if val == "design" and i + 1 < len(tokens) and words[i + 1] == "schutting":
+            erf_types.append("3")
+            continue
+
+        if val in _OVERIGE_WORDS:
+            code, erf_type = _OVERIGE_WORDS[val]
+            if negated(i):
+                overige_neg.add(code)
+                continue
+            if code not in overige:
+                overige.append(code)
+            if erf_type and erf_type not in erf_types:
+                erf_types.append(erf_type)
+
+    # materiaal koppelen aan het dichtstbijzijnde onderdeel (max 3 tokens afstand),
+    # plus opsommingen ervoor: "paden en terras gebakken"
+    part_at = dict(parts)
+    for start, end, choice in materials:
+        best: Optional[Tuple[int, int]] = None
+        for pi, _part in parts:
+            d = pi - end if pi > end else start - pi
+            if d <= 3 and (best is None or d < best[0]):
+                best = (d, pi)
+        if best is not None:
+            pi = best[1]
+            out[f"materiaal_{part_at[pi]}"] = choice
+            while pi - 2 in part_at and words[pi - 1] in ("en", "of"):
+                pi -= 2
+                out[f"materiaal_{part_at[pi]}"] = choice
+        elif any((ai - end if ai > end else start - ai) <= 3 for ai in all_parts_at):
+            for part in ("oprit", "paden", "terras"):
+                out[f"materiaal_{part}"] = choice
+        elif current_key in _MATERIAL_STEPS:
+            out[current_key] = choice
+
+    if erf_types and "1" not in overige:
+        overige.append("1")
+    overige = [c for c in overige if c not in overige_neg]
+    if overige:
+        out["overige_wensen"] = ",".join(sorted(overige))
+    if erf_types:
+        out["erfafscheiding_type"] = ",".join(sorted(erf_types))
+
+    return out
+
+
 def format_eur_range(min_v: int, max_v: int) -> str:
     return f"€{min_v:,}".replace(",", ".") + "–" + f"€{max_v:,}".replace(",", ".")
 
 
+PREFILL_LABELS = {
+    "tuin_m2": "tuinoppervlak",
+    "verhouding_bestrating_groen": "verhouding bestrating/groen",
+    "verhouding_gazon_beplanting": "verhouding gazon/beplanting",
+    "materiaal_oprit": "materiaal oprit",
+    "materiaal_paden": "materiaal paden",
+    "materiaal_terras": "materiaal terras",
+    "onkruidwerend_gevoegd": "voegen",
+    "overkapping": "overkapping",
+    "verlichting": "verlichting",
+    "overige_wensen": "overige wensen",
+    "erfafscheiding_type": "type erfafscheiding",
+    "vlonder_type": "type vlonder",
+}
+
+
 @dataclass
 class Step:
     key: str
@@ -75,15 +436,29 @@ class Step:
     error_prompt: Optional[str] = None
 
 
+def compile_steps(prijzen: Dict[str, Tuple[int, int]]) -> Tuple["Step", ...]:
+    """
+    Bouwt de stappen (met prijsteksten) één keer op. Stappen worden nooit aangepast,
+    dus alle flows met dezelfde prijstabel kunnen ze delen: TuinaanlegFlow(prijzen=..., steps=...).
+    """
+    return TuinaanlegFlow(prijzen=prijzen).steps
+
+
 @dataclass
 class TuinaanlegFlow:
     prijzen: Dict[str, Tuple[int, int]] = field(default_factory=dict)
     step_index: int = 0
     answers: Dict[str, Any] = field(default_factory=dict)
+    # Optioneel vooraf opgebouwde stappen (zie compile_steps); anders per flow opgebouwd
+    steps: Tuple[Step, ...] = field(default=(), repr=False)
 
     def __post_init__(self):
-        self.steps = self._build_steps()
+        if not self.steps:
+            self.steps = self._build_steps()
         self._init_answers()
+        # telemetrie: moment waarop de huidige vraag gesteld is + uitkomst van de laatste stap
+        self._asked_ns = time.perf_counter_ns()
+        self._outcome = OUTCOME_OK
 
     def _init_answers(self) -> None:
         self.answers = {
@@ -131,6 +506,7 @@ class TuinaanlegFlow:
             "_erfafscheiding_idx": 0,
             "_erfafscheiding_current_type": None,
             "_erfafscheiding_current_meter": None,
+            "_prefilled": {},  # step_key -> ruwe invoer, uit eerdere vrije berichten (extract_answers)
         }
 
     def is_done(self) -> bool:
@@ -209,7 +585,7 @@ class TuinaanlegFlow:
         if not t:
             return None
 
-        if t in ("nee", "n", "no"):
+        if parse_yesno(t) is False:
             return ("nee",)
 
         digits = re.findall(r"\d", t)
@@ -282,13 +658,80 @@ class TuinaanlegFlow:
     # -------------------------
     # Main handler
     # -------------------------
+    def current_step_key(self) -> Optional[str]:
+        return None if self.is_done() else self.steps[self.step_index].key
+
+    @timed
     def handle(self, user_text: str) -> Tuple[str, bool]:
+        """
+        Verwerkt één bericht. Staan er meerdere antwoorden in (zie extract_answers),
+        dan worden de bijbehorende stappen meteen ingevuld en overgeslagen.
+        Met telemetrie aan wordt per gestelde stap tijd en uitkomst geteld (zie telemetry.py).
+        """
+        tel = INTAKE_TELEMETRY
+        if not tel.enabled or self.is_done():
+            return self._handle(user_text)
+
+        key = self.steps[self.step_index].key
+        self._outcome = OUTCOME_OK
+        t0 = time.perf_counter_ns()
+        reply, done = self._handle(user_text)
+        t1 = time.perf_counter_ns()
+        tel.record_turn(key, t1 - t0, t0 - self._asked_ns, self._outcome, done)
+        self._asked_ns = t1
+        return reply, done
+
+    def _handle(self, user_text: str) -> Tuple[str, bool]:
+        if self.is_done():
+            return self.get_question(), True
+
+        current_key = self.steps[self.step_index].key
+        if any(c.isalpha() for c in user_text or ""):
+            self._store_prefilled(extract_answers(user_text, current_key=current_key))
+
+        prefilled: Dict[str, str] = self.answers["_prefilled"]
+        auto_filled: List[str] = []
+
+        raw = prefilled.pop(current_key, None)
+        if raw is not None and self._validate(self.steps[self.step_index], raw)[0]:
+            auto_filled.append(current_key)
+            reply, done = self._handle_step(raw)
+        else:
+            reply, done = self._handle_step(user_text)
+
+        # doorlopen zolang de volgende stap al beantwoord is
+        while not done and not self.is_done():
+            step = self.steps[self.step_index]
+            raw = prefilled.pop(step.key, None)
+            if raw is None or not self._validate(step, raw)[0]:
+                break
+            auto_filled.append(step.key)
+            reply, done = self._handle_step(raw)
+
+        # alleen melden wat verder ging dan de gestelde vraag
+        labels = [PREFILL_LABELS[k] for k in auto_filled if k != current_key and k in PREFILL_LABELS]
+        if labels:
+            reply = "Al door u aangegeven: " + ", ".join(labels) + ".\n\n" + reply
+        return reply, done
+
+    def _store_prefilled(self, facts: Dict[str, str]) -> None:
+        if not facts:
+            return
+        index_of = {s.key: i for i, s in enumerate(self.steps)}
+        prefilled: Dict[str, str] = self.answers["_prefilled"]
+        for k, v in facts.items():
+            # stappen die al achter ons liggen niet meer invullen
+            if index_of.get(k, -1) >= self.step_index:
+                prefilled[k] = v
+
+    def _handle_step(self, user_text: str) -> Tuple[str, bool]:
         if self.is_done():
             return self.get_question(), True
 
         step = self.steps[self.step_index]
         ok, value = self._validate(step, user_text)
         if not ok:
+            self._outcome = OUTCOME_INVALID
             return (step.error_prompt or step.prompt), False
 
         # -------------------------
@@ -304,6 +747,7 @@ class TuinaanlegFlow:
             self.answers["bestrating_pct"] = None
             self.answers["groen_pct"] = None
             self.answers["confirm_bestrating_groen"] = None
+            self._outcome = OUTCOME_REENTRY
             self._goto_step("bestrating_pct")
             return "Helemaal goed. Vul het opnieuw in: welk percentage wordt bestrating? (0–100%)", False
 
@@ -316,6 +760,7 @@ class TuinaanlegFlow:
             self.answers["gazon_pct"] = None
             self.answers["beplanting_pct"] = None
             self.answers["confirm_gazon_beplanting"] = None
+            self._outcome = OUTCOME_REENTRY
             self._goto_step("gazon_pct")
             return "Helemaal goed. Vul het opnieuw in: welk percentage van het groen wordt gazon? (0–100%)", False
 
@@ -329,6 +774,7 @@ class TuinaanlegFlow:
             self.answers["paden_pct"] = None
             self.answers["terras_pct"] = None
             self.answers["confirm_oprit_paden_terras"] = None
+            self._outcome = OUTCOME_REENTRY
             self._goto_step("oprit_pct")
             return "Helemaal goed. Vul het opnieuw in: welk percentage wordt oprit? (0–100%)", False
 
@@ -466,6 +912,7 @@ class TuinaanlegFlow:
                 self.answers["paden_pct"] = None
                 self.answers["terras_pct"] = None
                 self.answers["confirm_oprit_paden_terras"] = None
+                self._outcome = OUTCOME_INVALID
                 self._goto_step("oprit_pct")
                 return (
                     f"Dit is samen {s}%. Dat kan niet (max 100%). "
@@ -0,0 +1,182 @@
+# hotpath.py
+from __future__ import annotations
+
+import atexit
+import functools
+import os
+import threading
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Tuple, TypeVar
+
+
+# ============================================================
+# ✅ Timing van de hot paths (aantal aanroepen + latency-histogram)
+#    @timed op prijsberekening, menubuilders, apply_*-functies, formatters en
+#    TuinaanlegFlow.handle. Uit (default) kost een aanroep één attribuut-check
+#    (~0,2 µs, niet meetbaar in een replay). Aan: ~0,3 µs extra per aanroep
+#    (een replay van 1.500 gesprekken doet ~460k aanroepen: +2–3%); elke functie
+#    telt direct in haar eigen histogram, zonder lock of buffer.
+#    Export in Prometheus-tekstformaat: GET /metrics (server.py) of een bestand
+#    voor de textfile-collector van node_exporter (HOTPATH_METRICS_PATH).
+# ============================================================
+METRIC_NAME = "tuinbot_hotpath_seconds"
+
+# Bovengrenzen in seconden: de engine zit tussen ~20 µs (menutekst) en een paar ms (overzicht/mandje)
+BUCKETS_S: Tuple[float, ...] = (
+    0.000025, 0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+)
+_BUCKETS_NS: Tuple[int, ...] = tuple(int(b * 1e9) for b in BUCKETS_S)
+
+FLUSH_INTERVAL_S_DEFAULT = 15.0
+
+
+class Histogram:
+    """
+    Tellingen per bucket (laatste = +Inf) + som. Het aantal aanroepen is de som van de buckets,
+    dus _count en de +Inf-bucket kloppen altijd met elkaar. Zonder lock: bij gelijktijdige threads
+    kan onder de GIL heel af en toe een telling wegvallen; voor latency-statistiek is dat acceptabel.
+    """
+    __slots__ = ("counts", "sum_ns")
+
+    def __init__(self) -> None:
+        self.counts = [0] * (len(_BUCKETS_NS) + 1)
+        self.sum_ns = 0
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+
+class HotpathRegistry:
+    """Histogrammen per naam; cumulatief over de levensduur van het proces (Prometheus-counters)."""
+
+    def __init__(self) -> None:
+        self._hists: Dict[str, Histogram] = {}
+        self.enabled = False
+
+    def histogram(self, name: str) -> Histogram:
+        h = self._hists.get(name)
+        if h is None:
+            h = self._hists[name] = Histogram()
+        return h
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        """Per naam (alleen aangeroepen paden): calls, total_ms, mean_us en de bucket-tellingen."""
+        out: Dict[str, Dict[str, Any]] = {}
+        for name, h in sorted(self._hists.items()):
+            counts = list(h.counts)
+            calls = sum(counts)
+            if not calls:
+                continue
+            out[name] = {
+                "calls": calls,
+                "total_ms": round(h.sum_ns / 1e6, 3),
+                "mean_us": round(h.sum_ns / calls / 1e3, 2),
+                "buckets": counts,
+            }
+        return out
+
+    def prometheus_text(self) -> str:
+        lines = [
+            f"# HELP {METRIC_NAME} Duur van de hot paths van de tuinaanleg-engine (per functie).",
+            f"# TYPE {METRIC_NAME} histogram",
+        ]
+        for name, h in sorted(self._hists.items()):
+            counts, sum_ns = list(h.counts), h.sum_ns
+            cumulative = 0
+            for bound, n in zip(BUCKETS_S, counts):
+                cumulative += n
+                lines.append(f'{METRIC_NAME}_bucket{{fn="{name}",le="{bound:g}"}} {cumulative}')
+            cumulative += counts[-1]
+            lines.append(f'{METRIC_NAME}_bucket{{fn="{name}",le="+Inf"}} {cumulative}')
+            lines.append(f'{METRIC_NAME}_sum{{fn="{name}"}} {sum_ns / 1e9:.9f}')
+            lines.append(f'{METRIC_NAME}_count{{fn="{name}"}} {cumulative}')
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        """Alle tellingen op nul (tests/benchmarks); de histogrammen zelf blijven aan hun functie gekoppeld."""
+        for h in self._hists.values():
+            h.counts[:] = [0] * len(h.counts)
+            h.sum_ns = 0
+
+
+HOTPATH = HotpathRegistry()
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+
+def timed(fn: F) -> F:
+    """
+    Decorator voor een hot path; de naam in de export is de __qualname__ (bijv. TuinaanlegFlow.handle).
+    functools.wraps houdt __name__ gelijk (conversation._menu gebruikt die als cachesleutel).
+    """
+    registry = HOTPATH
+    hist = registry.histogram(fn.__qualname__)
+    counts = hist.counts
+    bounds = _BUCKETS_NS
+    perf_ns = time.perf_counter_ns
+
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        if not registry.enabled:
+            return fn(*args, **kwargs)
+        t0 = perf_ns()
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            ns = perf_ns() - t0
+            counts[bisect_left(bounds, ns)] += 1
+            hist.sum_ns += ns
+
+    return wrapper  # type: ignore[return-value]
+
+
+# =====================
+# Export naar bestand (node_exporter textfile-collector)
+# =====================
+def write_prometheus_file(path: str) -> None:
+    """Atomair (tmp + rename), zodat de collector nooit een half bestand leest."""
+    tmp = f"{path}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(HOTPATH.prometheus_text())
+    os.replace(tmp, path)
+
+
+def _file_writer(path: str, interval_s: float) -> None:
+    while True:
+        time.sleep(interval_s)
+        try:
+            write_prometheus_file(path)
+        except OSError:
+            pass  # volgende ronde opnieuw; metrics mogen de chat nooit breken
+
+
+def configure_from_env() -> bool:
+    """
+    HOTPATH_METRICS=1 zet de timing aan (voor GET /metrics in server.py).
+    HOTPATH_METRICS_PATH=/pad/tuinbot_{pid}.prom zet hem ook aan en schrijft elke
+    HOTPATH_METRICS_FLUSH_S seconden (default 15) een bestand; `{pid}` wordt vervangen door het proces-id,
+    zodat meerdere processen elk hun eigen bestand hebben.
+    """
+    if HOTPATH.enabled:
+        return True  # Streamlit voert app.py per run opnieuw uit
+    flag = os.getenv("HOTPATH_METRICS", "").strip() in {"1", "true", "True", "yes", "YES"}
+    path = os.getenv("HOTPATH_METRICS_PATH", "").strip()
+    if not (flag or path):
+        return False
+
+    HOTPATH.enabled = True
+    if path:
+        path = path.replace("{pid}", str(os.getpid()))
+        interval = float(os.getenv("HOTPATH_METRICS_FLUSH_S", "") or FLUSH_INTERVAL_S_DEFAULT)
+        threading.Thread(target=_file_writer, args=(path, interval), name="hotpath-metrics", daemon=True).start()
+        atexit.register(write_prometheus_file, path)
+    return True
+
+
+def top_paths(n: int = 10) -> List[Tuple[str, int, float]]:
+    """(naam, aanroepen, totaal ms), gesorteerd op totale tijd: waar gaat de CPU heen?"""
+    snap = HOTPATH.snapshot()
+    rows = [(name, s["calls"], s["total_ms"]) for name, s in snap.items()]
+    return sorted(rows, key=lambda r: -r[2])[:n]
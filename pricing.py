@@ -1,7 +1,11 @@
 # pricing.py
 from __future__ import annotations
 
-from typing import Dict, Tuple, List, Any
+import json
+from dataclasses import dataclass, field
+from typing import Callable, Dict, Tuple, List, Any, Optional
+
+from hotpath import timed
 
 
 # ✅ Single source of truth: prijzen staan alleen hier
@@ -326,50 +330,74 @@ def format_tuinaanleg_choices_for_customer(costs: Dict[str, Any]) -> str:
 
 # ============================================================
 # ✅ Globaal kostenoverzicht tuinaanleg op basis van flow
+#
+#    Opgebouwd uit losse secties (verharding, grondwerk, zaagwerk, ...).
+#    Elke sectie leest alleen de velden uit _CostContext die in SECTIONS
+#    staan; zo kan RunningEstimate alleen de secties herberekenen waarvan
+#    een invoer is veranderd.
 # ============================================================
-def estimate_tuinaanleg_costs(answers: Dict[str, Any]) -> Dict[str, Any]:
-    """
-    Rekent met:
-    - tuin_m2
-    - verhouding_bestrating_groen
-    - verhouding_gazon_beplanting
-    - oprit/paden/terras percentages: oprit_pct, paden_pct, terras_pct
-    - materialen: materiaal_oprit, materiaal_paden, materiaal_terras
-    - onkruidwerend_gevoegd (voegen alleen op straatwerk, niet op grind)
-    - ✅ grondwerk (altijd): afvoer/aanvoer in m³ o.b.v. dieptes per onderdeel
-    - zaagwerk
-    - overige_wensen + vlonder_type
-    - ✅ erfafscheiding (MEERDERE): erfafscheiding_items[] met type/meter/poortdeur
-    - ✅ beregening: scope -> m² berekening
-    """
+Line = Tuple[Dict[str, Any], Optional[Tuple[float, float]]]
+
+
+@dataclass(frozen=True)
+class _CostContext:
+    m2: float
+    ratio_bg: Any
+    ratio_gb: Any
+    voegen: bool
+    overkapping: bool
+    verlichting: bool
+    overige: Any
+    vlonder_type: str
+    beregening_scope: str
+
+    oprit_pct: Any
+    paden_pct: Any
+    terras_pct: Any
+    oprit_pct_i: int
+    paden_pct_i: int
+    terras_pct_i: int
+    mat_oprit: str
+    mat_paden: str
+    mat_terras: str
+
+    paving_share: float
+    paving_m2: float
+    green_m2: float
+    gazon_m2: float
+    border_m2: float
+    oprit_m2: float
+    paden_m2: float
+    terras_m2: float
+    straatwerk_m2: float
+
+    erf_gevraagd: bool
+    erf_items: Tuple[Tuple[str, float, bool], ...]  # (type, meter, poortdeur)
+    erf_items_count: int
+
+    has_beregening: bool
+    has_vlonder: bool
+    overige_rest: Tuple[str, ...]
+
+
+def _safe_int(x, default: int) -> int:
+    try:
+        return int(x)
+    except Exception:
+        return default
+
 
+def _cost_context(answers: Dict[str, Any]) -> Optional[_CostContext]:
     m2 = float(answers.get("tuin_m2") or 0)
     if m2 <= 0:
-        return {"error": "tuin_m2 ontbreekt of is ongeldig"}
+        return None
 
     ratio_bg = answers.get("verhouding_bestrating_groen")
     ratio_gb = answers.get("verhouding_gazon_beplanting")
 
-    voegen = answers.get("onkruidwerend_gevoegd") is True
-    overkapping = answers.get("overkapping") is True
-    verlichting = answers.get("verlichting") is True
-
     overige = answers.get("overige_wensen") or []
-    vlonder_type = (answers.get("vlonder_type") or "").strip().lower()
-    beregening_scope = (answers.get("beregening_scope") or "").strip().lower()
-
-    oprit_pct = answers.get("oprit_pct")
-    paden_pct = answers.get("paden_pct")
-    terras_pct = answers.get("terras_pct")
-    mat_oprit = (answers.get("materiaal_oprit") or "").strip().lower()
-    mat_paden = (answers.get("materiaal_paden") or "").strip().lower()
-    mat_terras = (answers.get("materiaal_terras") or "").strip().lower()
-
     overige_clean = [str(x).strip().lower() for x in overige if str(x).strip()]
 
-    breakdown: List[Dict[str, Any]] = []
-    total: Tuple[float, float] = (0.0, 0.0)
-
     # 1) Verhouding bestrating/groen -> schatting bestratingsm²
     share_map_bg = {"70_30": 0.70, "50_50": 0.50, "30_70": 0.30}
     paving_share = share_map_bg.get(ratio_bg, 0.50)
@@ -386,14 +414,10 @@ def estimate_tuinaanleg_costs(answers: Dict[str, Any]) -> Dict[str, Any]:
     gazon_m2 = green_m2 * gazon_share
     border_m2 = green_m2 * beplanting_share
 
-    # ------------------------------------------------------------
     # 3) Verharding per onderdeel (oprit / paden / terras) + materiaalkeuze
-    # ------------------------------------------------------------
-    def _safe_int(x, default: int) -> int:
-        try:
-            return int(x)
-        except Exception:
-            return default
+    oprit_pct = answers.get("oprit_pct")
+    paden_pct = answers.get("paden_pct")
+    terras_pct = answers.get("terras_pct")
 
     if oprit_pct is None or paden_pct is None or terras_pct is None:
         oprit_pct_i, paden_pct_i, terras_pct_i = 0, 0, 100
@@ -411,392 +435,456 @@ def estimate_tuinaanleg_costs(answers: Dict[str, Any]) -> Dict[str, Any]:
     paden_m2 = paving_m2 * (paden_pct_i / s_pct)
     terras_m2 = paving_m2 * (terras_pct_i / s_pct)
 
-    if not mat_oprit:
-        mat_oprit = "beton"
-    if not mat_paden:
-        mat_paden = "beton"
-    if not mat_terras:
-        mat_terras = "beton"
-
-    def material_to_key(material: str) -> str:
-        material = (material or "").strip().lower()
-        if material == "keramiek":
-            return "keramisch_straatwerk_per_m2"
-        if material == "grind":
-            return "grind_per_m2"
-        return "beton_gebakken_straatwerk_per_m2"
-
-    def material_pretty(material: str) -> str:
-        material = (material or "").strip().lower()
-        if material == "keramiek":
-            return "Keramiek"
-        if material == "grind":
-            return "Grind"
-        if material == "gebakken":
-            return "Gebakken klinkers"
-        return "Beton"
-
-    def add_surface_cost(part_label: str, m2_part: float, material: str) -> None:
-        nonlocal total
+    mat_oprit = (answers.get("materiaal_oprit") or "").strip().lower() or "beton"
+    mat_paden = (answers.get("materiaal_paden") or "").strip().lower() or "beton"
+    mat_terras = (answers.get("materiaal_terras") or "").strip().lower() or "beton"
+
+    straatwerk_m2 = 0.0
+    for m2_part, mat in ((oprit_m2, mat_oprit), (paden_m2, mat_paden), (terras_m2, mat_terras)):
+        if (mat or "").strip().lower() != "grind":
+            straatwerk_m2 += float(m2_part)
+
+    # Erfafscheiding (MEERDERE items)
+    erf_gevraagd = any(str(x).strip().lower() == "erfafscheiding" for x in (overige or []))
+    items = answers.get("erfafscheiding_items") or []
+
+    # backward compat: oude single-velden (als iemand nog oude flow gebruikt)
+    old_type = (answers.get("erfafscheiding_type") or "").strip().lower()
+    old_meter = _to_float(answers.get("erfafscheiding_meter"))
+    old_poort = answers.get("poortdeur")
+    if (not items) and old_type and old_meter > 0:
+        items = [{"type": old_type, "meter": old_meter, "poortdeur": (old_poort is True) if old_poort is not None else None}]
+
+    erf_items = tuple(
+        ((it.get("type") or "").strip().lower(), _to_float(it.get("meter")), it.get("poortdeur") is True)
+        for it in items
+    ) if erf_gevraagd else ()
+
+    overige_rest = list(overige_clean)
+    if erf_gevraagd and items:
+        overige_rest = [x for x in overige_rest if x != "erfafscheiding"]
+    has_beregening = "beregening" in overige_rest
+    overige_rest = [x for x in overige_rest if x != "beregening"]
+    has_vlonder = "vlonder" in overige_rest
+    overige_rest = [x for x in overige_rest if x != "vlonder"]
+
+    return _CostContext(
+        m2=m2,
+        ratio_bg=ratio_bg,
+        ratio_gb=ratio_gb,
+        voegen=answers.get("onkruidwerend_gevoegd") is True,
+        overkapping=answers.get("overkapping") is True,
+        verlichting=answers.get("verlichting") is True,
+        overige=overige,
+        vlonder_type=(answers.get("vlonder_type") or "").strip().lower(),
+        beregening_scope=(answers.get("beregening_scope") or "").strip().lower(),
+        oprit_pct=oprit_pct,
+        paden_pct=paden_pct,
+        terras_pct=terras_pct,
+        oprit_pct_i=oprit_pct_i,
+        paden_pct_i=paden_pct_i,
+        terras_pct_i=terras_pct_i,
+        mat_oprit=mat_oprit,
+        mat_paden=mat_paden,
+        mat_terras=mat_terras,
+        paving_share=paving_share,
+        paving_m2=paving_m2,
+        green_m2=green_m2,
+        gazon_m2=gazon_m2,
+        border_m2=border_m2,
+        oprit_m2=oprit_m2,
+        paden_m2=paden_m2,
+        terras_m2=terras_m2,
+        straatwerk_m2=straatwerk_m2,
+        erf_gevraagd=erf_gevraagd,
+        erf_items=erf_items,
+        erf_items_count=len(items) if erf_gevraagd else 0,
+        has_beregening=has_beregening,
+        has_vlonder=has_vlonder,
+        overige_rest=tuple(overige_rest),
+    )
+
+
+def _material_to_key(material: str) -> str:
+    material = (material or "").strip().lower()
+    if material == "keramiek":
+        return "keramisch_straatwerk_per_m2"
+    if material == "grind":
+        return "grind_per_m2"
+    return "beton_gebakken_straatwerk_per_m2"
+
+
+def _material_pretty(material: str) -> str:
+    material = (material or "").strip().lower()
+    if material == "keramiek":
+        return "Keramiek"
+    if material == "grind":
+        return "Grind"
+    if material == "gebakken":
+        return "Gebakken klinkers"
+    return "Beton"
+
+
+def _volumes(c: _CostContext) -> Dict[str, float]:
+    # Paden + Terras: 20 cm afvoer, 15 cm zand; Oprit: 35 cm afvoer, 25 cm puin, 5 cm zand
+    paden_terras_m2 = float(c.paden_m2) + float(c.terras_m2)
+    oprit_m2_f = float(c.oprit_m2)
+    return {
+        "grond_afvoer_paden_terras": paden_terras_m2 * 0.20,
+        "zand_paden_terras": paden_terras_m2 * 0.15,
+        "grond_afvoer_oprit": oprit_m2_f * 0.35,
+        "puin_oprit": oprit_m2_f * 0.25,
+        "zand_oprit": oprit_m2_f * 0.05,
+    }
+
+
+def _zaag_m1(c: _CostContext) -> Tuple[float, float]:
+    if c.straatwerk_m2 > 0.01:
+        return c.straatwerk_m2 * 0.3, c.straatwerk_m2 * 0.5
+    return 0.0, 0.0
+
+
+# ------------------------------------------------------------
+# 3) Verharding (oprit / paden / terras)
+# ------------------------------------------------------------
+def _section_verharding(c: _CostContext) -> List[Line]:
+    lines: List[Line] = []
+    for part_label, m2_part, material in (
+        ("Oprit", c.oprit_m2, c.mat_oprit),
+        ("Paden", c.paden_m2, c.mat_paden),
+        ("Terras", c.terras_m2, c.mat_terras),
+    ):
         if m2_part <= 0.01:
-            return
+            continue
 
-        key = material_to_key(material)
+        key = _material_to_key(material)
         unit_range = PRIJZEN.get(key, (60, 120))
         rng = _range_mul((float(unit_range[0]), float(unit_range[1])), m2_part)
-        total = _range_add(total, rng)
 
-        breakdown.append({
+        lines.append(({
             "key": key,
-            "label": f"{part_label} – {material_pretty(material)}",
+            "label": f"{part_label} – {_material_pretty(material)}",
             "unit": _unit(key, "€/m²"),
             "qty": int(round(m2_part)),
             "range_eur": [_eur(rng[0]), _eur(rng[1])],
             "notes": "Indicatief; onderbouw/fundering, snijwerk en complexiteit beïnvloeden de prijs."
-        })
-
-    add_surface_cost("Oprit", oprit_m2, mat_oprit)
-    add_surface_cost("Paden", paden_m2, mat_paden)
-    add_surface_cost("Terras", terras_m2, mat_terras)
-
-    straatwerk_m2 = 0.0
-    for m2_part, mat in ((oprit_m2, mat_oprit), (paden_m2, mat_paden), (terras_m2, mat_terras)):
-        if (mat or "").strip().lower() != "grind":
-            straatwerk_m2 += float(m2_part)
-
-    # ------------------------------------------------------------
-    # ✅ 3a) Grondwerk (altijd): m² -> m³ en koppelen aan pricing keys
-    # ------------------------------------------------------------
-    def add_volume_cost(label: str, key: str, m3: float, notes: str) -> None:
-        nonlocal total
+        }, rng))
+    return lines
+
+
+# ------------------------------------------------------------
+# ✅ 3a) Grondwerk (altijd): m² -> m³ en koppelen aan pricing keys
+# ------------------------------------------------------------
+def _section_grondwerk(c: _CostContext) -> List[Line]:
+    v = _volumes(c)
+    lines: List[Line] = []
+    for label, key, m3, notes in (
+        ("Grond afvoer – paden/terras (20 cm)", "grond_afvoer_per_m3", v["grond_afvoer_paden_terras"],
+         "Aannames: 0,20 m ontgraven per m² voor paden/terras."),
+        ("Zand aanvoer – paden/terras (15 cm)", "zand_aanvoer_per_m3", v["zand_paden_terras"],
+         "Aannames: 0,15 m zand per m² voor paden/terras."),
+        ("Grond afvoer – oprit (35 cm)", "grond_afvoer_per_m3", v["grond_afvoer_oprit"],
+         "Aannames: 0,35 m ontgraven per m² voor oprit."),
+        ("Puin aanvoer – oprit (25 cm)", "puin_aanvoer_per_m3", v["puin_oprit"],
+         "Aannames: 0,25 m puin per m² voor oprit."),
+        ("Zand aanvoer – oprit (5 cm)", "zand_aanvoer_per_m3", v["zand_oprit"],
+         "Aannames: 0,05 m zand per m² voor oprit."),
+    ):
         if m3 <= 0.0001:
-            return
+            continue
         unit_range = PRIJZEN.get(key)
         if not unit_range:
-            return
+            continue
 
         rng = _range_mul((float(unit_range[0]), float(unit_range[1])), m3)
-        total = _range_add(total, rng)
-
-        breakdown.append({
+        lines.append(({
             "key": key,
             "label": label,
             "unit": _unit(key, "€/m³"),
             "qty": round(m3, 2),  # m³ (2 decimalen)
             "range_eur": [_eur(rng[0]), _eur(rng[1])],
             "notes": notes
-        })
+        }, rng))
+    return lines
 
-    grond_afvoer_key = "grond_afvoer_per_m3"
-    zand_key = "zand_aanvoer_per_m3"
-    puin_key = "puin_aanvoer_per_m3"
 
-    # Paden + Terras: 20 cm afvoer, 15 cm zand
-    paden_terras_m2 = float(paden_m2) + float(terras_m2)
+# ------------------------------------------------------------
+# 3b) Zaagwerk
+# ------------------------------------------------------------
+def _section_zaagwerk(c: _CostContext) -> List[Line]:
+    if c.straatwerk_m2 <= 0.01:
+        return []
 
-    grond_afvoer_paden_terras_m3 = paden_terras_m2 * 0.20
-    add_volume_cost(
-        label="Grond afvoer – paden/terras (20 cm)",
-        key=grond_afvoer_key,
-        m3=grond_afvoer_paden_terras_m3,
-        notes="Aannames: 0,20 m ontgraven per m² voor paden/terras."
-    )
+    zaag_key = "zaagwerk_per_m1"
+    zaag_unit_range = PRIJZEN.get(zaag_key, (35, 65))
+    zaag_m1_min, zaag_m1_max = _zaag_m1(c)
 
-    zand_paden_terras_m3 = paden_terras_m2 * 0.15
-    add_volume_cost(
-        label="Zand aanvoer – paden/terras (15 cm)",
-        key=zand_key,
-        m3=zand_paden_terras_m3,
-        notes="Aannames: 0,15 m zand per m² voor paden/terras."
+    zaag_range = (
+        float(zaag_unit_range[0]) * zaag_m1_min,
+        float(zaag_unit_range[1]) * zaag_m1_max,
     )
 
-    # Oprit: 35 cm afvoer, 25 cm puin, 5 cm zand
-    oprit_m2_f = float(oprit_m2)
-
-    grond_afvoer_oprit_m3 = oprit_m2_f * 0.35
-    add_volume_cost(
-        label="Grond afvoer – oprit (35 cm)",
-        key=grond_afvoer_key,
-        m3=grond_afvoer_oprit_m3,
-        notes="Aannames: 0,35 m ontgraven per m² voor oprit."
-    )
-
-    puin_oprit_m3 = oprit_m2_f * 0.25
-    add_volume_cost(
-        label="Puin aanvoer – oprit (25 cm)",
-        key=puin_key,
-        m3=puin_oprit_m3,
-        notes="Aannames: 0,25 m puin per m² voor oprit."
-    )
-
-    zand_oprit_m3 = oprit_m2_f * 0.05
-    add_volume_cost(
-        label="Zand aanvoer – oprit (5 cm)",
-        key=zand_key,
-        m3=zand_oprit_m3,
-        notes="Aannames: 0,05 m zand per m² voor oprit."
-    )
-
-    # ------------------------------------------------------------
-    # 3b) Zaagwerk
-    # ------------------------------------------------------------
-    zaag_m1_min = 0.0
-    zaag_m1_max = 0.0
-    if straatwerk_m2 > 0.01:
-        zaag_key = "zaagwerk_per_m1"
-        zaag_unit_range = PRIJZEN.get(zaag_key, (35, 65))
-
-        zaag_m1_min = straatwerk_m2 * 0.3
-        zaag_m1_max = straatwerk_m2 * 0.5
-
-        zaag_range = (
-            float(zaag_unit_range[0]) * zaag_m1_min,
-            float(zaag_unit_range[1]) * zaag_m1_max,
+    zaag_qty_mid = int(round((zaag_m1_min + zaag_m1_max) / 2))
+    return [({
+        "key": zaag_key,
+        "label": _label(zaag_key, "Zaagwerk"),
+        "unit": _unit(zaag_key, "€/m¹"),
+        "qty": zaag_qty_mid,
+        "range_eur": [_eur(zaag_range[0]), _eur(zaag_range[1])],
+        "notes": (
+            f"Schatting {int(round(zaag_m1_min))}–{int(round(zaag_m1_max))} m¹ zaagwerk "
+            f"(afhankelijk van randen/hoeken/obstakels)."
         )
-        total = _range_add(total, zaag_range)
-
-        zaag_qty_mid = int(round((zaag_m1_min + zaag_m1_max) / 2))
-        breakdown.append({
-            "key": zaag_key,
-            "label": _label(zaag_key, "Zaagwerk"),
-            "unit": _unit(zaag_key, "€/m¹"),
-            "qty": zaag_qty_mid,
-            "range_eur": [_eur(zaag_range[0]), _eur(zaag_range[1])],
-            "notes": (
-                f"Schatting {int(round(zaag_m1_min))}–{int(round(zaag_m1_max))} m¹ zaagwerk "
-                f"(afhankelijk van randen/hoeken/obstakels)."
-            )
-        })
-
-    # ------------------------------------------------------------
-    # 4) Gazon (graszoden)
-    # ------------------------------------------------------------
-    if gazon_m2 > 0:
-        gazon_key = "graszoden_per_m2"
-        gazon_unit_range = PRIJZEN.get(gazon_key, (15, 25))
-        gazon_range = _range_mul((float(gazon_unit_range[0]), float(gazon_unit_range[1])), gazon_m2)
-        total = _range_add(total, gazon_range)
-
-        breakdown.append({
-            "key": gazon_key,
-            "label": _label(gazon_key, "Graszoden"),
-            "unit": _unit(gazon_key, "€/m²"),
-            "qty": int(round(gazon_m2)),
-            "range_eur": [_eur(gazon_range[0]), _eur(gazon_range[1])],
-            "notes": "Indicatief; afhankelijk van ondergrond, egaliseren en bereikbaarheid."
-        })
-
-    # ------------------------------------------------------------
-    # 5) Beplanting (borders)
-    # ------------------------------------------------------------
-    if border_m2 > 0:
-        border_key = "beplanting_border_per_m2"
-        border_unit_range = PRIJZEN.get(border_key, (30, 40))
-        border_range = _range_mul((float(border_unit_range[0]), float(border_unit_range[1])), border_m2)
-        total = _range_add(total, border_range)
-
-        breakdown.append({
-            "key": border_key,
-            "label": _label(border_key, "Beplanting border"),
-            "unit": _unit(border_key, "€/m²"),
-            "qty": int(round(border_m2)),
-            "range_eur": [_eur(border_range[0]), _eur(border_range[1])],
-            "notes": "Indicatief; soort, ondergrond, beplanting en plantdichtheid beïnvloeden de prijs."
-        })
-
-    # ------------------------------------------------------------
-    # ✅ 5b) Erfafscheiding (MEERDERE items) + ✅ poortdeuren samenvoegen
-    # ------------------------------------------------------------
-    erf_gevraagd = any(str(x).strip().lower() == "erfafscheiding" for x in (overige or []))
-    items = answers.get("erfafscheiding_items") or []
-
-    # backward compat: oude single-velden (als iemand nog oude flow gebruikt)
-    old_type = (answers.get("erfafscheiding_type") or "").strip().lower()
-    old_meter = _to_float(answers.get("erfafscheiding_meter"))
-    old_poort = answers.get("poortdeur")
-    if (not items) and old_type and old_meter > 0:
-        items = [{"type": old_type, "meter": old_meter, "poortdeur": (old_poort is True) if old_poort is not None else None}]
-
+    }, zaag_range)]
+
+
+# ------------------------------------------------------------
+# 4) Gazon (graszoden)
+# ------------------------------------------------------------
+def _section_gazon(c: _CostContext) -> List[Line]:
+    if c.gazon_m2 <= 0:
+        return []
+    gazon_key = "graszoden_per_m2"
+    gazon_unit_range = PRIJZEN.get(gazon_key, (15, 25))
+    gazon_range = _range_mul((float(gazon_unit_range[0]), float(gazon_unit_range[1])), c.gazon_m2)
+    return [({
+        "key": gazon_key,
+        "label": _label(gazon_key, "Graszoden"),
+        "unit": _unit(gazon_key, "€/m²"),
+        "qty": int(round(c.gazon_m2)),
+        "range_eur": [_eur(gazon_range[0]), _eur(gazon_range[1])],
+        "notes": "Indicatief; afhankelijk van ondergrond, egaliseren en bereikbaarheid."
+    }, gazon_range)]
+
+
+# ------------------------------------------------------------
+# 5) Beplanting (borders)
+# ------------------------------------------------------------
+def _section_beplanting(c: _CostContext) -> List[Line]:
+    if c.border_m2 <= 0:
+        return []
+    border_key = "beplanting_border_per_m2"
+    border_unit_range = PRIJZEN.get(border_key, (30, 40))
+    border_range = _range_mul((float(border_unit_range[0]), float(border_unit_range[1])), c.border_m2)
+    return [({
+        "key": border_key,
+        "label": _label(border_key, "Beplanting border"),
+        "unit": _unit(border_key, "€/m²"),
+        "qty": int(round(c.border_m2)),
+        "range_eur": [_eur(border_range[0]), _eur(border_range[1])],
+        "notes": "Indicatief; soort, ondergrond, beplanting en plantdichtheid beïnvloeden de prijs."
+    }, border_range)]
+
+
+# ------------------------------------------------------------
+# ✅ 5b) Erfafscheiding (MEERDERE items) + ✅ poortdeuren samenvoegen
+# ------------------------------------------------------------
+def _section_erfafscheiding(c: _CostContext) -> List[Line]:
+    lines: List[Line] = []
     poortdeur_count = 0
 
-    if erf_gevraagd and items:
-        for it in items:
-            t = (it.get("type") or "").strip().lower()
-            meters = _to_float(it.get("meter"))
-            pd = it.get("poortdeur") is True
-
-            if meters <= 0:
-                continue
-
-            if t == "haag":
-                key = "beplanting_haag_per_m1"
-                unit_fallback = "€/m¹"
-            elif t == "betonschutting":
-                key = "plaatsen_betonschutting_per_m1"
-                unit_fallback = "€/m¹"
-            elif t == "design_schutting":
-                key = "plaatsen_designschutting_per_m1"
-                unit_fallback = "€/m¹"
-            else:
-                key = None
-                unit_fallback = "€/m¹"
-
-            if key and key in PRIJZEN:
-                unit_range = PRIJZEN[key]
-                rng = _range_mul((float(unit_range[0]), float(unit_range[1])), meters)
-                total = _range_add(total, rng)
-                breakdown.append({
-                    "key": key,
-                    "label": _label(key, "Erfafscheiding"),
-                    "unit": _unit(key, unit_fallback),
-                    "qty": int(round(meters)),
-                    "range_eur": [_eur(rng[0]), _eur(rng[1])],
-                    "notes": "Indicatief; afhankelijk van soort, formaat, ondergrond en bereikbaarheid."
-                })
-
-                if pd and t in ("betonschutting", "design_schutting"):
-                    poortdeur_count += 1
-
-        if poortdeur_count > 0 and "plaatsen_poortdeur_per_st" in PRIJZEN:
-            pk = "plaatsen_poortdeur_per_st"
-            pr = PRIJZEN[pk]
-            rng = (float(pr[0]) * poortdeur_count, float(pr[1]) * poortdeur_count)
-            total = _range_add(total, rng)
-            breakdown.append({
-                "key": pk,
-                "label": _label(pk, "Poortdeur plaatsen"),
-                "unit": _unit(pk, "€/stuk"),
-                "qty": poortdeur_count,
-                "range_eur": [_eur(rng[0]), _eur(rng[1])],
-                "notes": "Indicatief; afhankelijk van maatvoering, beslag en fundering."
-            })
-
-        overige_clean = [x for x in overige_clean if x != "erfafscheiding"]
-
-    # ------------------------------------------------------------
-    # ✅ 5c) Beregening (per m²) op basis van scope: gazon / beplanting / allebei
-    # ------------------------------------------------------------
-    if "beregening" in overige_clean:
-        key = "beregening_basis_per_m2"
-        unit_range = PRIJZEN.get(key, (20, 40))
+    for t, meters, pd in c.erf_items:
+        if meters <= 0:
+            continue
 
-        if beregening_scope == "gazon":
-            b_m2 = gazon_m2
-            scope_txt = "alleen gazon"
-        elif beregening_scope == "beplanting":
-            b_m2 = border_m2
-            scope_txt = "alleen beplanting"
+        if t == "haag":
+            key = "beplanting_haag_per_m1"
+        elif t == "betonschutting":
+            key = "plaatsen_betonschutting_per_m1"
+        elif t == "design_schutting":
+            key = "plaatsen_designschutting_per_m1"
         else:
-            b_m2 = gazon_m2 + border_m2
-            scope_txt = "gazon én beplanting"
-
-        if b_m2 > 0.01:
-            rng = _range_mul((float(unit_range[0]), float(unit_range[1])), b_m2)
-            total = _range_add(total, rng)
+            key = None
 
-            breakdown.append({
+        if key and key in PRIJZEN:
+            unit_range = PRIJZEN[key]
+            rng = _range_mul((float(unit_range[0]), float(unit_range[1])), meters)
+            lines.append(({
                 "key": key,
-                "label": _label(key, "Beregening (basis)"),
-                "unit": _unit(key, "€/m²"),
-                "qty": int(round(b_m2)),
+                "label": _label(key, "Erfafscheiding"),
+                "unit": _unit(key, "€/m¹"),
+                "qty": int(round(meters)),
                 "range_eur": [_eur(rng[0]), _eur(rng[1])],
-                "notes": f"Indicatief; berekend over {scope_txt}. Afhankelijk van pomp, zones, waterpunt en besturing."
-            })
-
-        overige_clean = [x for x in overige_clean if x != "beregening"]
-
-    # ------------------------------------------------------------
-    # 6) Voegen (per m²) — alleen op straatwerk, niet op grind
-    # ------------------------------------------------------------
-    if voegen and straatwerk_m2 > 0.01:
-        voeg_key = "voegen_straatwerk_per_m2"
-        voeg_unit_range = PRIJZEN.get(voeg_key, (15, 20))
-
-        voeg_range = _range_mul((float(voeg_unit_range[0]), float(voeg_unit_range[1])), straatwerk_m2)
-        total = _range_add(total, voeg_range)
-
-        breakdown.append({
-            "key": voeg_key,
-            "label": _label(voeg_key, "Voegen straatwerk"),
-            "unit": _unit(voeg_key, "€/m²"),
-            "qty": int(round(straatwerk_m2)),
-            "range_eur": [_eur(voeg_range[0]), _eur(voeg_range[1])],
-            "notes": "Indicatief; voegwerk berekend per m² straatwerk (excl. grind)."
-        })
-
-    # ------------------------------------------------------------
-    # 7) Overkapping (stuk)
-    # ------------------------------------------------------------
-    if overkapping:
-        ov_key = "overkapping_basis_per_stuk"
-        ov = PRIJZEN.get(ov_key, (10000, 15000))
-        ov_range = (float(ov[0]), float(ov[1]))
-        total = _range_add(total, ov_range)
-
-        breakdown.append({
-            "key": ov_key,
-            "label": _label(ov_key, "Overkapping (basis)"),
-            "unit": _unit(ov_key, "€/stuk"),
-            "qty": 1,
-            "range_eur": [_eur(ov_range[0]), _eur(ov_range[1])],
-            "notes": "Basis; luxe opties/maatwerk/fundering en afwerking kunnen extra zijn."
-        })
-
-    # ------------------------------------------------------------
-    # 8) Verlichting (stuk)
-    # ------------------------------------------------------------
-    if verlichting:
-        vl_key = "verlichting_basis_per_stuk"
-        vl = PRIJZEN.get(vl_key, (1000, 1500))
-        vl_range = (float(vl[0]), float(vl[1]))
-        total = _range_add(total, vl_range)
-
-        breakdown.append({
-            "key": vl_key,
-            "label": _label(vl_key, "Verlichting (basis)"),
-            "unit": _unit(vl_key, "€/stuk"),
-            "qty": 1,
-            "range_eur": [_eur(vl_range[0]), _eur(vl_range[1])],
-            "notes": "Afhankelijk van aantal spots, trafo, bekabeling en montage."
-        })
-
-    # ------------------------------------------------------------
-    # 9) Overige wensen (incl. vlonder)
-    # ------------------------------------------------------------
-    if "vlonder" in overige_clean:
-        vlonder_m2 = min(12.0, max(6.0, 0.12 * m2))  # default: 12% van tuin, min 6 m², max 12 m²
-
-        if vlonder_type == "zachthout":
-            vlonder_key = "vlonder_zachthout_per_m2"
-        elif vlonder_type == "hardhout":
-            vlonder_key = "vlonder_hardhout_per_m2"
-        else:
-            vlonder_key = "vlonder_composiet_per_m2"
-
-        unit_range = PRIJZEN.get(vlonder_key, (280, 350))
-        rng = _range_mul((float(unit_range[0]), float(unit_range[1])), vlonder_m2)
-        total = _range_add(total, rng)
-
-        breakdown.append({
-            "key": vlonder_key,
-            "label": _label(vlonder_key, "Vlonder"),
-            "unit": _unit(vlonder_key, "€/m²"),
-            "qty": int(round(vlonder_m2)),
+                "notes": "Indicatief; afhankelijk van soort, formaat, ondergrond en bereikbaarheid."
+            }, rng))
+
+            if pd and t in ("betonschutting", "design_schutting"):
+                poortdeur_count += 1
+
+    if poortdeur_count > 0 and "plaatsen_poortdeur_per_st" in PRIJZEN:
+        pk = "plaatsen_poortdeur_per_st"
+        pr = PRIJZEN[pk]
+        rng = (float(pr[0]) * poortdeur_count, float(pr[1]) * poortdeur_count)
+        lines.append(({
+            "key": pk,
+            "label": _label(pk, "Poortdeur plaatsen"),
+            "unit": _unit(pk, "€/stuk"),
+            "qty": poortdeur_count,
             "range_eur": [_eur(rng[0]), _eur(rng[1])],
-            "notes": "Schatting o.b.v. standaard vlonder-oppervlak; materiaal, fundering en afwerking kunnen variëren."
-        })
-
-        overige_clean = [x for x in overige_clean if x != "vlonder"]
-
-    if overige_clean:
-        breakdown.append({
-            "key": None,
-            "label": "Overige wensen",
-            "unit": "",
-            "qty": None,
-            "range_eur": None,
-            "notes": "Opgenomen als wens: " + ", ".join(overige_clean)
-        })
+            "notes": "Indicatief; afhankelijk van maatvoering, beslag en fundering."
+        }, rng))
+    return lines
+
+
+# ------------------------------------------------------------
+# ✅ 5c) Beregening (per m²) op basis van scope: gazon / beplanting / allebei
+# ------------------------------------------------------------
+def _section_beregening(c: _CostContext) -> List[Line]:
+    if not c.has_beregening:
+        return []
+    key = "beregening_basis_per_m2"
+    unit_range = PRIJZEN.get(key, (20, 40))
+
+    if c.beregening_scope == "gazon":
+        b_m2 = c.gazon_m2
+        scope_txt = "alleen gazon"
+    elif c.beregening_scope == "beplanting":
+        b_m2 = c.border_m2
+        scope_txt = "alleen beplanting"
+    else:
+        b_m2 = c.gazon_m2 + c.border_m2
+        scope_txt = "gazon én beplanting"
+
+    if b_m2 <= 0.01:
+        return []
+
+    rng = _range_mul((float(unit_range[0]), float(unit_range[1])), b_m2)
+    return [({
+        "key": key,
+        "label": _label(key, "Beregening (basis)"),
+        "unit": _unit(key, "€/m²"),
+        "qty": int(round(b_m2)),
+        "range_eur": [_eur(rng[0]), _eur(rng[1])],
+        "notes": f"Indicatief; berekend over {scope_txt}. Afhankelijk van pomp, zones, waterpunt en besturing."
+    }, rng)]
+
+
+# ------------------------------------------------------------
+# 6) Voegen (per m²) — alleen op straatwerk, niet op grind
+# ------------------------------------------------------------
+def _section_voegen(c: _CostContext) -> List[Line]:
+    if not (c.voegen and c.straatwerk_m2 > 0.01):
+        return []
+    voeg_key = "voegen_straatwerk_per_m2"
+    voeg_unit_range = PRIJZEN.get(voeg_key, (15, 20))
+    voeg_range = _range_mul((float(voeg_unit_range[0]), float(voeg_unit_range[1])), c.straatwerk_m2)
+    return [({
+        "key": voeg_key,
+        "label": _label(voeg_key, "Voegen straatwerk"),
+        "unit": _unit(voeg_key, "€/m²"),
+        "qty": int(round(c.straatwerk_m2)),
+        "range_eur": [_eur(voeg_range[0]), _eur(voeg_range[1])],
+        "notes": "Indicatief; voegwerk berekend per m² straatwerk (excl. grind)."
+    }, voeg_range)]
+
+
+# ------------------------------------------------------------
+# 7) Overkapping (stuk)
+# ------------------------------------------------------------
+def _section_overkapping(c: _CostContext) -> List[Line]:
+    if not c.overkapping:
+        return []
+    ov_key = "overkapping_basis_per_stuk"
+    ov = PRIJZEN.get(ov_key, (10000, 15000))
+    ov_range = (float(ov[0]), float(ov[1]))
+    return [({
+        "key": ov_key,
+        "label": _label(ov_key, "Overkapping (basis)"),
+        "unit": _unit(ov_key, "€/stuk"),
+        "qty": 1,
+        "range_eur": [_eur(ov_range[0]), _eur(ov_range[1])],
+        "notes": "Basis; luxe opties/maatwerk/fundering en afwerking kunnen extra zijn."
+    }, ov_range)]
+
+
+# ------------------------------------------------------------
+# 8) Verlichting (stuk)
+# ------------------------------------------------------------
+def _section_verlichting(c: _CostContext) -> List[Line]:
+    if not c.verlichting:
+        return []
+    vl_key = "verlichting_basis_per_stuk"
+    vl = PRIJZEN.get(vl_key, (1000, 1500))
+    vl_range = (float(vl[0]), float(vl[1]))
+    return [({
+        "key": vl_key,
+        "label": _label(vl_key, "Verlichting (basis)"),
+        "unit": _unit(vl_key, "€/stuk"),
+        "qty": 1,
+        "range_eur": [_eur(vl_range[0]), _eur(vl_range[1])],
+        "notes": "Afhankelijk van aantal spots, trafo, bekabeling en montage."
+    }, vl_range)]
+
+
+# ------------------------------------------------------------
+# 9) Overige wensen (incl. vlonder)
+# ------------------------------------------------------------
+def _section_vlonder(c: _CostContext) -> List[Line]:
+    if not c.has_vlonder:
+        return []
+    vlonder_m2 = min(12.0, max(6.0, 0.12 * c.m2))  # default: 12% van tuin, min 6 m², max 12 m²
+
+    if c.vlonder_type == "zachthout":
+        vlonder_key = "vlonder_zachthout_per_m2"
+    elif c.vlonder_type == "hardhout":
+        vlonder_key = "vlonder_hardhout_per_m2"
+    else:
+        vlonder_key = "vlonder_composiet_per_m2"
+
+    unit_range = PRIJZEN.get(vlonder_key, (280, 350))
+    rng = _range_mul((float(unit_range[0]), float(unit_range[1])), vlonder_m2)
+    return [({
+        "key": vlonder_key,
+        "label": _label(vlonder_key, "Vlonder"),
+        "unit": _unit(vlonder_key, "€/m²"),
+        "qty": int(round(vlonder_m2)),
+        "range_eur": [_eur(rng[0]), _eur(rng[1])],
+        "notes": "Schatting o.b.v. standaard vlonder-oppervlak; materiaal, fundering en afwerking kunnen variëren."
+    }, rng)]
+
+
+def _section_overige(c: _CostContext) -> List[Line]:
+    if not c.overige_rest:
+        return []
+    return [({
+        "key": None,
+        "label": "Overige wensen",
+        "unit": "",
+        "qty": None,
+        "range_eur": None,
+        "notes": "Opgenomen als wens: " + ", ".join(c.overige_rest)
+    }, None)]
+
+
+# (naam, functie, velden uit _CostContext waar de sectie van afhangt) — volgorde = volgorde in breakdown
+SECTIONS: Tuple[Tuple[str, Callable[[_CostContext], List[Line]], Tuple[str, ...]], ...] = (
+    ("verharding", _section_verharding, ("oprit_m2", "paden_m2", "terras_m2", "mat_oprit", "mat_paden", "mat_terras")),
+    ("grondwerk", _section_grondwerk, ("oprit_m2", "paden_m2", "terras_m2")),
+    ("zaagwerk", _section_zaagwerk, ("straatwerk_m2",)),
+    ("gazon", _section_gazon, ("gazon_m2",)),
+    ("beplanting", _section_beplanting, ("border_m2",)),
+    ("erfafscheiding", _section_erfafscheiding, ("erf_items",)),
+    ("beregening", _section_beregening, ("has_beregening", "beregening_scope", "gazon_m2", "border_m2")),
+    ("voegen", _section_voegen, ("voegen", "straatwerk_m2")),
+    ("overkapping", _section_overkapping, ("overkapping",)),
+    ("verlichting", _section_verlichting, ("verlichting",)),
+    ("vlonder", _section_vlonder, ("has_vlonder", "vlonder_type", "m2")),
+    ("overige", _section_overige, ("overige_rest",)),
+)
+
+
+def _section_key(c: _CostContext, deps: Tuple[str, ...]) -> Tuple[Any, ...]:
+    return tuple(getattr(c, f) for f in deps)
+
+
+def _assemble_costs(c: _CostContext, section_lines: List[List[Line]]) -> Dict[str, Any]:
+    total: Tuple[float, float] = (0.0, 0.0)
+    breakdown: List[Dict[str, Any]] = []
+    for lines in section_lines:
+        for item, rng in lines:
+            if rng is not None:
+                total = _range_add(total, rng)
+            breakdown.append(dict(item))
 
     # ------------------------------------------------------------
     # ✅ Combineer grondwerk regels: 1 regel per key (grond/zand/puin)
@@ -864,86 +952,209 @@ def estimate_tuinaanleg_costs(answers: Dict[str, Any]) -> Dict[str, Any]:
 
     breakdown.sort(key=_prio)
 
+    v = _volumes(c)
+    zaag_m1_min, zaag_m1_max = _zaag_m1(c)
+
     return {
         "total_range_eur": [_eur(total[0]), _eur(total[1])],
         "breakdown": breakdown,
         "inputs": {
-            "tuin_m2": m2,
-            "verhouding_bestrating_groen": ratio_bg,
-            "verhouding_gazon_beplanting": ratio_gb,
-            "paving_share": paving_share,
-            "paving_m2_estimate": int(round(paving_m2)),
-            "oprit_pct": oprit_pct_i,
-            "paden_pct": paden_pct_i,
-            "terras_pct": terras_pct_i,
-            "oprit_m2_estimate": int(round(oprit_m2)),
-            "paden_m2_estimate": int(round(paden_m2)),
-            "terras_m2_estimate": int(round(terras_m2)),
-            "straatwerk_m2_estimate": int(round(straatwerk_m2)),
-            "grond_afvoer_paden_terras_m3_estimate": round(grond_afvoer_paden_terras_m3, 2),
-            "zand_paden_terras_m3_estimate": round(zand_paden_terras_m3, 2),
-            "grond_afvoer_oprit_m3_estimate": round(grond_afvoer_oprit_m3, 2),
-            "puin_oprit_m3_estimate": round(puin_oprit_m3, 2),
-            "zand_oprit_m3_estimate": round(zand_oprit_m3, 2),
+            "tuin_m2": c.m2,
+            "verhouding_bestrating_groen": c.ratio_bg,
+            "verhouding_gazon_beplanting": c.ratio_gb,
+            "paving_share": c.paving_share,
+            "paving_m2_estimate": int(round(c.paving_m2)),
+            "oprit_pct": c.oprit_pct_i,
+            "paden_pct": c.paden_pct_i,
+            "terras_pct": c.terras_pct_i,
+            "oprit_m2_estimate": int(round(c.oprit_m2)),
+            "paden_m2_estimate": int(round(c.paden_m2)),
+            "terras_m2_estimate": int(round(c.terras_m2)),
+            "straatwerk_m2_estimate": int(round(c.straatwerk_m2)),
+            "grond_afvoer_paden_terras_m3_estimate": round(v["grond_afvoer_paden_terras"], 2),
+            "zand_paden_terras_m3_estimate": round(v["zand_paden_terras"], 2),
+            "grond_afvoer_oprit_m3_estimate": round(v["grond_afvoer_oprit"], 2),
+            "puin_oprit_m3_estimate": round(v["puin_oprit"], 2),
+            "zand_oprit_m3_estimate": round(v["zand_oprit"], 2),
             "zaag_m1_estimate_min": int(round(zaag_m1_min)),
             "zaag_m1_estimate_max": int(round(zaag_m1_max)),
-            "green_m2_estimate": int(round(green_m2)),
-            "gazon_m2_estimate": int(round(gazon_m2)),
-            "beplanting_m2_estimate": int(round(border_m2)),
-            "onkruidwerend_gevoegd": voegen,
-            "overkapping": overkapping,
-            "verlichting": verlichting,
-            "overige_wensen": overige,
-            "vlonder_type": vlonder_type,
-            "materiaal_oprit": mat_oprit,
-            "materiaal_paden": mat_paden,
-            "materiaal_terras": mat_terras,
-            "beregening_scope": beregening_scope,
-            "erfafscheiding_items_count": len(items) if erf_gevraagd else 0,
+            "green_m2_estimate": int(round(c.green_m2)),
+            "gazon_m2_estimate": int(round(c.gazon_m2)),
+            "beplanting_m2_estimate": int(round(c.border_m2)),
+            "onkruidwerend_gevoegd": c.voegen,
+            "overkapping": c.overkapping,
+            "verlichting": c.verlichting,
+            "overige_wensen": c.overige,
+            "vlonder_type": c.vlonder_type,
+            "materiaal_oprit": c.mat_oprit,
+            "materiaal_paden": c.mat_paden,
+            "materiaal_terras": c.mat_terras,
+            "beregening_scope": c.beregening_scope,
+            "erfafscheiding_items_count": c.erf_items_count,
         }
     }
 
 
+@timed
+def compute_tuinaanleg_costs(answers: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Ongecachete berekening; gebruik normaal estimate_tuinaanleg_costs.
+    Rekent met:
+    - tuin_m2
+    - verhouding_bestrating_groen
+    - verhouding_gazon_beplanting
+    - oprit/paden/terras percentages: oprit_pct, paden_pct, terras_pct
+    - materialen: materiaal_oprit, materiaal_paden, materiaal_terras
+    - onkruidwerend_gevoegd (voegen alleen op straatwerk, niet op grind)
+    - ✅ grondwerk (altijd): afvoer/aanvoer in m³ o.b.v. dieptes per onderdeel
+    - zaagwerk
+    - overige_wensen + vlonder_type
+    - ✅ erfafscheiding (MEERDERE): erfafscheiding_items[] met type/meter/poortdeur
+    - ✅ beregening: scope -> m² berekening
+    """
+    c = _cost_context(answers)
+    if c is None:
+        return {"error": "tuin_m2 ontbreekt of is ongeldig"}
+    return _assemble_costs(c, [fn(c) for _name, fn, _deps in SECTIONS])
+
+
+# ============================================================
+# ✅ Optionele cache rond de berekening
+#    Een front-end kan een cache registreren (bijv. st.cache_data in app.py),
+#    gesleuteld op PRICE_VERSION + answers_fingerprint(answers).
+#    Ook alle bespaar-previews in savings.py lopen via estimate_tuinaanleg_costs.
+# ============================================================
+#    hashlib pas bij gebruik importeren: het laden van OpenSSL kost ~6 ms koude start,
+#    en de console/API heeft geen cache nodig.
+def price_version(prijzen: Dict[str, Tuple[int, int]]) -> str:
+    import hashlib
+
+    raw = json.dumps(sorted((k, list(v)) for k, v in prijzen.items()), separators=(",", ":"))
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=6).hexdigest()
+
+
+def __getattr__(name: str) -> Any:
+    # PRICE_VERSION lui (PEP 562): pas berekend bij de eerste `from pricing import PRICE_VERSION`
+    if name == "PRICE_VERSION":
+        value = globals()["PRICE_VERSION"] = price_version(PRIJZEN)
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+def answers_fingerprint(answers: Dict[str, Any]) -> str:
+    """Stabiele hash van de antwoorden; interne flow-keys (met '_') tellen niet mee."""
+    import hashlib
+
+    public = {k: v for k, v in answers.items() if not str(k).startswith("_")}
+    raw = json.dumps(public, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=repr)
+    return hashlib.blake2b(raw.encode("utf-8"), digest_size=16).hexdigest()
+
+
+_estimate_cache: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]] = None
+
+
+def set_estimate_cache(fn: Optional[Callable[[Dict[str, Any]], Dict[str, Any]]]) -> None:
+    """fn(answers) -> costs; moet hetzelfde teruggeven als compute_tuinaanleg_costs. None = uit."""
+    global _estimate_cache
+    _estimate_cache = fn
+
+
+@timed
+def estimate_tuinaanleg_costs(answers: Dict[str, Any]) -> Dict[str, Any]:
+    if _estimate_cache is not None:
+        return _estimate_cache(answers)
+    return compute_tuinaanleg_costs(answers)
+
+
+# ============================================================
+# ✅ Lopende schatting tijdens de intake
+# ============================================================
+@dataclass(frozen=True)
+class RunningEstimate:
+    """
+    Schatting die per antwoord wordt bijgewerkt. Onbekende velden vallen terug op
+    de standaardwaarden van estimate_tuinaanleg_costs (50/50, beton, geen extra's).
+
+    Immutable: update() geeft een nieuwe RunningEstimate terug en herberekent alleen
+    de secties waarvan de invoer is veranderd (zie SECTIONS). Het resultaat is
+    identiek aan estimate_tuinaanleg_costs(answers).
+    """
+    costs: Optional[Dict[str, Any]] = None
+    recomputed: Tuple[str, ...] = ()
+    _cache: Dict[str, Tuple[Tuple[Any, ...], List[Line]]] = field(default_factory=dict, repr=False)
+
+    @timed
+    def update(self, answers: Dict[str, Any]) -> "RunningEstimate":
+        c = _cost_context(answers)
+        if c is None:
+            return RunningEstimate()
+
+        cache: Dict[str, Tuple[Tuple[Any, ...], List[Line]]] = {}
+        recomputed: List[str] = []
+        section_lines: List[List[Line]] = []
+
+        for name, fn, deps in SECTIONS:
+            key = _section_key(c, deps)
+            hit = self._cache.get(name)
+            if hit is not None and hit[0] == key:
+                lines = hit[1]
+            else:
+                lines = fn(c)
+                recomputed.append(name)
+            cache[name] = (key, lines)
+            section_lines.append(lines)
+
+        return RunningEstimate(costs=_assemble_costs(c, section_lines), recomputed=tuple(recomputed), _cache=cache)
+
+    def total_range(self) -> Optional[Tuple[int, int]]:
+        if not self.costs or not self.costs.get("total_range_eur"):
+            return None
+        lo, hi = self.costs["total_range_eur"]
+        return int(lo), int(hi)
+
+
 # ============================================================
 # ✅ Formatter -> klantvriendelijke tekst voor chat/UI
 # ============================================================
-def format_tuinaanleg_costs_for_customer(costs: Dict[str, Any]) -> str:
+@timed
+def format_tuinaanleg_costs_sections(costs: Dict[str, Any]) -> List[str]:
+    """
+    Zelfde inhoud als format_tuinaanleg_costs_for_customer, maar opgeknipt in blokken
+    (keuzes, intro, totaal, posten, afsluiting) zodat een transport ze los kan streamen.
+    """
     if not costs or not costs.get("total_range_eur"):
-        return (
+        return [
             "Op basis van de ingevulde gegevens kan ik nu nog geen "
             "betrouwbare indicatie geven. We helpen u graag verder met een offerte op maat."
-        )
+        ]
 
     total_min, total_max = costs["total_range_eur"]
 
     def eur(v: int) -> str:
         return f"€{v:,}".replace(",", ".")
 
-    lines: List[str] = []
+    sections: List[str] = []
 
     # ✅ NIEUW: eerst keuze-overzicht
     choices = format_tuinaanleg_choices_for_customer(costs)
     if choices:
-        lines.append(choices)
-        lines.append("")
+        sections.append(choices)
 
     # ✅ 1) “prijs” herpositioneren
-    lines.append("✅ **Globale inschatting**")
-    lines.append(
+    sections.append(
+        "✅ **Globale inschatting**\n"
         "Bedankt voor het invullen, op basis van uw ingevulde keuzes geef ik u hieronder een globale indicatie."
     )
-    lines.append("")
 
     # ✅ 2) geruststelling vóór bedragen
-    lines.append(
+    sections.append(
         "_Iedere tuin is uniek. Deze indicatie is bedoeld als richting, "
         "niet als definitieve offerte._"
     )
-    lines.append("")
 
-    lines.append(f"**Totale indicatie:** {eur(int(total_min))} – {eur(int(total_max))}")
-    lines.append("")
+    sections.append(f"**Totale indicatie:** {eur(int(total_min))} – {eur(int(total_max))}")
 
+    lines: List[str] = []
     for item in costs.get("breakdown", []):
         label = item.get("label", "Onderdeel")
         rng = item.get("range_eur")
@@ -967,16 +1178,22 @@ def format_tuinaanleg_costs_for_customer(costs: Dict[str, Any]) -> str:
         if notes:
             lines.append(f"  _{notes}_")
 
-    lines.append("")
-    lines.append(
+    if lines:
+        sections.append("\n".join(lines))
+
+    sections.append(
         "_Deze globale prijsindicatie is gebaseerd op aannames en is inclusief arbeid en standaard materialen._"
     )
-    lines.append("")
 
     # ✅ 3) menselijk contact als plus/volgende stap
-    lines.append(
+    sections.append(
         "Wilt u dat we dit samen verfijnen en kijken wat er mogelijk is binnen uw wensen? "
         "Dan komen we graag langs voor een vrijblijvende offerte."
     )
 
-    return "\n".join(lines)
+    return sections
+
+
+@timed
+def format_tuinaanleg_costs_for_customer(costs: Dict[str, Any]) -> str:
+    return "\n\n".join(format_tuinaanleg_costs_sections(costs))
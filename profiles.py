@@ -0,0 +1,136 @@
+# profiles.py
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+
+# ============================================================
+# ✅ Standaardtuinen (snelstart)
+#    Elk profiel is een complete set intake-antwoorden, in dezelfde ruwe vorm
+#    als een klant ze typt (stap-key -> invoer). De flow valideert ze dus
+#    precies zoals bij een gewone intake.
+#    Let op: per profiel maximaal één erfafscheiding-type (stap-keys zijn uniek).
+# ============================================================
+@dataclass(frozen=True)
+class GardenProfile:
+    key: str
+    label: str
+    aliases: Tuple[str, ...]
+    inputs: Tuple[Tuple[str, str], ...]
+
+    def input_map(self) -> Dict[str, str]:
+        return dict(self.inputs)
+
+
+PROFILES: Tuple[GardenProfile, ...] = (
+    GardenProfile(
+        key="rijtjeshuis",
+        label="Rijtjeshuis, achtertuin ~50 m²",
+        aliases=("rijtjeshuis", "rijtjeswoning", "tussenwoning"),
+        inputs=(
+            ("tuin_m2", "50"),
+            ("verhouding_bestrating_groen", "2"),       # 50/50
+            ("verhouding_gazon_beplanting", "1"),       # 70% gazon
+            ("verhouding_oprit_paden_terras", "5"),     # zelf: geen oprit
+            ("oprit_pct", "0"),
+            ("paden_pct", "20"),
+            ("confirm_oprit_paden_terras", "ja"),
+            ("materiaal_oprit", "2"),                   # wordt door de flow gevraagd, vervalt bij 0% oprit
+            ("materiaal_paden", "2"),                   # beton
+            ("materiaal_terras", "2"),                  # beton
+            ("onkruidwerend_gevoegd", "ja"),
+            ("overkapping", "nee"),
+            ("verlichting", "nee"),
+            ("overige_wensen", "1"),
+            ("erfafscheiding_type", "2"),               # betonschutting
+            ("erfafscheiding_meter", "12"),
+            ("poortdeur", "ja"),
+        ),
+    ),
+    GardenProfile(
+        key="twee_onder_een_kap",
+        label="Twee-onder-een-kap ~150 m²",
+        aliases=("twee-onder-een-kap", "twee onder een kap", "2-onder-1-kap", "2 onder 1 kap", "hoekwoning"),
+        inputs=(
+            ("tuin_m2", "150"),
+            ("verhouding_bestrating_groen", "2"),       # 50/50
+            ("verhouding_gazon_beplanting", "2"),       # 50/50
+            ("verhouding_oprit_paden_terras", "4"),     # 20/30/50
+            ("materiaal_oprit", "2"),                   # beton
+            ("materiaal_paden", "2"),                   # beton
+            ("materiaal_terras", "3"),                  # gebakken
+            ("onkruidwerend_gevoegd", "ja"),
+            ("overkapping", "nee"),
+            ("verlichting", "ja"),
+            ("overige_wensen", "1,3"),
+            ("erfafscheiding_type", "1"),               # haag
+            ("erfafscheiding_meter", "20"),
+            ("beregening_scope", "1"),                  # alleen gazon
+        ),
+    ),
+    GardenProfile(
+        key="vrijstaand",
+        label="Vrijstaand ~400 m²",
+        aliases=("vrijstaand", "vrijstaande woning", "villa"),
+        inputs=(
+            ("tuin_m2", "400"),
+            ("verhouding_bestrating_groen", "3"),       # 30/70
+            ("verhouding_gazon_beplanting", "2"),       # 50/50
+            ("verhouding_oprit_paden_terras", "2"),     # 40/30/30
+            ("materiaal_oprit", "3"),                   # gebakken
+            ("materiaal_paden", "2"),                   # beton
+            ("materiaal_terras", "4"),                  # keramiek
+            ("onkruidwerend_gevoegd", "ja"),
+            ("overkapping", "ja"),
+            ("verlichting", "ja"),
+            ("overige_wensen", "1,2,3"),
+            ("erfafscheiding_type", "3"),               # design schutting
+            ("erfafscheiding_meter", "40"),
+            ("poortdeur", "ja"),
+            ("vlonder_type", "2"),                      # hardhout
+            ("beregening_scope", "3"),                  # gazon én beplanting
+        ),
+    ),
+)
+
+PROFILES_BY_KEY: Dict[str, GardenProfile] = {p.key: p for p in PROFILES}
+
+_ALIAS_RE: List[Tuple["re.Pattern[str]", GardenProfile]] = []
+
+
+def _alias_patterns() -> List[Tuple["re.Pattern[str]", GardenProfile]]:
+    # pas bij de eerste klantinvoer compileren, niet bij import
+    if not _ALIAS_RE:
+        _ALIAS_RE.extend(
+            (re.compile(r"\b" + r"\s*".join(re.escape(part) for part in alias.split()) + r"\b"), p)
+            for p in PROFILES
+            for alias in p.aliases
+        )
+    return _ALIAS_RE
+
+
+def match_profile(text: str) -> Tuple[Optional[GardenProfile], str]:
+    """
+    Zoekt een standaardtuin in de tekst. Geeft (profiel, rest) terug; de rest is de
+    tekst zonder de profielnaam, zodat afwijkingen ("maar 60 m²") los te lezen zijn.
+    """
+    t = (text or "").strip().lower()
+    if not t or not any(c.isalpha() for c in t):
+        return None, t
+    for rx, p in _alias_patterns():
+        if rx.search(t):
+            return p, rx.sub(" ", t, count=1).strip()
+    return None, t
+
+
+@lru_cache(maxsize=None)
+def profiles_hint_text() -> str:
+    # één keer opbouwen; elke nieuwe sessie toont dezelfde tekst
+    lines = ["Snel klaar? Typ een standaardtuin en pas daarna alleen aan wat afwijkt:"]
+    for p in PROFILES:
+        lines.append(f"- '{p.aliases[0]}' – {p.label}")
+    lines.append("Bijvoorbeeld: 'rijtjeshuis, maar 60 m² en terras keramiek'.")
+    return "\n".join(lines)
@@ -0,0 +1,154 @@
+# replay.py
+"""
+Replay van opgenomen gesprekken (lijsten met klantinvoer) door de conversation-engine.
+
+Invoer (JSONL), één transcript per regel:
+    {"id": "klacht-123", "inputs": ["80", "1", "2", ...]}
+of alleen een lijst:
+    ["80", "1", "2", ...]
+
+Uitvoer (JSONL), per transcript: eindantwoorden, kosten, stage en de berichten.
+
+    python replay.py transcripts.jsonl --workers 8 > replay.jsonl
+    python replay.py transcripts.jsonl --compare replay_oud.jsonl
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+import time
+from typing import Any, Dict, Iterator, List, Optional, TextIO, Tuple
+
+from batching import bounded_parallel_map
+from conversation import initial_state, handle_turn
+
+
+def replay_transcript(
+    inputs: List[str],
+    *,
+    start_intake: bool = True,
+    with_messages: bool = True,
+) -> Dict[str, Any]:
+    """
+    Speelt één transcript af. start_intake=True gedraagt zich als Streamlit/server
+    (direct de intake), False als de console (eerst tuinaanleg-intentie).
+    """
+    state = initial_state(start_intake=start_intake)
+    messages: List[Dict[str, Any]] = []
+
+    for turn, text in enumerate(inputs):
+        state, replies = handle_turn(state, str(text))
+        if with_messages:
+            for m in replies:
+                messages.append({"turn": turn, "kind": m.kind, "text": m.text})
+
+    answers = state.last_answers
+    if answers is None and state.flow is not None:
+        answers = state.flow.answers
+
+    out: Dict[str, Any] = {
+        "stage": state.stage,
+        "turns": len(inputs),
+        "recalc_count": state.recalc_count,
+        "answers": answers,
+        "costs": state.last_costs,
+    }
+    if with_messages:
+        out["messages"] = messages
+    return out
+
+
+def _replay_job(job: Tuple[Any, List[str], Optional[str], bool, bool]) -> Dict[str, Any]:
+    tid, inputs, error, start_intake, with_messages = job
+    if error is not None:
+        return {"id": tid, "error": error}
+    try:
+        res = replay_transcript(inputs, start_intake=start_intake, with_messages=with_messages)
+    except Exception as e:
+        return {"id": tid, "error": f"{type(e).__name__}: {e}"}
+    return {"id": tid, **res}
+
+
+def read_transcripts(fh: TextIO) -> Iterator[Tuple[Any, List[str], Optional[str]]]:
+    """(id, invoer, fout) per regel; een onleesbare regel wordt een foutregel (id = regelnummer), net als main.py --batch."""
+    for lineno, line in enumerate(fh, start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            obj = json.loads(line)
+        except ValueError as e:
+            yield lineno, [], f"{type(e).__name__}: {e}"
+            continue
+        if isinstance(obj, list):
+            yield lineno, [str(x) for x in obj], None
+        elif isinstance(obj, dict) and isinstance(obj.get("inputs") or [], list):
+            yield obj.get("id", lineno), [str(x) for x in obj.get("inputs") or []], None
+        else:
+            tid = obj.get("id", lineno) if isinstance(obj, dict) else lineno
+            yield tid, [], "regel is geen transcript (lijst of object met 'inputs')"
+
+
+def _fingerprint(res: Dict[str, Any]) -> Tuple[Any, ...]:
+    costs = res.get("costs") or {}
+    msgs = tuple((m["kind"], m["text"]) for m in res.get("messages") or ())
+    return (res.get("stage"), json.dumps(costs, sort_keys=True), msgs, res.get("error"))
+
+
+def _load_baseline(path: str) -> Dict[str, Tuple[Any, ...]]:
+    out: Dict[str, Tuple[Any, ...]] = {}
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            if line.strip():
+                res = json.loads(line)
+                out[str(res.get("id"))] = _fingerprint(res)
+    return out
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("path", nargs="?", default="-", help="JSONL met transcripts (default: stdin)")
+    ap.add_argument("--workers", type=int, default=1)
+    ap.add_argument("--chunksize", type=int, default=64)
+    ap.add_argument("--console", action="store_true", help="start zoals main.py (wacht op tuinaanleg-intentie)")
+    ap.add_argument("--final-only", action="store_true", help="geen berichten, alleen eindresultaat")
+    ap.add_argument("--compare", metavar="BASELINE", help="vergelijk met eerdere replay-uitvoer en rapporteer verschillen")
+    args = ap.parse_args(argv)
+
+    fh = sys.stdin if args.path == "-" else open(args.path, encoding="utf-8")
+    baseline = _load_baseline(args.compare) if args.compare else None
+
+    jobs = ((tid, inputs, error, not args.console, not args.final_only) for tid, inputs, error in read_transcripts(fh))
+
+    t0 = time.perf_counter()
+    n = 0
+    errors = 0
+    changed: List[str] = []
+
+    for res in bounded_parallel_map(_replay_job, jobs, workers=args.workers, chunksize=args.chunksize):
+        n += 1
+        if "error" in res:
+            errors += 1
+        if baseline is not None:
+            old = baseline.get(str(res["id"]))
+            if old is not None and old != _fingerprint(res):
+                changed.append(str(res["id"]))
+        else:
+            sys.stdout.write(json.dumps(res, ensure_ascii=False) + "\n")
+
+    elapsed = time.perf_counter() - t0
+    if fh is not sys.stdin:
+        fh.close()
+
+    print(f"{n} transcripts in {elapsed:.2f} s ({n / elapsed if elapsed else 0:.0f}/s), fouten: {errors}", file=sys.stderr)
+    if baseline is not None:
+        print(f"gewijzigd t.o.v. baseline: {len(changed)}", file=sys.stderr)
+        for tid in changed[:50]:
+            print(f"  {tid}", file=sys.stderr)
+        return 1 if changed or errors else 0
+    return 1 if errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -5,14 +5,12 @@ import re
 from typing import Dict, Tuple, List, Optional, Set, Any
 
 from pricing import estimate_tuinaanleg_costs
+from hotpath import timed
 
 
 # =====================
 # Basics
 # =====================
-MAX_RECALC_DEFAULT = 5
-
-
 def _eur(v: int) -> str:
     return f"€{int(v):,}".replace(",", ".")
 
@@ -102,6 +100,28 @@ def parse_material_parts(user_text: str) -> Optional[Tuple[str, ...]]:
     return parsed
 
 
+def parse_multi_numbers(user_text: str, *, allowed: Tuple[str, ...]) -> Optional[Tuple[str, ...]]:
+    """
+    Als parse_multi_digits, maar voor lijsten met meer dan 9 opties: "2, 11" -> ("2", "11").
+    Een getal dat geen optie is maar uit losse opties bestaat ("13") telt als losse cijfers.
+    """
+    t = (user_text or "").strip().lower()
+    if not t:
+        return None
+    if is_back(t):
+        return ("nee",)
+
+    out: List[str] = []
+    for num in re.findall(r"\d+", t):
+        if num in allowed:
+            out.append(num)
+        elif len(num) > 1:
+            out.extend(d for d in num if d in allowed)
+
+    out = list(dict.fromkeys(out))
+    return tuple(out) if out else None
+
+
 # ============================================================
 # ✅ Besparing: delta op breakdown keys (geen total-delta bug)
 # ============================================================
@@ -262,6 +282,7 @@ def post_offer_choices_text() -> str:
     )
 
 
+@timed
 def lower_costs_menu_text(ans: dict | None) -> str:
     lines = [
         "Waar wilt u eventueel op besparen?",
@@ -275,6 +296,9 @@ def lower_costs_menu_text(ans: dict | None) -> str:
         idx += 1
     if has_erfafscheiding(ans):
         lines.append(f"{idx}) Erfafscheiding aanpassen/verwijderen (incl. poortdeuren, toon besparing per optie)")
+        idx += 1
+    lines.append(f"{idx}) Alle bespaaropties op een rij (grootste besparing eerst, direct door te voeren)")
+    lines.append(f"{idx + 1}) Bespaarmandje: meerdere opties combineren en in één keer doorvoeren")
 
     lines.append("")
     lines.append("U kunt hier later terugkomen om eventueel opnieuw een bespaaroptie te kiezen.")
@@ -301,6 +325,7 @@ def limit_followup_text() -> str:
 # =====================
 # (1) Meer groen / minder bestrating (renummerd vanaf 1)
 # =====================
+@timed
 def more_green_choice_text(ans: dict, base_costs: dict) -> Tuple[str, Dict[str, str]]:
     a = dict(ans or {})
 
@@ -341,6 +366,7 @@ def more_green_choice_text(ans: dict, base_costs: dict) -> Tuple[str, Dict[str,
 # =====================
 # (2) Extra’s aanpassen (multi-select, renummerd, incl. 'nee')
 # =====================
+@timed
 def extras_select_menu_text(ans: dict, base_costs: dict) -> Tuple[str, Dict[str, str]]:
     a = dict(ans or {})
     overige = _overige_clean(a)
@@ -404,6 +430,7 @@ def extras_select_menu_text(ans: dict, base_costs: dict) -> Tuple[str, Dict[str,
 # =====================
 # (3) Bestratingmateriaal goedkoper (onderdeel -> keuze)
 # =====================
+@timed
 def material_part_menu_text(ans: dict) -> str:
     a = ans or {}
     o = int(a.get("oprit_pct") or 0)
@@ -421,6 +448,7 @@ def material_part_menu_text(ans: dict) -> str:
     return "\n".join(lines)
 
 
+@timed
 def material_choice_menu_text_cheaper(
     ans: dict,
     base_costs: dict,
@@ -516,6 +544,7 @@ def material_choice_menu_text_cheaper(
 # =====================
 # (4) Vlonder goedkoper (renummerd vanaf 1 + 'verwijderen' kan)
 # =====================
+@timed
 def vlonder_choice_menu_text(ans: dict, base_costs: dict) -> Tuple[str, Dict[str, str]]:
     a = dict(ans or {})
     if not has_vlonder(a):
@@ -610,6 +639,7 @@ def erf_stats(ans: dict | None) -> dict:
     return stats
 
 
+@timed
 def erf_remove_select_menu_text(ans: dict, base_costs: dict) -> Tuple[str, Dict[str, str]]:
     a = dict(ans or {})
     items = list(a.get("erfafscheiding_items") or [])
@@ -692,6 +722,7 @@ def erf_remove_select_menu_text(ans: dict, base_costs: dict) -> Tuple[str, Dict[
 # =====================
 # Apply changes (✅ consistent “doorgevoerde kostenbesparing”)
 # =====================
+@timed
 def apply_set_ratio(answers: dict, ratio_code: str) -> Tuple[dict, str]:
     a = dict(answers or {})
     a["verhouding_bestrating_groen"] = ratio_code
@@ -699,6 +730,7 @@ def apply_set_ratio(answers: dict, ratio_code: str) -> Tuple[dict, str]:
     return a, _explain_saving(f"verhouding bestrating/groen aangepast naar {pretty}")
 
 
+@timed
 def apply_remove_selected_extras(answers: dict, selected_actions: List[str]) -> Tuple[dict, str]:
     a = dict(answers or {})
     overige = _overige_clean(a)
@@ -729,6 +761,7 @@ def apply_remove_selected_extras(answers: dict, selected_actions: List[str]) ->
     return a, _explain_saving(", ".join(chosen))
 
 
+@timed
 def apply_material_change(answers: dict, part: Any, choice_digit: str) -> Tuple[dict, str]:
     a = dict(answers or {})
     mat = _MAT_BY_CHOICE_FIXED.get(choice_digit)
@@ -772,6 +805,7 @@ def apply_material_change(answers: dict, part: Any, choice_digit: str) -> Tuple[
     return a, _explain_saving(f"materiaal aangepast naar {_nice_mat(mat)} voor: {', '.join(changed_targets)}")
 
 
+@timed
 def apply_vlonder_change(answers: dict, action: str) -> Tuple[dict, str]:
     a = dict(answers or {})
     overige = _overige_clean(a)
@@ -792,6 +826,7 @@ def apply_vlonder_change(answers: dict, action: str) -> Tuple[dict, str]:
     return a, _explain_saving(f"vlonder aangepast naar {_nice_vlonder(action)} (goedkoper)")
 
 
+@timed
 def apply_erf_changes(answers: dict, selected_actions: List[str]) -> Tuple[dict, str]:
     a = dict(answers or {})
     items = list(a.get("erfafscheiding_items") or [])
@@ -815,6 +850,8 @@ def apply_erf_changes(answers: dict, selected_actions: List[str]) -> Tuple[dict,
             remove_poorten = True
 
     if remove_poorten:
+        # kopieën: de item-dicts worden gedeeld met de vorige antwoorden (en met previews)
+        items = [dict(it) for it in items]
         for it in items:
             t = (it.get("type") or "").strip().lower()
             if t in ("betonschutting", "design_schutting") and it.get("poortdeur") is True:
@@ -841,3 +878,299 @@ def apply_erf_changes(answers: dict, selected_actions: List[str]) -> Tuple[dict,
         return a, "Geen geldige keuze (geen wijziging)."
 
     return a, _explain_saving(" • ".join(msgs))
+
+
+# =====================
+# (6) Alle besparingen op een rij (één actie per optie, gerangschikt)
+# =====================
+SavingAction = Tuple[str, Any]  # (categorie, payload voor de apply-functie)
+
+_MATERIAL_PARTS = (("1", "materiaal_oprit", "oprit_pct", "Oprit"),
+                   ("2", "materiaal_paden", "paden_pct", "Paden"),
+                   ("3", "materiaal_terras", "terras_pct", "Terras"))
+
+
+@timed
+def apply_saving_action(answers: dict, action: SavingAction) -> Tuple[dict, str]:
+    """Eén actie uit het overzicht doorvoeren via de bestaande apply-functies."""
+    category, payload = action
+    if category == "more_green":
+        return apply_set_ratio(answers, payload)
+    if category == "extras":
+        return apply_remove_selected_extras(answers, [payload])
+    if category == "material":
+        part, choice = payload
+        return apply_material_change(answers, (part,), choice)
+    if category == "vlonder":
+        return apply_vlonder_change(answers, payload)
+    if category == "erf":
+        return apply_erf_changes(answers, [payload])
+    return dict(answers or {}), _explain_saving("")
+
+
+def _single_saving_candidates(a: dict) -> List[Tuple[str, SavingAction, Tuple[str, ...]]]:
+    """
+    Alle losse acties over de vijf categorieën: (label, actie, gekoppelde keys).
+    Zelfde beschikbaarheid als de categorie-menu's hierboven.
+    """
+    out: List[Tuple[str, SavingAction, Tuple[str, ...]]] = []
+
+    for ratio_code, label in (("50_50", "50/50 (gemengd)"), ("30_70", "30/70 (veel groen)")):
+        out.append((f"Meer groen: verhouding {label}", ("more_green", ratio_code), GREEN_LINKED_KEYS))
+
+    overige = _overige_clean(a)
+    extras = (
+        ("voegen", "Voegen", a.get("onkruidwerend_gevoegd") is True),
+        ("overkapping", "Overkapping", a.get("overkapping") is True),
+        ("verlichting", "Verlichting", a.get("verlichting") is True),
+        ("beregening", "Beregening", "beregening" in overige),
+    )
+    for optcode, label, present in extras:
+        if present:
+            out.append((f"{label} weglaten", ("extras", optcode), EXTRA_KEYS[optcode]))
+
+    for part, key, pct_key, part_label in _MATERIAL_PARTS:
+        if int(a.get(pct_key) or 0) <= 0:
+            continue
+        cur = (a.get(key) or "beton").strip().lower()
+        for choice, mat in _MAT_BY_CHOICE_FIXED.items():
+            if _material_rank(mat) < _material_rank(cur):
+                label = f"{part_label}: {_nice_mat(mat)} i.p.v. {_nice_mat(cur)}"
+                out.append((label, ("material", (part, choice)), MATERIAL_LINKED_KEYS))
+
+    if has_vlonder(a):
+        cur = (a.get("vlonder_type") or "composiet").strip().lower()
+        for opt in ("hardhout", "zachthout"):
+            if _vlonder_rank(opt) > _vlonder_rank(cur):
+                label = f"Vlonder: {_nice_vlonder(opt)} i.p.v. {_nice_vlonder(cur)}"
+                out.append((label, ("vlonder", opt), VLONDER_KEYS))
+        out.append(("Vlonder verwijderen", ("vlonder", "remove"), VLONDER_KEYS))
+
+    if a.get("erfafscheiding_items"):
+        stt = erf_stats(a)
+        if stt["haag_m"] > 0:
+            out.append((f"Haag verwijderen (nu: {stt['haag_m']:.1f} m)", ("erf", "rm_haag"), ERF_KEYS))
+        if stt["betonschutting_m"] > 0:
+            out.append((f"Betonschutting verwijderen (nu: {stt['betonschutting_m']:.1f} m)", ("erf", "rm_beton"), ERF_KEYS))
+        if stt["design_schutting_m"] > 0:
+            out.append((f"Design schutting verwijderen (nu: {stt['design_schutting_m']:.1f} m)", ("erf", "rm_design"), ERF_KEYS))
+        if stt["poortdeur_count"] > 0:
+            out.append((f"Poortdeur(en) laten vervallen (nu: {stt['poortdeur_count']} st)", ("erf", "rm_poorten"), ERF_KEYS))
+
+    return out
+
+
+def ranked_single_savings(ans: dict, base_costs: dict) -> List[Tuple[str, SavingAction, Tuple[int, int]]]:
+    """
+    Elke losse bespaaractie in één keer doorrekenen en sorteren op besparing (max, dan min).
+    Preview = precies wat de apply-functie zou doorvoeren; besparing zoals saving_text_from_delta
+    (delta op de gekoppelde posten, alleen als het goedkoper uitpakt).
+    """
+    a = dict(ans or {})
+    ranked: List[Tuple[str, SavingAction, Tuple[int, int]]] = []
+
+    for label, action, keys in _single_saving_candidates(a):
+        preview, _expl = apply_saving_action(dict(a), action)
+        preview_costs = estimate_tuinaanleg_costs(preview)
+        bmin, bmax = _sum_breakdown_range_allow_zero(base_costs, keys=keys)
+        pmin, pmax = _sum_breakdown_range_allow_zero(preview_costs, keys=keys)
+        if bmax - pmax <= 0:
+            continue
+        ranked.append((label, action, (max(0, bmin - pmin), bmax - pmax)))
+
+    ranked.sort(key=lambda r: (r[2][1], r[2][0]), reverse=True)
+    return ranked
+
+
+@timed
+def all_savings_menu_text(ans: dict, base_costs: dict) -> Tuple[str, Dict[str, SavingAction]]:
+    ranked = ranked_single_savings(ans, base_costs)
+    if not ranked:
+        return (
+            "Ik zie op basis van uw invoer geen losse aanpassing die duidelijk goedkoper uitpakt.\n"
+            "Kies gerust een andere bespaaroptie.",
+            {}
+        )
+
+    mapping: Dict[str, SavingAction] = {}
+    lines = ["Alle bespaaropties op een rij (grootste besparing eerst):"]
+    for i, (label, action, (save_min, save_max)) in enumerate(ranked, start=1):
+        digit = str(i)
+        mapping[digit] = action
+        lines.append(f"{digit}) {label} (besparing: −{_eur(save_min)} tot −{_eur(save_max)})")
+
+    lines.append("")
+    lines.append("Reageer met het nummer om die besparing direct door te voeren. (of typ 'nee' om terug te gaan)")
+    return "\n".join(lines), mapping
+
+
+# =====================
+# (7) Bespaarmandje: meerdere acties verzamelen, in één herberekening doorvoeren
+# =====================
+BASKET_APPLY_WORDS = {"ok", "oké", "klaar", "doorvoeren", "toepassen", "akkoord"}
+BASKET_CLEAR_WORDS = {"leeg", "leegmaken", "wissen"}
+
+
+def basket_slot(action: SavingAction) -> Tuple[str, ...]:
+    """
+    Acties met hetzelfde slot sluiten elkaar uit (één verhouding, één materiaal per onderdeel,
+    één vlonderkeuze); een nieuwe actie vervangt dan de oude in het mandje.
+    """
+    category, payload = action
+    if category == "material":
+        return ("material", payload[0])
+    if category in ("more_green", "vlonder"):
+        return (category,)
+    return (category, str(payload))
+
+
+def saving_action_labels(ans: dict) -> Dict[SavingAction, str]:
+    return {action: label for label, action, _keys in _single_saving_candidates(dict(ans or {}))}
+
+
+@timed
+def basket_menu_text(ans: dict, base_costs: dict) -> Tuple[str, Dict[str, SavingAction]]:
+    ranked = ranked_single_savings(ans, base_costs)
+    if not ranked:
+        return (
+            "Ik zie op basis van uw invoer geen aanpassingen die duidelijk goedkoper uitpakken.\n"
+            "Kies gerust een andere bespaaroptie.",
+            {}
+        )
+
+    mapping: Dict[str, SavingAction] = {}
+    lines = [
+        "🧺 Bespaarmandje: kies één of meer opties, ik reken ze samen voor u door.",
+        "(besparing per optie los bekeken)",
+    ]
+    for i, (label, action, (save_min, save_max)) in enumerate(ranked, start=1):
+        digit = str(i)
+        mapping[digit] = action
+        lines.append(f"{digit}) {label} (besparing: −{_eur(save_min)} tot −{_eur(save_max)})")
+
+    lines.append("")
+    lines.append("Reageer met de nummers (bijv. 2,5). Typ 'ok' om het mandje in één keer door te voeren, "
+                 "'leeg' om opnieuw te beginnen of 'nee' om terug te gaan.")
+    return "\n".join(lines), mapping
+
+
+@timed
+def apply_saving_actions(answers: dict, actions: List[SavingAction]) -> Tuple[dict, str]:
+    """Alle acties achter elkaar via de bestaande apply-functies; één uitleg voor het geheel."""
+    a = dict(answers or {})
+    done: List[str] = []
+    prefix = "✅ Doorgevoerde kostenbesparing:"
+    for action in actions:
+        a, expl = apply_saving_action(a, action)
+        if expl.startswith(prefix):
+            done.append(expl[len(prefix):].strip().rstrip("."))
+    return a, _explain_saving("; ".join(done))
+
+
+def basket_summary_text(labels: List[str], base_costs: dict, preview_costs: Optional[dict]) -> str:
+    if not labels:
+        return "🧺 Uw mandje is leeg. Reageer met de nummers van de opties die u wilt combineren."
+
+    lines = ["🧺 In uw mandje:"]
+    lines.extend(f"- {label}" for label in labels)
+
+    base = _total_range(base_costs or {})
+    new = _total_range(preview_costs or {}) if preview_costs else None
+    if base and new:
+        lines.append("")
+        save_min, save_max = max(0, base[0] - new[0]), max(0, base[1] - new[1])
+        lines.append(f"Samen: besparing −{_eur(save_min)} tot −{_eur(save_max)}")
+        lines.append(f"Nieuwe indicatie: {_eur(new[0])} – {_eur(new[1])}")
+
+    lines.append("")
+    lines.append("Nog een nummer toevoegen (nogmaals kiezen = eruit halen), 'ok' om door te voeren, "
+                 "'leeg' om opnieuw te beginnen of 'nee' om terug te gaan.")
+    return "\n".join(lines)
+
+
+# =====================
+# (8) Varianten: overzicht en regel-voor-regel vergelijken
+# =====================
+VARIANT_UNDO_WORDS = {"ongedaan", "ongedaan maken", "undo", "vorige"}
+VARIANT_REDO_WORDS = {"opnieuw", "redo", "herstel"}
+VARIANT_LIST_WORDS = {"varianten", "variant"}
+
+
+def variants_hint_text(count: int, can_undo: bool, can_redo: bool) -> str:
+    parts = []
+    if can_undo:
+        parts.append("'ongedaan'")
+    if can_redo:
+        parts.append("'opnieuw'")
+    parts.append("'varianten'")
+    parts.append("'vergelijk 1 2'")
+    return f"({count} varianten bewaard — typ " + ", ".join(parts[:-1]) + " of " + parts[-1] + ")"
+
+
+def variants_overview_text(rows: List[Tuple[int, Optional[int], str, Tuple[int, int], bool]]) -> str:
+    """rows: (nummer, nummer van de vorige variant of None, omschrijving, totaal (min, max), huidig)."""
+    lines = ["🗂️ Uw varianten:"]
+    for number, parent, description, (lo, hi), current in rows:
+        origin = f" (op basis van {parent})" if parent is not None else ""
+        marker = "  ← huidige" if current else ""
+        lines.append(f"{number}) {description}{origin}: {_eur(lo)} – {_eur(hi)}{marker}")
+    lines.append("")
+    lines.append("Typ 'variant 2' om terug te gaan naar een variant, of 'vergelijk 1 3' om twee varianten "
+                 "regel voor regel te vergelijken.")
+    return "\n".join(lines)
+
+
+def _breakdown_ranges(costs: dict) -> Dict[Tuple[str, int], Tuple[str, Tuple[int, int]]]:
+    """
+    Per regel: sleutel (label, hoeveelste keer dit label). Niet de prijs-key: oprit, paden en terras delen
+    bijv. `beton_gebakken_straatwerk_per_m2`, en meerdere haagregels één key; die zouden elkaar overschrijven.
+    """
+    out: Dict[Tuple[str, int], Tuple[str, Tuple[int, int]]] = {}
+    seen: Dict[str, int] = {}
+    for item in (costs or {}).get("breakdown") or []:
+        label = item.get("label", "")
+        n = seen[label] = seen.get(label, -1) + 1
+        rng = item.get("range_eur") or (0, 0)
+        out[(label, n)] = (label, (int(rng[0]), int(rng[1])))
+    return out
+
+
+def _signed_eur(d: int) -> str:
+    return ("+" if d >= 0 else "−") + _eur(abs(d))
+
+
+def variant_compare_text(name_a: str, costs_a: dict, name_b: str, costs_b: dict) -> str:
+    """Alleen de posten die verschillen, in de volgorde van de offertes; het totaal altijd."""
+    a = _breakdown_ranges(costs_a)
+    b = _breakdown_ranges(costs_b)
+    keys = list(a) + [k for k in b if k not in a]
+
+    lines = [f"🔍 {name_a} ↔ {name_b}:"]
+    same = 0
+    for key in keys:
+        label_a, ra = a.get(key, ("", None))
+        label_b, rb = b.get(key, ("", None))
+        if ra == rb:
+            same += 1
+            continue
+        label = label_a or label_b
+        if ra is None:
+            lines.append(f"- {label}: — → {_eur(rb[0])} – {_eur(rb[1])} (nieuw)")
+        elif rb is None:
+            lines.append(f"- {label}: {_eur(ra[0])} – {_eur(ra[1])} → — (vervalt)")
+        else:
+            lines.append(f"- {label}: {_eur(ra[0])} – {_eur(ra[1])} → {_eur(rb[0])} – {_eur(rb[1])}")
+    if len(lines) == 1:
+        lines.append("- Geen verschillen per post.")
+    if same:
+        lines.append(f"({same} posten gelijk)")
+
+    ta = _total_range(costs_a or {})
+    tb = _total_range(costs_b or {})
+    if ta and tb:
+        lines.append("")
+        lines.append(f"Totaal: {_eur(ta[0])} – {_eur(ta[1])} → {_eur(tb[0])} – {_eur(tb[1])}")
+        d_lo, d_hi = tb[0] - ta[0], tb[1] - ta[1]
+        if d_lo or d_hi:
+            lines.append(f"Verschil: {_signed_eur(d_lo)} tot {_signed_eur(d_hi)}")
+    return "\n".join(lines)
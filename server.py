@@ -0,0 +1,510 @@
+# server.py
+from __future__ import annotations
+
+import argparse
+import asyncio
+import os
+import secrets
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from aiohttp import WSMsgType, web
+
+from pricing import estimate_tuinaanleg_costs, format_tuinaanleg_costs_sections
+from telemetry import INTAKE_TELEMETRY, configure_from_env
+from budget import ENGINE_BUDGET, configure_from_env as configure_budget_from_env
+from hotpath import HOTPATH, configure_from_env as configure_hotpath_from_env
+from eventlog import EVENT_LOG, configure_from_env as configure_eventlog_from_env, session_hash
+from conversation import (
+    INTAKE_INTRO_TEXT,
+    first_question_text,
+    ConversationState,
+    Message,
+    initial_state,
+    handle_turn_metered,
+    record_abandoned,
+    warm_profile_quotes,
+)
+
+
+# =====================
+# Config
+# =====================
+SESSION_TTL_S = 30 * 60
+MAX_SESSIONS = 50_000
+MAX_INPUT_CHARS = 2_000
+MAX_QUOTE_BATCH = 1_000
+
+# Achter een reverse proxy is request.remote het adres van de proxy; dan het clientadres uit
+# X-Forwarded-For gebruiken voor het rekenbudget per client (alleen aanzetten als de proxy die header zet).
+# Elke proxy voegt rechts een adres toe; links staat wat de client zelf meestuurde (vervalsbaar).
+# Daarom tellen we TRUSTED_PROXY_HOPS (aantal eigen proxies, default 1) adressen vanaf rechts.
+TRUST_X_FORWARDED_FOR = os.getenv("TRUST_X_FORWARDED_FOR", "").strip() in {"1", "true", "True", "yes", "YES"}
+TRUSTED_PROXY_HOPS = max(1, int(os.getenv("TRUSTED_PROXY_HOPS", "") or 1))
+
+# WebSocket: per verbinding een begrensde zend-queue. Is die vol (trage client),
+# dan lezen we geen nieuwe invoer meer; blijft hij te lang vol, dan sluiten we.
+WS_SEND_QUEUE_MAX = 32
+WS_SLOW_CLIENT_TIMEOUT_S = 10.0
+WS_WRITER_LIMIT = 64 * 1024
+
+# Een turn kost ~0,1 ms (flow + savings menu's). Dat draait direct op de event loop;
+# een thread/process-hop zou duurder zijn dan het werk zelf.
+# Batch-prijsberekeningen (/quote) gaan wél naar de process pool, en het rekenbudget naar een thread
+# zodra de store kan blokkeren (ENGINE_BUDGET_DB: SQLite wacht tot 0,5 s op de lock van een ander proces).
+
+
+# =====================
+# Sessions
+# =====================
+@dataclass
+class Session:
+    state: ConversationState
+    last_seen: float
+    client: Optional[str] = None
+
+
+class SessionStore:
+    """
+    In-memory sessies met TTL + LRU-limiet, zodat het geheugen begrensd blijft.
+    Alleen vanaf de event loop gebruiken (geen locking nodig).
+    """
+
+    def __init__(self, *, ttl_s: float = SESSION_TTL_S, max_sessions: int = MAX_SESSIONS):
+        self.ttl_s = ttl_s
+        self.max_sessions = max_sessions
+        self._sessions: "OrderedDict[str, Session]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def create(self, state: ConversationState, client: Optional[str] = None) -> str:
+        sid = secrets.token_urlsafe(16)
+        self._sessions[sid] = Session(state=state, last_seen=time.monotonic(), client=client)
+        while len(self._sessions) > self.max_sessions:
+            dropped_sid, dropped = self._sessions.popitem(last=False)
+            _end_session(dropped_sid, dropped)
+        return sid
+
+    def get(self, sid: str) -> Optional[Session]:
+        sess = self._sessions.get(sid)
+        if sess is None:
+            return None
+        now = time.monotonic()
+        if now - sess.last_seen > self.ttl_s:
+            del self._sessions[sid]
+            _end_session(sid, sess)
+            return None
+        sess.last_seen = now
+        self._sessions.move_to_end(sid)
+        return sess
+
+    def delete(self, sid: str) -> bool:
+        sess = self._sessions.pop(sid, None)
+        if sess is None:
+            return False
+        _end_session(sid, sess)
+        return True
+
+    def expire(self) -> int:
+        cutoff = time.monotonic() - self.ttl_s
+        expired = 0
+        # OrderedDict staat op volgorde van laatst gebruikt: oudste vooraan
+        while self._sessions:
+            sid, sess = next(iter(self._sessions.items()))
+            if sess.last_seen >= cutoff:
+                break
+            del self._sessions[sid]
+            _end_session(sid, sess)
+            expired += 1
+        return expired
+
+
+def _end_session(sid: str, sess: Session) -> None:
+    record_abandoned(sess.state)
+    _budget_background(ENGINE_BUDGET.forget, sid, sess.client)
+
+
+# =====================
+# Rekenbudget buiten de event loop
+# =====================
+async def _budget_call(fn, *args):
+    """Budget-aanroep met antwoord: bij een blokkerende store in een thread, anders direct (goedkoper)."""
+    if not ENGINE_BUDGET.blocking:
+        return fn(*args)
+    return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+
+def _budget_background(fn, *args) -> None:
+    """
+    Afschrijven zonder op het resultaat te wachten: de volgende allows() ziet het hooguit één beurt later.
+    Fouten vangt EngineBudget zelf af (`errors`). Buiten een event loop (tools) gewoon direct.
+    """
+    if ENGINE_BUDGET.blocking:
+        try:
+            asyncio.get_running_loop().run_in_executor(None, fn, *args)
+            return
+        except RuntimeError:
+            pass
+    fn(*args)
+
+
+async def _turn(sess: Session, sid: str, text: str) -> Tuple[Message, ...]:
+    ok = await _budget_call(ENGINE_BUDGET.allows, sid, sess.client)
+    # na de await: state lezen en schrijven zonder tussenliggende await, dus geen verloren beurt
+    sess.state, messages, cpu_ms = handle_turn_metered(sess.state, text, sid, ok)
+    _budget_background(ENGINE_BUDGET.charge, sid, sess.client, cpu_ms)
+    return messages
+
+
+def client_address(request: web.Request) -> str:
+    if TRUST_X_FORWARDED_FOR:
+        forwarded = [a.strip() for a in request.headers.get("X-Forwarded-For", "").split(",")]
+        if len(forwarded) >= TRUSTED_PROXY_HOPS and forwarded[-TRUSTED_PROXY_HOPS]:
+            return forwarded[-TRUSTED_PROXY_HOPS]
+    return request.remote or "onbekend"
+
+
+async def _check_client_budget(client: str) -> None:
+    """Adres zonder rekenbudget (scripts die steeds nieuwe sessies/batches starten): 429."""
+    retry = await _budget_call(ENGINE_BUDGET.client_retry_after_s, client)
+    if retry:
+        raise web.HTTPTooManyRequests(reason="Even geduld: te veel verzoeken vanaf dit adres",
+                                      headers={"Retry-After": str(retry)})
+
+
+# =====================
+# Serialisatie
+# =====================
+def message_to_dict(msg: Message) -> Dict[str, Any]:
+    out: Dict[str, Any] = {"kind": msg.kind, "text": msg.text}
+    if msg.costs is not None:
+        out["total_range_eur"] = msg.costs.get("total_range_eur")
+    if msg.before_costs is not None:
+        out["before_total_range_eur"] = msg.before_costs.get("total_range_eur")
+    return out
+
+
+def state_to_dict(state: ConversationState) -> Dict[str, Any]:
+    return {
+        "stage": state.stage,
+        "ended": state.ended,
+        "budget_ok": state.budget_ok,
+        "running_total_range_eur": state.running_total_range(),
+    }
+
+
+def opening_messages(state: ConversationState) -> Tuple[Message, ...]:
+    if state.flow is None:
+        return ()
+    return (Message("text", INTAKE_INTRO_TEXT), Message("text", first_question_text(state.flow)))
+
+
+def stream_frames(msg: Message) -> List[Dict[str, Any]]:
+    """
+    Een offer wordt per blok verstuurd (keuzes, totaal, posten, ...), de rest als één frame.
+    """
+    if msg.kind != "offer" or msg.costs is None:
+        return [{"type": "message", **message_to_dict(msg)}]
+
+    frames: List[Dict[str, Any]] = []
+    sections = format_tuinaanleg_costs_sections(msg.costs)
+    for i, section in enumerate(sections):
+        frame: Dict[str, Any] = {"type": "offer_section", "index": i, "count": len(sections), "text": section}
+        if i == 0:
+            frame["total_range_eur"] = msg.costs.get("total_range_eur")
+            if msg.before_costs is not None:
+                frame["before_total_range_eur"] = msg.before_costs.get("total_range_eur")
+        frames.append(frame)
+    return frames
+
+
+def _estimate_one(answers: dict) -> dict:
+    # één kapotte set ({"tuin_m2": "abc"}) geeft een foutregel, niet een 500 voor de hele batch
+    try:
+        return estimate_tuinaanleg_costs(answers)
+    except Exception as e:
+        return {"error": f"{type(e).__name__}: {e}"}
+
+
+def _estimate_batch(answer_sets: List[dict]) -> Tuple[List[dict], float]:
+    """Kosten (of {"error": ...} per set) + gebruikte CPU-tijd (ms) in de worker, voor het rekenbudget van de client."""
+    t0 = time.thread_time_ns()
+    costs = [_estimate_one(a) for a in answer_sets]
+    return costs, (time.thread_time_ns() - t0) / 1e6
+
+
+# =====================
+# Handlers
+# =====================
+STORE_KEY = web.AppKey("store", SessionStore)
+POOL_KEY = web.AppKey("pool", ProcessPoolExecutor)
+
+
+async def create_session(request: web.Request) -> web.Response:
+    store = request.app[STORE_KEY]
+    client = client_address(request)
+    await _check_client_budget(client)
+    state = initial_state(start_intake=True)
+    sid = store.create(state, client)
+    return web.json_response({
+        "session_id": sid,
+        "messages": [message_to_dict(m) for m in opening_messages(state)],
+        **state_to_dict(state),
+    })
+
+
+async def session_turn(request: web.Request) -> web.Response:
+    store = request.app[STORE_KEY]
+    sess = store.get(request.match_info["sid"])
+    if sess is None:
+        raise web.HTTPNotFound(reason="Onbekende of verlopen sessie")
+
+    try:
+        body = await request.json()
+    except ValueError:
+        raise web.HTTPBadRequest(reason="Body moet JSON zijn")
+    text = body.get("text") if isinstance(body, dict) else None
+    if not isinstance(text, str) or not text.strip():
+        raise web.HTTPBadRequest(reason="Veld 'text' ontbreekt")
+    if len(text) > MAX_INPUT_CHARS:
+        raise web.HTTPRequestEntityTooLarge(max_size=MAX_INPUT_CHARS, actual_size=len(text))
+
+    messages = await _turn(sess, request.match_info["sid"], text)
+    return web.json_response({
+        "messages": [message_to_dict(m) for m in messages],
+        **state_to_dict(sess.state),
+    })
+
+
+async def get_session(request: web.Request) -> web.Response:
+    sess = request.app[STORE_KEY].get(request.match_info["sid"])
+    if sess is None:
+        raise web.HTTPNotFound(reason="Onbekende of verlopen sessie")
+    return web.json_response(state_to_dict(sess.state))
+
+
+async def delete_session(request: web.Request) -> web.Response:
+    if not request.app[STORE_KEY].delete(request.match_info["sid"]):
+        raise web.HTTPNotFound(reason="Onbekende of verlopen sessie")
+    return web.json_response({"deleted": True})
+
+
+async def quote_batch(request: web.Request) -> web.Response:
+    """
+    Batch prijsberekening: {"answers": [ {...}, {...} ]} -> {"costs": [ {...}, ... ]}
+    Een set die niet te berekenen is geeft op zijn plek {"error": "..."}.
+    Draait in de process pool zodat de event loop vrij blijft.
+    """
+    try:
+        body = await request.json()
+    except ValueError:
+        raise web.HTTPBadRequest(reason="Body moet JSON zijn")
+    answer_sets = body.get("answers") if isinstance(body, dict) else None
+    if not isinstance(answer_sets, list) or not all(isinstance(a, dict) for a in answer_sets):
+        raise web.HTTPBadRequest(reason="Veld 'answers' moet een lijst met objecten zijn")
+    if len(answer_sets) > MAX_QUOTE_BATCH:
+        raise web.HTTPRequestEntityTooLarge(max_size=MAX_QUOTE_BATCH, actual_size=len(answer_sets))
+    client = client_address(request)
+    await _check_client_budget(client)
+
+    loop = asyncio.get_running_loop()
+    cpu_ms: Optional[float] = None
+    t0 = time.perf_counter()
+    try:
+        costs, cpu_ms = await loop.run_in_executor(request.app[POOL_KEY], _estimate_batch, answer_sets)
+    finally:
+        # ook een mislukte batch (kapotte worker) kost rekentijd; dan de wandtijd afschrijven
+        if cpu_ms is None:
+            cpu_ms = (time.perf_counter() - t0) * 1000
+        _budget_background(ENGINE_BUDGET.charge_client, client, cpu_ms)
+    return web.json_response({"costs": costs})
+
+
+class _SlowClient(Exception):
+    pass
+
+
+async def _ws_sender(ws: web.WebSocketResponse, queue: "asyncio.Queue[Optional[Dict[str, Any]]]") -> None:
+    # send_json wacht op drain zodra de write buffer boven WS_WRITER_LIMIT komt
+    while True:
+        frame = await queue.get()
+        if frame is None:
+            return
+        await ws.send_json(frame)
+
+
+async def _enqueue(queue: "asyncio.Queue[Optional[Dict[str, Any]]]", frame: Dict[str, Any]) -> None:
+    try:
+        await asyncio.wait_for(queue.put(frame), timeout=WS_SLOW_CLIENT_TIMEOUT_S)
+    except asyncio.TimeoutError:
+        raise _SlowClient()
+
+
+async def _enqueue_messages(queue, messages, state: ConversationState) -> None:
+    for msg in messages:
+        for frame in stream_frames(msg):
+            await _enqueue(queue, frame)
+    await _enqueue(queue, {"type": "turn_end", **state_to_dict(state)})
+
+
+async def websocket_chat(request: web.Request) -> web.WebSocketResponse:
+    """
+    GET /ws[?session_id=...]  — zonder session_id wordt een nieuwe sessie gestart.
+    Client stuurt {"text": "..."} (of platte tekst), server streamt per bericht een frame
+    en sluit elke beurt af met {"type": "turn_end", ...}. Ongeldige invoer of een fout in de beurt
+    geeft {"type": "error", ...} en de verbinding blijft open.
+    """
+    store = request.app[STORE_KEY]
+    client = client_address(request)
+    ws = web.WebSocketResponse(heartbeat=30.0, max_msg_size=MAX_INPUT_CHARS * 4, writer_limit=WS_WRITER_LIMIT)
+    await ws.prepare(request)
+
+    sid = request.query.get("session_id")
+    sess = store.get(sid) if sid else None
+    if sid and sess is None:
+        await ws.close(code=4404, message=b"Onbekende of verlopen sessie")
+        return ws
+
+    queue: "asyncio.Queue[Optional[Dict[str, Any]]]" = asyncio.Queue(maxsize=WS_SEND_QUEUE_MAX)
+    sender = asyncio.create_task(_ws_sender(ws, queue))
+
+    try:
+        if sess is None:
+            if await _budget_call(ENGINE_BUDGET.client_retry_after_s, client):
+                await ws.close(code=1013, message=b"Te veel verzoeken vanaf dit adres")
+                return ws
+            state = initial_state(start_intake=True)
+            sid = store.create(state, client)
+            sess = store.get(sid)
+            await _enqueue(queue, {"type": "session", "session_id": sid})
+            await _enqueue_messages(queue, opening_messages(state), state)
+
+        async for raw in ws:
+            if raw.type != WSMsgType.TEXT:
+                continue
+            text = raw.data
+            if raw.data.lstrip().startswith("{"):
+                try:
+                    text = (raw.json() or {}).get("text")
+                except ValueError:
+                    text = None
+            if not isinstance(text, str) or not text.strip() or len(text) > MAX_INPUT_CHARS:
+                await _enqueue(queue, {"type": "error", "reason": "Ongeldige invoer"})
+                continue
+            if store.get(sid) is None:
+                break
+
+            try:
+                messages = await _turn(sess, sid, text)
+            except Exception:
+                # state blijft die van vóór de beurt; de fout staat in de eventlog (handle_turn_metered)
+                request.app.logger.exception("Beurt mislukt (sessie %s)", session_hash(sid))
+                await _enqueue(queue, {"type": "error", "reason": "Er ging iets mis, probeer het opnieuw"})
+                continue
+            await _enqueue_messages(queue, messages, sess.state)
+
+        await queue.put(None)
+        await sender
+    except _SlowClient:
+        sender.cancel()
+        await ws.close(code=1013, message=b"Client te traag")
+    finally:
+        if not sender.done():
+            sender.cancel()
+
+    return ws
+
+
+def _rss_kb() -> int:
+    """Huidig RSS van dit proces (Linux: /proc); elders de piek via getrusage."""
+    try:
+        with open("/proc/self/statm", encoding="ascii") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError, IndexError):
+        try:
+            import resource
+        except ImportError:
+            return 0
+        return int(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+
+async def health(request: web.Request) -> web.Response:
+    return web.json_response({
+        "ok": True,
+        "sessions": len(request.app[STORE_KEY]),
+        "budget_errors": ENGINE_BUDGET.errors,
+        "rss_kb": _rss_kb(),
+        "event_log": EVENT_LOG.stats(),
+    })
+
+
+async def intake_telemetry(request: web.Request) -> web.Response:
+    # lopend venster sinds de laatste flush (niet resetten)
+    return web.json_response({"enabled": INTAKE_TELEMETRY.enabled, **INTAKE_TELEMETRY.snapshot()})
+
+
+async def hotpath_metrics(request: web.Request) -> web.Response:
+    # Prometheus-tekstformaat; alleen gevuld met HOTPATH_METRICS=1 (of HOTPATH_METRICS_PATH)
+    return web.Response(text=HOTPATH.prometheus_text(), headers={
+        "Content-Type": "text/plain; version=0.0.4; charset=utf-8",
+        "X-Hotpath-Enabled": "1" if HOTPATH.enabled else "0",
+    })
+
+
+# =====================
+# App
+# =====================
+async def _expire_loop(app: web.Application) -> None:
+    store = app[STORE_KEY]
+    while True:
+        await asyncio.sleep(60)
+        store.expire()
+        await _budget_call(ENGINE_BUDGET.prune)
+
+
+async def _background(app: web.Application):
+    task = asyncio.create_task(_expire_loop(app))
+    yield
+    task.cancel()
+    app[POOL_KEY].shutdown(wait=False, cancel_futures=True)
+
+
+def build_app(*, workers: int = 2, ttl_s: float = SESSION_TTL_S, max_sessions: int = MAX_SESSIONS) -> web.Application:
+    app = web.Application(client_max_size=1024 * 1024)
+    app[STORE_KEY] = SessionStore(ttl_s=ttl_s, max_sessions=max_sessions)
+    app[POOL_KEY] = ProcessPoolExecutor(max_workers=workers)
+    app.cleanup_ctx.append(_background)
+
+    app.router.add_post("/sessions", create_session)
+    app.router.add_get("/sessions/{sid}", get_session)
+    app.router.add_delete("/sessions/{sid}", delete_session)
+    app.router.add_post("/sessions/{sid}/turn", session_turn)
+    app.router.add_post("/quote", quote_batch)
+    app.router.add_get("/ws", websocket_chat)
+    app.router.add_get("/health", health)
+    app.router.add_get("/telemetry/intake", intake_telemetry)
+    app.router.add_get("/metrics", hotpath_metrics)
+    return app
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Headless HTTP/JSON chat API voor de tuinaanleg-chatbot")
+    ap.add_argument("--host", default="127.0.0.1")
+    ap.add_argument("--port", type=int, default=8080)
+    ap.add_argument("--workers", type=int, default=2, help="processen voor batch-prijsberekening (/quote)")
+    args = ap.parse_args()
+
+    configure_from_env()
+    configure_budget_from_env()
+    configure_hotpath_from_env()
+    configure_eventlog_from_env()
+    warm_profile_quotes()  # niet op de eerste klant (en diens rekenbudget) laten drukken
+    web.run_app(build_app(workers=args.workers), host=args.host, port=args.port, access_log=None)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,195 @@
+# telemetry.py
+from __future__ import annotations
+
+import atexit
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Optional
+
+
+# ============================================================
+# ✅ Intake-telemetrie per stap
+#    Wordt vanuit TuinaanlegFlow.handle gevoed. Tellers blijven in het proces
+#    en worden periodiek als één JSON-regel weggeschreven (flush), door een achtergrondthread:
+#    de beurt zelf doet nooit schijf-I/O (in server.py draait die op de event loop).
+#    Uitgeschakeld (default) kost het één attribuut-check per beurt.
+# ============================================================
+OUTCOME_OK = 0
+OUTCOME_INVALID = 1   # validatie mislukt -> error_prompt terug
+OUTCOME_REENTRY = 2   # confirm_* met "nee" -> groep opnieuw invullen
+
+FLUSH_INTERVAL_S_DEFAULT = 60.0
+MAX_PENDING_EVENTS = 4096  # writer eerder wekken om te aggregeren: begrenst de buffer
+
+
+class StepStats:
+    __slots__ = ("turns", "engine_ns", "dwell_ns", "validation_failures", "confirm_reentries", "abandoned")
+
+    def __init__(self) -> None:
+        self.turns = 0
+        self.engine_ns = 0
+        self.dwell_ns = 0
+        self.validation_failures = 0
+        self.confirm_reentries = 0
+        self.abandoned = 0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "turns": self.turns,
+            "engine_ms": round(self.engine_ns / 1e6, 3),
+            "dwell_s": round(self.dwell_ns / 1e9, 3),
+            "validation_failures": self.validation_failures,
+            "confirm_reentries": self.confirm_reentries,
+            "abandoned": self.abandoned,
+        }
+
+
+class IntakeTelemetry:
+    """
+    Aggregator per stap-key:
+    - turns / engine-tijd in handle() / bedenktijd van de klant (vraag -> antwoord)
+    - validatiefouten, confirm-"nee" herstarts, afhakers
+
+    Per beurt alleen een tuple op een deque (append is atomair, dus thread-safe zonder lock;
+    Streamlit draait sessies in threads). Optellen en wegschrijven doet de writer-thread
+    (aggregate()/flush()); lukt schrijven niet, dan telt `errors` op en gaat dat venster verloren.
+    """
+
+    def __init__(self, *, sink: Optional[Callable[[Dict[str, Any]], None]] = None,
+                 flush_interval_s: float = FLUSH_INTERVAL_S_DEFAULT) -> None:
+        self._lock = threading.Lock()
+        self._events: deque = deque()
+        self._steps: Dict[str, StepStats] = {}
+        self._completed = 0
+        self._window_start = time.time()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = False
+        self.errors = 0
+        self.enabled = False
+        self.configure(sink=sink, flush_interval_s=flush_interval_s)
+
+    def configure(self, *, sink: Optional[Callable[[Dict[str, Any]], None]],
+                  flush_interval_s: float = FLUSH_INTERVAL_S_DEFAULT) -> None:
+        self._sink = sink
+        self._interval_s = flush_interval_s
+        self._stopping = False
+        self.enabled = sink is not None
+        if self.enabled and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="intake-telemetry", daemon=True)
+            self._thread.start()
+
+    def _stats(self, key: str) -> StepStats:
+        s = self._steps.get(key)
+        if s is None:
+            s = self._steps[key] = StepStats()
+        return s
+
+    def record_turn(self, key: str, engine_ns: int, dwell_ns: int, outcome: int, done: bool) -> None:
+        events = self._events
+        events.append((key, engine_ns, dwell_ns, outcome, done))
+        if len(events) >= MAX_PENDING_EVENTS:
+            self._wake.set()
+
+    def aggregate(self) -> None:
+        """Verwerkt de gebufferde beurten in de tellers."""
+        events = self._events
+        with self._lock:
+            while events:
+                key, engine_ns, dwell_ns, outcome, done = events.popleft()
+                s = self._stats(key)
+                s.turns += 1
+                s.engine_ns += engine_ns
+                s.dwell_ns += dwell_ns
+                if outcome == OUTCOME_INVALID:
+                    s.validation_failures += 1
+                elif outcome == OUTCOME_REENTRY:
+                    s.confirm_reentries += 1
+                if done:
+                    self._completed += 1
+
+    def record_abandoned(self, key: str) -> None:
+        if not self.enabled:
+            return
+        with self._lock:
+            self._stats(key).abandoned += 1
+
+    def snapshot(self, *, reset: bool = False) -> Dict[str, Any]:
+        self.aggregate()
+        with self._lock:
+            steps, completed, start = self._steps, self._completed, self._window_start
+            if reset:
+                self._steps, self._completed, self._window_start = {}, 0, time.time()
+            else:
+                steps = dict(steps)
+        return {
+            "window_start": round(start, 3),
+            "window_end": round(time.time(), 3),
+            "pid": os.getpid(),
+            "completed": completed,
+            "steps": {k: v.to_dict() for k, v in steps.items()},
+        }
+
+    def flush(self) -> None:
+        """Venster wegschrijven (writer-thread; bij afsluiten ook vanuit atexit)."""
+        if self._sink is None:
+            return
+        snap = self.snapshot(reset=True)
+        if snap["steps"] or snap["completed"]:
+            try:
+                self._sink(snap)
+            except (OSError, TypeError, ValueError):
+                self.errors += 1  # telemetrie mag de chat nooit breken
+
+    def _run(self) -> None:
+        next_flush = time.monotonic() + self._interval_s
+        while not self._stopping:
+            self._wake.wait(max(0.0, next_flush - time.monotonic()))
+            self._wake.clear()
+            if time.monotonic() >= next_flush:
+                next_flush = time.monotonic() + self._interval_s
+                self.flush()
+            else:
+                self.aggregate()  # gewekt door een volle buffer
+
+    def close(self) -> None:
+        self._stopping = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+        self.flush()
+
+
+class JsonlSink:
+    """Eén JSON-regel per flush, append-only (meerdere processen mogen naar hetzelfde bestand)."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+
+    def __call__(self, snap: Dict[str, Any]) -> None:
+        line = json.dumps(snap, ensure_ascii=False) + "\n"
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(line)
+
+
+INTAKE_TELEMETRY = IntakeTelemetry()
+
+
+def configure_from_env() -> bool:
+    """
+    INTAKE_TELEMETRY_PATH=/pad/intake.jsonl zet de telemetrie aan,
+    INTAKE_TELEMETRY_FLUSH_S bepaalt het flush-interval (default 60 s).
+    """
+    path = os.getenv("INTAKE_TELEMETRY_PATH", "").strip()
+    if not path:
+        return False
+    if INTAKE_TELEMETRY.enabled:
+        return True
+    interval = float(os.getenv("INTAKE_TELEMETRY_FLUSH_S", "") or FLUSH_INTERVAL_S_DEFAULT)
+    INTAKE_TELEMETRY.configure(sink=JsonlSink(path), flush_interval_s=interval)
+    atexit.register(INTAKE_TELEMETRY.close)
+    return True
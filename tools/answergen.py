@@ -0,0 +1,311 @@
+# tools/answergen.py
+"""
+Willekeurige (maar reproduceerbare) antwoordsets voor tests, benchmarks en equivalentiechecks.
+
+Twee bronnen:
+- flow_answers():  ruwe klantinvoer door een echte TuinaanlegFlow (incl. vrije tekst via extract_answers,
+                   ongeldige invoer en 'nee' bij een bevestiging): precies wat de intake achterlaat.
+- edge_answers():  dicts die de flow zelf niet (meer) maakt maar die de prijsberekening wél moet
+                   aankunnen: 0%-onderdelen, alleen grind, oude erfafscheiding_type/-meter/poortdeur-velden,
+                   lege of ontbrekende overige_wensen, getallen als tekst, ontbrekende velden.
+answers_stream() mengt beide; features() zegt welke takken een antwoordset raakt (dekking).
+
+    python -m tools.answergen --count 5 --seed 3        # voorbeelden als JSONL
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import random
+import sys
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
+
+from conversation import new_flow
+from flow_tuinaanleg import TuinaanlegFlow
+
+INVALID_INPUTS = ("?", "weet ik niet", "abc", "-5", "1000000", "12,5,7", "😀", "ja nee", "hallo??", "5 of 6")
+
+MATERIALS = ("grind", "beton", "gebakken", "keramiek")
+ERF_TYPES = ("haag", "betonschutting", "design_schutting")
+VLONDER_TYPES = ("zachthout", "hardhout", "composiet")
+BEREGENING_SCOPES = ("gazon", "beplanting", "allebei")
+
+# Standaardverhoudingen uit de flow (code -> percentages)
+SPLIT_2 = {"70_30": (70, 30), "50_50": (50, 50), "30_70": (30, 70)}
+SPLIT_3 = {"50_30_20": (50, 30, 20), "40_30_30": (40, 30, 30), "30_30_40": (30, 30, 40), "20_30_50": (20, 30, 50)}
+
+# Stukjes vrije tekst die extract_answers herkent (eerste bericht, "ca 80 m2, half bestrating, ...")
+_FREE_TEXT_BITS = (
+    "{pct}% bestrating", "veel groen", "veel bestrating", "{pct}% gazon", "vooral planten",
+    "terras keramiek", "oprit grind", "paden en terras gebakken", "overal beton", "alles grind",
+    "met verlichting", "geen overkapping", "met veranda", "zonder voegen", "gevoegd",
+    "hardhout vlonder", "composiet vlonder", "haag", "design schutting", "betonschutting", "met beregening",
+)
+
+
+def garden(
+    m2: float,
+    bestrating_groen: Any = "50_50",
+    gazon_beplanting: Any = "50_50",
+    oprit_paden_terras: Any = "40_30_30",
+    materialen: Tuple[str, str, str] = ("beton", "beton", "beton"),
+    *,
+    voegen: bool = False,
+    overkapping: bool = False,
+    verlichting: bool = False,
+    beregening: Optional[str] = None,
+    vlonder: Optional[str] = None,
+    erf: Tuple[Tuple[str, float, Optional[bool]], ...] = (),
+) -> Dict[str, Any]:
+    """
+    Antwoorden zoals de flow ze na een volledige intake achterlaat.
+    Een verhouding is een code ('50_50') of een tuple percentages (= 'custom').
+    """
+    def split(v: Any, table: Dict[str, Tuple[int, ...]]) -> Tuple[str, Tuple[int, ...]]:
+        return (v, table[v]) if isinstance(v, str) else ("custom", tuple(v))
+
+    bg_code, (bestrating, groen) = split(bestrating_groen, SPLIT_2)
+    gb_code, (gazon, beplanting) = split(gazon_beplanting, SPLIT_2)
+    opt_code, (oprit, paden, terras) = split(oprit_paden_terras, SPLIT_3)
+
+    overige: List[str] = []
+    if erf:
+        overige.append("erfafscheiding")
+    if vlonder:
+        overige.append("vlonder")
+    if beregening:
+        overige.append("beregening")
+
+    return {
+        "tuin_m2": float(m2),
+        "verhouding_bestrating_groen": bg_code, "bestrating_pct": bestrating, "groen_pct": groen,
+        "confirm_bestrating_groen": True if bg_code == "custom" else None,
+        "verhouding_gazon_beplanting": gb_code, "gazon_pct": gazon, "beplanting_pct": beplanting,
+        "confirm_gazon_beplanting": True if gb_code == "custom" else None,
+        "verhouding_oprit_paden_terras": opt_code, "oprit_pct": oprit, "paden_pct": paden, "terras_pct": terras,
+        "confirm_oprit_paden_terras": True if opt_code == "custom" else None,
+        "materiaal_oprit": materialen[0], "materiaal_paden": materialen[1], "materiaal_terras": materialen[2],
+        "onkruidwerend_gevoegd": voegen,
+        "overkapping": overkapping,
+        "verlichting": verlichting,
+        "overige_wensen": overige,
+        "beregening_scope": beregening,
+        "vlonder_type": vlonder,
+        "erfafscheiding_items": [{"type": t, "meter": float(m), "poortdeur": pd} for t, m, pd in erf],
+    }
+
+
+# =====================
+# Via de flow
+# =====================
+def step_input(rng: random.Random, flow: TuinaanlegFlow) -> str:
+    """Geldige invoer voor de huidige intakestap (de flow valideert; een afwijzing is gewoon een extra beurt)."""
+    key = flow.current_step_key()
+    if key is None:
+        return "tuinaanleg"
+    step = flow.steps[flow.step_index]
+
+    if step.kind == "m2":
+        return str(max(5, min(3000, int(rng.lognormvariate(4.8, 0.9)))))  # mediaan ~120 m²
+    if step.kind == "choice":
+        return rng.choice(step.allowed)
+    if step.kind == "pct":
+        if key == "paden_pct":
+            oprit = int(flow.answers.get("oprit_pct") or 0)
+            return str(rng.randint(0, max(0, 100 - oprit)))
+        return str(rng.choice((0, 100, rng.randint(0, 100), rng.randint(0, 100))))
+    if step.kind == "yesno":
+        if key.startswith("confirm_"):
+            return "ja" if rng.random() < 0.9 else "nee"
+        return rng.choice(("ja", "nee"))
+    if step.kind == "menu":
+        if key == "erfafscheiding_type":
+            return rng.choice(("1", "2", "3", "1,2", "23", "1,3", "123"))
+        return rng.choice(("nee", "nee", "1", "2", "3", "1,3", "12", "2,3", "123"))
+    if step.kind == "number":
+        return str(rng.randint(1, 80))
+    return rng.choice(INVALID_INPUTS)
+
+
+def free_text(rng: random.Random) -> str:
+    """Eerste bericht met meerdere antwoorden tegelijk, zoals 'ca 80 m2, veel groen, terras keramiek'."""
+    bits = [f"ca {rng.randint(10, 800)} m2"]
+    for bit in rng.sample(_FREE_TEXT_BITS, rng.randint(1, 5)):
+        bits.append(bit.format(pct=rng.choice((30, 40, 50, 60, 70, 85))))
+    return ", ".join(bits)
+
+
+def flow_answers(rng: random.Random, *, p_invalid: float = 0.05, p_free_text: float = 0.15,
+                 max_turns: int = 80) -> Dict[str, Any]:
+    """Eén volledige intake met willekeurige keuzes; geeft flow.answers terug (incl. interne '_'-velden)."""
+    flow = new_flow()
+    if rng.random() < p_free_text:
+        flow.handle(free_text(rng))
+    turns = 0
+    while not flow.is_done() and turns < max_turns:
+        text = rng.choice(INVALID_INPUTS) if rng.random() < p_invalid else step_input(rng, flow)
+        flow.handle(text)
+        turns += 1
+    if not flow.is_done():
+        raise RuntimeError(f"intake niet afgerond na {max_turns} beurten (stap {flow.current_step_key()})")
+    return dict(flow.answers)
+
+
+# =====================
+# Randgevallen (direct als dict)
+# =====================
+def _random_split(rng: random.Random, table: Dict[str, Tuple[int, ...]], parts: int) -> Any:
+    r = rng.random()
+    if r < 0.5:
+        return rng.choice(list(table))
+    if r < 0.7:  # een onderdeel op 0% (of alles op één onderdeel)
+        out = [0] * parts
+        out[rng.randrange(parts)] = 100
+        if parts == 3 and rng.random() < 0.5:
+            a = rng.randint(0, 100)
+            out = [0, a, 100 - a]
+            rng.shuffle(out)
+        return tuple(out)
+    cuts = sorted(rng.randint(0, 100) for _ in range(parts - 1))
+    bounds = [0, *cuts, 100]
+    return tuple(bounds[i + 1] - bounds[i] for i in range(parts))
+
+
+def edge_answers(rng: random.Random) -> Dict[str, Any]:
+    """Antwoordset met randgevallen; alles wat pricing.py volgens zijn code moet accepteren."""
+    m2 = rng.choice((1, 5, 20, 80, 150, 400, 1000, 3000, rng.uniform(1, 2000)))
+    r = rng.random()
+    if r < 0.25:
+        materialen = ("grind", "grind", "grind")  # alleen grind: geen straatwerk, geen voegen/zaagwerk
+    elif r < 0.4:
+        materialen = tuple(rng.choice(("beton", "gebakken", "keramiek")) for _ in range(3))
+    else:
+        materialen = tuple(rng.choice(MATERIALS) for _ in range(3))
+
+    erf = tuple(
+        (rng.choice(ERF_TYPES), rng.choice((0, 0.5, 3, 12, 40, rng.uniform(0, 100))), rng.choice((True, False, None)))
+        for _ in range(rng.choice((0, 0, 1, 2, 3, 6, 12)))
+    )
+    a = garden(
+        m2,
+        _random_split(rng, SPLIT_2, 2),
+        _random_split(rng, SPLIT_2, 2),
+        _random_split(rng, SPLIT_3, 3),
+        materialen,  # type: ignore[arg-type]
+        voegen=rng.random() < 0.5,
+        overkapping=rng.random() < 0.3,
+        verlichting=rng.random() < 0.4,
+        beregening=rng.choice((None, None, *BEREGENING_SCOPES)),
+        vlonder=rng.choice((None, None, *VLONDER_TYPES)),
+        erf=erf,
+    )
+
+    r = rng.random()
+    if r < 0.15:
+        # oude flow: één erfafscheiding in losse velden, zonder erfafscheiding_items
+        a["erfafscheiding_items"] = []
+        a["erfafscheiding_type"] = rng.choice(ERF_TYPES)
+        a["erfafscheiding_meter"] = rng.choice((10, "12", "7,5", 0, None))
+        a["poortdeur"] = rng.choice((True, False, None))
+        if "erfafscheiding" not in a["overige_wensen"]:
+            a["overige_wensen"].append("erfafscheiding")
+    elif r < 0.25:
+        a["overige_wensen"] = []  # leeg: extra-velden die nog gevuld zijn tellen niet mee
+    elif r < 0.3:
+        a.pop("overige_wensen")
+    elif r < 0.35:
+        a["overige_wensen"] = ["Vlonder", " beregening ", "onbekend"]  # hoofdletters/spaties/onzin
+
+    if rng.random() < 0.1:
+        a["tuin_m2"] = rng.choice((str(int(m2)), f"{m2:.1f}", None, 0))  # "80" kan, "80,5" niet (flow slaat een float op)
+    if rng.random() < 0.1:
+        for key in rng.sample(sorted(a), rng.randint(1, 4)):
+            a.pop(key)
+    return a
+
+
+def answers_stream(seed: int, count: int, *, flow_share: float = 0.5) -> Iterator[Dict[str, Any]]:
+    """Reproduceerbare mix: `flow_share` via de flow, de rest randgevallen."""
+    rng = random.Random(seed)
+    for _ in range(count):
+        yield flow_answers(rng) if rng.random() < flow_share else edge_answers(rng)
+
+
+# =====================
+# Dekking
+# =====================
+def features(a: Dict[str, Any]) -> Set[str]:
+    """Welke takken van flow/prijsberekening deze antwoordset raakt (voor het dekkingsrapport)."""
+    out: Set[str] = set()
+    for key in ("verhouding_bestrating_groen", "verhouding_gazon_beplanting", "verhouding_oprit_paden_terras"):
+        if a.get(key) == "custom":
+            out.add(f"custom:{key.split('_', 1)[1]}")
+    for key in ("bestrating_pct", "groen_pct", "gazon_pct", "beplanting_pct", "oprit_pct", "paden_pct", "terras_pct"):
+        if key in a and a.get(key) in (0, "0"):
+            out.add(f"0%:{key[:-4]}")
+    mats = [str(a.get(f"materiaal_{p}") or "").lower() for p in ("oprit", "paden", "terras")]
+    if all(mats) and "grind" not in mats and all(a.get(f"{p}_pct") not in (0, "0") for p in ("oprit", "paden", "terras")):
+        out.add("alleen_straatwerk")  # drie breakdown-regels met dezelfde prijs-key
+    if mats.count("grind") == 3:
+        out.add("alleen_grind")
+    elif "grind" in mats:
+        out.add("grind_gemengd")
+    for m in mats:
+        if m:
+            out.add(f"materiaal:{m}")
+    for key in ("onkruidwerend_gevoegd", "overkapping", "verlichting"):
+        if a.get(key) is True:
+            out.add(key)
+    overige = a.get("overige_wensen")
+    if overige is None:
+        out.add("overige:ontbreekt")
+    elif not overige:
+        out.add("overige:leeg")
+    if a.get("beregening_scope"):
+        out.add(f"beregening:{a['beregening_scope']}")
+    if a.get("vlonder_type"):
+        out.add(f"vlonder:{a['vlonder_type']}")
+    items = a.get("erfafscheiding_items") or []
+    if items:
+        out.add("erf:meerdere" if len(items) > 1 else "erf:een")
+        for it in items:
+            out.add(f"erf:{it.get('type')}")
+            if it.get("poortdeur") is True:
+                out.add("erf:poortdeur")
+    if a.get("erfafscheiding_type") and not items and "erfafscheiding_meter" in a:
+        out.add("erf:oude_velden")
+    if isinstance(a.get("tuin_m2"), str):
+        out.add("m2:tekst")
+    if any(str(k).startswith("_") for k in a):
+        out.add("via_flow")
+    return out
+
+
+# Elke tak die een run van flink wat antwoordsets moet raken (zie tools/equivalence.py)
+REQUIRED_FEATURES: Tuple[str, ...] = (
+    "custom:bestrating_groen", "custom:gazon_beplanting", "custom:oprit_paden_terras",
+    "0%:bestrating", "0%:groen", "0%:gazon", "0%:beplanting", "0%:oprit", "0%:paden", "0%:terras",
+    "alleen_grind", "grind_gemengd", "alleen_straatwerk",
+    *(f"materiaal:{m}" for m in MATERIALS),
+    "onkruidwerend_gevoegd", "overkapping", "verlichting",
+    "overige:leeg", "overige:ontbreekt",
+    *(f"beregening:{s}" for s in BEREGENING_SCOPES),
+    *(f"vlonder:{v}" for v in VLONDER_TYPES),
+    "erf:een", "erf:meerdere", *(f"erf:{t}" for t in ERF_TYPES), "erf:poortdeur", "erf:oude_velden",
+    "m2:tekst", "via_flow",
+)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--count", type=int, default=10)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--flow-share", type=float, default=0.5, help="aandeel via de flow (rest: randgevallen)")
+    args = ap.parse_args(argv)
+    for a in answers_stream(args.seed, args.count, flow_share=args.flow_share):
+        print(json.dumps(a, ensure_ascii=False, default=repr))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,279 @@
+# tools/bench.py
+"""
+Microbenchmarks van de engine op vaste, representatieve antwoordsets.
+
+    python -m tools.bench                              # alles, tabel
+    python -m tools.bench --out bench_HEAD.json        # JSON wegschrijven
+    python -m tools.bench --compare bench_oud.json     # vergelijken met een eerdere commit
+    python -m tools.bench --filter estimate --min-time 0.5
+
+Een oudere commit meten: `git worktree add /tmp/oud <commit>` en daar
+`python -m tools.bench --out /tmp/bench_oud.json` draaien; daarna hier met --compare vergelijken.
+
+Gemeten per benchmark (functie × antwoordset):
+- ops_s:          aanroepen per seconde (over de hele meetperiode)
+- p50_us/p99_us:  latency per aanroep
+- alloc_kb:       piek aan gealloceerd geheugen tijdens één aanroep (tracemalloc, deterministisch)
+- alloc_blocks:   netto blijvende geheugenblokken per aanroep (groeit dit, dan lekt of cachet er iets)
+Python heeft geen publieke teller voor het áántal allocaties; piekbytes zijn het stabielste vergelijkbare getal.
+
+De @timed-wrappers (hotpath.py) blijven uit, zoals in productie zonder HOTPATH_METRICS.
+Timing op een gedeelde container schommelt ±30%: vergelijk bij voorkeur p50 én alloc_kb.
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from conversation import handle_turn, initial_state
+from pricing import estimate_tuinaanleg_costs, format_tuinaanleg_costs_for_customer, format_tuinaanleg_costs_sections
+from savings import (
+    all_savings_menu_text,
+    apply_erf_changes,
+    apply_material_change,
+    apply_remove_selected_extras,
+    apply_saving_action,
+    apply_saving_actions,
+    apply_set_ratio,
+    apply_vlonder_change,
+    basket_menu_text,
+    erf_remove_select_menu_text,
+    extras_select_menu_text,
+    has_erfafscheiding,
+    has_vlonder,
+    lower_costs_menu_text,
+    material_choice_menu_text_cheaper,
+    material_part_menu_text,
+    more_green_choice_text,
+    vlonder_choice_menu_text,
+)
+from tools.answergen import garden
+from tools.loadtest_http import SCRIPT, percentile
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Vast: wijzigen betekent dat oude JSON-resultaten niet meer vergelijkbaar zijn
+ANSWER_SETS: Dict[str, Dict[str, Any]] = {
+    "klein": garden(20, "70_30", "70_30", (0, 20, 80), ("beton", "beton", "beton")),
+    "gemiddeld": garden(80, "50_50", "70_30", "40_30_30", ("beton", "beton", "gebakken"), voegen=True,
+                         erf=(("betonschutting", 12, True),)),
+    "groot": garden(1000, "30_70", "50_50", "30_30_40", ("gebakken", "beton", "keramiek"), voegen=True,
+                     overkapping=True, verlichting=True, beregening="allebei", vlonder="composiet",
+                     erf=(("haag", 60, None), ("design_schutting", 40, True))),
+    "custom": garden(300, (35, 65), (60, 40), (25, 25, 50), ("gebakken", "gebakken", "keramiek"),
+                      beregening="gazon"),
+    "alle_extras": garden(150, "50_50", "50_50", "20_30_50", ("beton", "beton", "gebakken"), voegen=True,
+                           overkapping=True, verlichting=True, beregening="allebei", vlonder="hardhout",
+                           erf=(("haag", 10, None), ("betonschutting", 12, True), ("design_schutting", 8, False))),
+    "grind": garden(200, "50_50", "30_70", "40_30_30", ("grind", "grind", "grind"), verlichting=True),
+    "straatwerk": garden(200, "50_50", "30_70", "40_30_30", ("keramiek", "keramiek", "keramiek"), voegen=True,
+                          verlichting=True),
+    "veel_erf": garden(400, "30_70", "50_50", "40_30_30", ("beton", "beton", "beton"), vlonder="zachthout",
+                        erf=tuple((t, 5 + 3 * i, i % 2 == 0 if t != "haag" else None)
+                                  for i, t in enumerate(("haag", "betonschutting", "design_schutting") * 8))),
+}
+
+# Vaste acties voor apply_saving_actions (het mandje): meer groen + extra weg + goedkoper terras
+_BASKET = [("more_green", "30_70"), ("extras", "voegen"), ("material", ("3", "2"))]
+
+
+def _cases(filter_text: str = "") -> List[Tuple[str, Callable[[], Any]]]:
+    """(naam, functie zonder argumenten); de kosten per set worden vooraf één keer berekend."""
+    cases: List[Tuple[str, Callable[[], Any]]] = []
+
+    def add(name: str, fn: Callable[[], Any]) -> None:
+        if filter_text in name:
+            cases.append((name, fn))
+
+    for set_name, a in ANSWER_SETS.items():
+        c = estimate_tuinaanleg_costs(a)
+        add(f"estimate_tuinaanleg_costs[{set_name}]", lambda a=a: estimate_tuinaanleg_costs(a))
+
+        # menubuilders
+        add(f"lower_costs_menu_text[{set_name}]", lambda a=a: lower_costs_menu_text(a))
+        add(f"more_green_choice_text[{set_name}]", lambda a=a, c=c: more_green_choice_text(a, c))
+        add(f"extras_select_menu_text[{set_name}]", lambda a=a, c=c: extras_select_menu_text(a, c))
+        add(f"material_part_menu_text[{set_name}]", lambda a=a: material_part_menu_text(a))
+        add(f"material_choice_menu_text_cheaper[{set_name}]",
+            lambda a=a, c=c: material_choice_menu_text_cheaper(a, c, ("1", "2", "3")))
+        if has_vlonder(a):
+            add(f"vlonder_choice_menu_text[{set_name}]", lambda a=a, c=c: vlonder_choice_menu_text(a, c))
+        if has_erfafscheiding(a):
+            add(f"erf_remove_select_menu_text[{set_name}]", lambda a=a, c=c: erf_remove_select_menu_text(a, c))
+        add(f"all_savings_menu_text[{set_name}]", lambda a=a, c=c: all_savings_menu_text(a, c))
+        add(f"basket_menu_text[{set_name}]", lambda a=a, c=c: basket_menu_text(a, c))
+
+        # apply-functies
+        add(f"apply_set_ratio[{set_name}]", lambda a=a: apply_set_ratio(a, "30_70"))
+        add(f"apply_remove_selected_extras[{set_name}]",
+            lambda a=a: apply_remove_selected_extras(a, ["voegen", "overkapping", "verlichting", "beregening"]))
+        add(f"apply_material_change[{set_name}]", lambda a=a: apply_material_change(a, ("1", "2", "3"), "1"))
+        if has_vlonder(a):
+            add(f"apply_vlonder_change[{set_name}]", lambda a=a: apply_vlonder_change(a, "remove"))
+        if has_erfafscheiding(a):
+            add(f"apply_erf_changes[{set_name}]", lambda a=a: apply_erf_changes(a, ["rm_haag", "rm_poorten"]))
+        add(f"apply_saving_action[{set_name}]", lambda a=a: apply_saving_action(a, ("extras", "voegen")))
+        add(f"apply_saving_actions[{set_name}]", lambda a=a: apply_saving_actions(a, list(_BASKET)))
+
+        # formatters
+        add(f"format_tuinaanleg_costs_sections[{set_name}]", lambda c=c: format_tuinaanleg_costs_sections(c))
+        add(f"format_tuinaanleg_costs_for_customer[{set_name}]", lambda c=c: format_tuinaanleg_costs_for_customer(c))
+
+    # volledig gesprek: intake + twee bespaaracties + afronden (zelfde script als de loadtest)
+    def conversation() -> None:
+        state = initial_state(start_intake=True)
+        for text in SCRIPT:
+            state, _msgs = handle_turn(state, text)
+
+    add("conversation[script]", conversation)
+    return cases
+
+
+# =====================
+# Meten
+# =====================
+def _alloc(fn: Callable[[], Any], *, calls: int = 20) -> Tuple[float, float]:
+    """(piek-KB van één aanroep, netto blijvende blokken per aanroep)."""
+    gc.collect()
+    tracemalloc.start()
+    try:
+        base, _ = tracemalloc.get_traced_memory()
+        tracemalloc.reset_peak()
+        fn()
+        _cur, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    gc.collect()
+    before = sys.getallocatedblocks()
+    for _ in range(calls):
+        fn()
+    gc.collect()
+    net = (sys.getallocatedblocks() - before) / calls
+    return (peak - base) / 1024, net
+
+
+def measure(fn: Callable[[], Any], *, min_time_s: float, min_calls: int = 20) -> Dict[str, float]:
+    for _ in range(3):
+        fn()  # opwarmen: lazy imports, lru-caches, interne strings
+
+    perf_ns = time.perf_counter_ns
+    samples: List[int] = []
+    deadline = perf_ns() + int(min_time_s * 1e9)
+    t_start = perf_ns()
+    while len(samples) < min_calls or perf_ns() < deadline:
+        t0 = perf_ns()
+        fn()
+        samples.append(perf_ns() - t0)
+    total_s = (perf_ns() - t_start) / 1e9
+
+    samples.sort()
+    alloc_kb, alloc_blocks = _alloc(fn)
+    return {
+        "calls": len(samples),
+        "ops_s": round(len(samples) / total_s, 1),
+        "p50_us": round(percentile(samples, 50) / 1e3, 2),
+        "p99_us": round(percentile(samples, 99) / 1e3, 2),
+        "mean_us": round(statistics.fmean(samples) / 1e3, 2),
+        "alloc_kb": round(alloc_kb, 2),
+        "alloc_blocks": round(alloc_blocks, 2),
+    }
+
+
+def _git_commit() -> str:
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, cwd=REPO)
+    except OSError:
+        return ""
+    dirty = subprocess.run(["git", "diff", "--quiet", "HEAD"], cwd=REPO).returncode != 0
+    return out.stdout.strip() + ("+dirty" if dirty else "")
+
+
+def run(filter_text: str = "", *, min_time_s: float = 0.2) -> Dict[str, Any]:
+    results: Dict[str, Dict[str, float]] = {}
+    for name, fn in _cases(filter_text):
+        results[name] = measure(fn, min_time_s=min_time_s)
+    return {
+        "meta": {
+            "commit": _git_commit(),
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "min_time_s": min_time_s,
+            "when": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+
+
+# =====================
+# Uitvoer
+# =====================
+def _print_table(report: Dict[str, Any]) -> None:
+    meta = report["meta"]
+    print(f"commit {meta['commit'] or '?'} | python {meta['python']} | {meta['min_time_s']} s per benchmark")
+    print(f"{'benchmark':<58} {'ops/s':>10} {'p50 µs':>9} {'p99 µs':>9} {'alloc KB':>9} {'blokken':>8}")
+    for name, r in report["results"].items():
+        print(f"{name:<58} {r['ops_s']:>10.0f} {r['p50_us']:>9.1f} {r['p99_us']:>9.1f} "
+              f"{r['alloc_kb']:>9.1f} {r['alloc_blocks']:>8.1f}")
+
+
+def compare(old: Dict[str, Any], new: Dict[str, Any], *, threshold: float, filter_text: str = "") -> int:
+    """Print de verschillen per benchmark; geeft het aantal regressies (p50 of alloc_kb > threshold slechter)."""
+    print(f"oud {old['meta'].get('commit') or '?'} -> nieuw {new['meta'].get('commit') or '?'}")
+    print(f"{'benchmark':<58} {'p50 oud':>9} {'p50 nieuw':>10} {'Δ p50':>8} {'Δ alloc':>8}")
+    regressions = 0
+    for name, r in new["results"].items():
+        o = old["results"].get(name)
+        if o is None:
+            print(f"{name:<58} {'-':>9} {r['p50_us']:>10.1f}   (nieuw)")
+            continue
+        d_p50 = r["p50_us"] / o["p50_us"] - 1 if o["p50_us"] else 0.0
+        d_alloc = r["alloc_kb"] / o["alloc_kb"] - 1 if o["alloc_kb"] else 0.0
+        worse = d_p50 > threshold or d_alloc > threshold
+        regressions += worse
+        flag = "  <- trager/meer geheugen" if worse else ""
+        print(f"{name:<58} {o['p50_us']:>9.1f} {r['p50_us']:>10.1f} {d_p50:>+8.0%} {d_alloc:>+8.0%}{flag}")
+    for name in old["results"]:
+        if filter_text in name and name not in new["results"]:
+            print(f"{name:<58}   (verdwenen)")
+    return regressions
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--filter", default="", help="alleen benchmarks waarvan de naam dit bevat")
+    ap.add_argument("--min-time", type=float, default=0.2, help="meettijd per benchmark in seconden")
+    ap.add_argument("--out", help="resultaat als JSON naar dit bestand")
+    ap.add_argument("--json", action="store_true", help="resultaat als JSON naar stdout (i.p.v. de tabel)")
+    ap.add_argument("--compare", help="eerder JSON-resultaat om mee te vergelijken")
+    ap.add_argument("--threshold", type=float, default=0.25,
+                    help="relatieve verslechtering die als regressie telt (default 0.25; timing is rumoerig)")
+    args = ap.parse_args(argv)
+
+    report = run(args.filter, min_time_s=args.min_time)
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=1)
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False))
+    elif not args.compare:
+        _print_table(report)
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            old = json.load(f)
+        return 1 if compare(old, report, threshold=args.threshold, filter_text=args.filter) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,99 @@
+# tools/bench_app_turn.py
+"""
+Meet de server-CPU per chatbeurt van app.py (Streamlit), headless via AppTest.
+
+    python -m tools.bench_app_turn
+    python -m tools.bench_app_turn --app app.py --app /tmp/app_oud.py   # vergelijken
+
+Een oudere versie vergelijken: `git show <commit>:app.py > /tmp/app_oud.py` en
+het script vanuit de repo-root draaien (zodat de imports kloppen).
+Per app: aantal scriptruns per beurt, CPU ms/beurt (process_time) en wall ms/beurt.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import statistics
+import time
+from typing import Dict, List
+
+from streamlit.testing.v1 import AppTest
+
+from tools.loadtest_http import SCRIPT
+
+# app.py start direct in de intake; zelfde script als de HTTP-loadtest
+TURNS: List[str] = SCRIPT
+
+
+_SCRIPT_RUNS = [0]
+
+
+def _install_run_counter() -> None:
+    """Telt elke scriptuitvoering (ook die door st.rerun) via de exec-hook van de ScriptRunner."""
+    from streamlit.runtime.scriptrunner import script_runner
+
+    original = script_runner.exec_func_with_error_handling
+    if getattr(original, "_counts_runs", False):
+        return
+
+    def counted(*args, **kwargs):
+        _SCRIPT_RUNS[0] += 1
+        return original(*args, **kwargs)
+
+    counted._counts_runs = True  # type: ignore[attr-defined]
+    script_runner.exec_func_with_error_handling = counted
+
+
+def _script_runs() -> int:
+    return _SCRIPT_RUNS[0]
+
+
+def bench(app_path: str, *, repeat: int) -> Dict[str, float]:
+    cpu_per_turn: List[float] = []
+    wall_per_turn: List[float] = []
+    runs_per_turn: List[float] = []
+
+    for _ in range(repeat):
+        # absoluut pad: AppTest lost relatieve paden op t.o.v. dit bestand
+        at = AppTest.from_file(os.path.abspath(app_path), default_timeout=60)
+        at.run()
+
+        runs = 0
+        cpu = 0.0
+        wall = 0.0
+        for text in TURNS:
+            before = _script_runs()
+            c0, w0 = time.process_time(), time.perf_counter()
+            at.chat_input[0].set_value(text).run()
+            cpu += time.process_time() - c0
+            wall += time.perf_counter() - w0
+            runs += _script_runs() - before
+
+        cpu_per_turn.append(cpu / len(TURNS))
+        wall_per_turn.append(wall / len(TURNS))
+        runs_per_turn.append(runs / len(TURNS))
+
+    return {
+        "runs_per_turn": statistics.median(runs_per_turn),
+        "cpu_ms_per_turn": statistics.median(cpu_per_turn) * 1000,
+        "wall_ms_per_turn": statistics.median(wall_per_turn) * 1000,
+    }
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="CPU per chatbeurt van de Streamlit-app")
+    ap.add_argument("--app", action="append", help="pad naar app-script (meerdere keren mogelijk)")
+    ap.add_argument("--repeat", type=int, default=3, help="herhalingen per app (mediaan)")
+    args = ap.parse_args()
+
+    _install_run_counter()
+    for path in args.app or ["app.py"]:
+        r = bench(path, repeat=args.repeat)
+        print(
+            f"{path}: {len(TURNS)} beurten | scriptruns/beurt {r['runs_per_turn']:.2f} | "
+            f"CPU {r['cpu_ms_per_turn']:.1f} ms/beurt | wall {r['wall_ms_per_turn']:.1f} ms/beurt"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,338 @@
+# tools/equivalence.py
+"""
+Differentiële check: geeft een alternatief rekenpad exact dezelfde kosten als de referentie?
+
+    python -m tools.equivalence                                   # alle ingebouwde paden, 20.000 sets
+    python -m tools.equivalence --path running_estimate --count 200000 --seed 7
+    python -m tools.equivalence --path mijnmodule:snelle_estimate --dump verschillen.jsonl
+
+Referentie: estimate_tuinaanleg_costs zonder cache (= compute_tuinaanleg_costs). Elke optimalisatie
+(cache, batch, incrementeel, ...) hoort hier als pad bij te komen vóór hij live gaat.
+Ingebouwde paden:
+- running_estimate:  één RunningEstimate over de hele stroom (incrementeel, secties uit de vorige set)
+- estimate_cache:    cache op (PRICE_VERSION, answers_fingerprint) zoals app.py; de stroom bevat herhaalde
+                     sets met alleen andere interne '_'-velden, én sets die net één antwoord verschillen
+- batch:             bounded_parallel_map over een process pool (main.py --batch, /quote)
+Eigen pad: `--path module:functie` met functie(answers) -> costs.
+
+Daarnaast: variant_compare_text (savings.py) over elk paar opeenvolgende offertes uit de referentie en over
+vaste regressiegevallen (alle drie de bestratingsdelen op straatwerk delen één prijs-key): elke offerteregel van
+beide kanten moet als gelijk geteld óf als wijziging genoemd worden.
+
+Vergeleken wordt met ==, dus exact (floats, volgorde van lijsten, tuple vs. list). Een exception
+telt als uitkomst: hetzelfde exceptietype in beide paden is gelijk. Ook gecontroleerd: het pad past
+de antwoorden niet aan. Exitcode 1 bij een verschil.
+"""
+from __future__ import annotations
+
+import argparse
+import collections
+import copy
+import importlib
+import json
+import random
+import re
+import sys
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from batching import bounded_parallel_map
+from pricing import PRICE_VERSION, RunningEstimate, answers_fingerprint, estimate_tuinaanleg_costs, set_estimate_cache
+from savings import variant_compare_text
+from tools.answergen import REQUIRED_FEATURES, answers_stream, features, garden
+
+CHUNK = 2_000  # sets per ronde (een batch-pad krijgt steeds een hele ronde)
+MAX_DUMP = 100
+
+Outcome = Any  # costs-dict of ("raise", exceptietype)
+PathFn = Callable[[List[Dict[str, Any]]], List[Outcome]]
+
+
+def _outcome(answers: Dict[str, Any]) -> Outcome:
+    """Op module-niveau (pickle voor de process pool)."""
+    try:
+        return estimate_tuinaanleg_costs(answers)
+    except Exception as e:
+        return ("raise", type(e).__name__)
+
+
+def _guarded(fn: Callable[[Dict[str, Any]], Any]) -> Callable[[Dict[str, Any]], Outcome]:
+    def run(answers: Dict[str, Any]) -> Outcome:
+        try:
+            return fn(answers)
+        except Exception as e:
+            return ("raise", type(e).__name__)
+    return run
+
+
+# =====================
+# Paden
+# =====================
+def _running_estimate() -> PathFn:
+    est = [RunningEstimate()]
+
+    def update(answers: Dict[str, Any]) -> Any:
+        est[0] = est[0].update(answers)
+        if est[0].costs is None:
+            # zonder m² heeft een RunningEstimate geen kosten; compute_tuinaanleg_costs geeft dan deze fout
+            return {"error": "tuin_m2 ontbreekt of is ongeldig"}
+        return est[0].costs
+
+    run = _guarded(update)
+    return lambda batch: [run(a) for a in batch]
+
+
+def _estimate_cache() -> PathFn:
+    cache: Dict[Tuple[str, str], Dict[str, Any]] = {}
+
+    def cached(answers: Dict[str, Any]) -> Dict[str, Any]:
+        key = (PRICE_VERSION, answers_fingerprint(answers))
+        hit = cache.get(key)
+        if hit is None:
+            hit = cache[key] = estimate_tuinaanleg_costs(answers)
+        return hit
+
+    run = _guarded(cached)
+    return lambda batch: [run(a) for a in batch]
+
+
+def _batch() -> PathFn:
+    return lambda batch: list(bounded_parallel_map(_outcome, batch, workers=2, chunksize=64))
+
+
+PATHS: Dict[str, Callable[[], PathFn]] = {
+    "running_estimate": _running_estimate,
+    "estimate_cache": _estimate_cache,
+    "batch": _batch,
+}
+
+
+def load_path(spec: str) -> PathFn:
+    """Naam uit PATHS of 'module:functie' (functie(answers) -> costs)."""
+    if spec in PATHS:
+        return PATHS[spec]()
+    module, sep, name = spec.partition(":")
+    if not sep:
+        raise SystemExit(f"onbekend pad {spec!r}; kies uit {', '.join(PATHS)} of geef module:functie")
+    run = _guarded(getattr(importlib.import_module(module), name))
+    return lambda batch: [run(a) for a in batch]
+
+
+# =====================
+# Invoerstroom
+# =====================
+def with_repeats(stream: Iterable[Dict[str, Any]], seed: int, *, p: float = 0.2) -> Iterator[Dict[str, Any]]:
+    """
+    Herhaalt af en toe een eerdere set: identiek, met alleen andere interne '_'-velden (moet dezelfde
+    cache-sleutel geven) of met één antwoord net anders (mag nooit een oude cache-uitkomst krijgen).
+    """
+    rng = random.Random(seed ^ 0x5EED)
+    recent: collections.deque = collections.deque(maxlen=50)
+    for a in stream:
+        yield a
+        recent.append(a)
+        if rng.random() >= p:
+            continue
+        again = copy.deepcopy(rng.choice(recent))
+        r = rng.random()
+        if r < 0.4:
+            again["_prefilled"] = {"tuin_m2": str(rng.randint(1, 999))}
+            again["_pending_extras"] = ["beregening_scope"]
+        elif r < 0.8:
+            key = rng.choice(("tuin_m2", "materiaal_terras", "verlichting", "overige_wensen", "gazon_pct"))
+            if key == "tuin_m2":
+                again[key] = float(again.get(key) or 0) + 1.0 if not isinstance(again.get(key), str) else "81"
+            elif key == "materiaal_terras":
+                again[key] = "grind" if again.get(key) != "grind" else "keramiek"
+            elif key == "verlichting":
+                again[key] = not again.get(key)
+            elif key == "overige_wensen":
+                again[key] = [] if again.get(key) else ["vlonder"]
+            else:
+                again[key] = (int(again.get(key) or 0) + 10) % 101
+        yield again
+
+
+# =====================
+# Vergelijken
+# =====================
+def first_diff(ref: Any, got: Any, path: str = "") -> Optional[str]:
+    """Eerste plek waar twee uitkomsten verschillen, als leesbaar pad (None = gelijk)."""
+    if type(ref) is not type(got):
+        return f"{path or '<root>'}: type {type(ref).__name__} != {type(got).__name__} ({ref!r} vs {got!r})"[:300]
+    if isinstance(ref, dict):
+        for k in list(ref) + [k for k in got if k not in ref]:
+            if k not in got or k not in ref:
+                return f"{path}.{k}: ontbreekt in {'pad' if k not in got else 'referentie'}"
+            d = first_diff(ref[k], got[k], f"{path}.{k}")
+            if d:
+                return d
+        return None
+    if isinstance(ref, (list, tuple)):
+        if len(ref) != len(got):
+            return f"{path}: lengte {len(ref)} != {len(got)}"
+        for i, (x, y) in enumerate(zip(ref, got)):
+            d = first_diff(x, y, f"{path}[{i}]")
+            if d:
+                return d
+        return None
+    return None if ref == got else f"{path}: {ref!r} != {got!r}"[:300]
+
+
+def compare_text_check(costs_a: Dict[str, Any], costs_b: Dict[str, Any]) -> Optional[str]:
+    """
+    variant_compare_text mag geen offerteregel kwijtraken: een label dat n keer in a en m keer in b staat
+    geeft max(n, m) regels, elk als gelijk geteld of genoemd; een label waarvan de bedragen verschillen
+    staat in de tekst. None = klopt.
+    """
+    def by_label(costs: Dict[str, Any]) -> Dict[str, List[Tuple[int, ...]]]:
+        out: Dict[str, List[Tuple[int, ...]]] = collections.defaultdict(list)
+        for item in costs.get("breakdown") or []:
+            out[item.get("label", "")].append(tuple(int(x) for x in item.get("range_eur") or (0, 0)))
+        return out
+
+    a, b = by_label(costs_a), by_label(costs_b)
+    text = variant_compare_text("A", costs_a, "B", costs_b)
+    expected = sum(max(len(a.get(k, ())), len(b.get(k, ()))) for k in set(a) | set(b))
+    same = int(m.group(1)) if (m := re.search(r"\((\d+) posten gelijk\)", text)) else 0
+    listed = sum(1 for line in text.splitlines() if line.startswith("- ") and line != "- Geen verschillen per post.")
+    if same + listed != expected:
+        return f"{same} gelijk + {listed} genoemd, {expected} regels verwacht"
+    for label in set(a) | set(b):
+        if a.get(label) != b.get(label) and f"- {label}:" not in text:
+            return f"regel {label!r} ontbreekt in de vergelijking"
+    return None
+
+
+# Vaste regressiegevallen voor compare_text_check: (omschrijving, antwoorden a, antwoorden b)
+_ALL_STRAATWERK = garden(200, materialen=("beton", "gebakken", "beton"))
+COMPARE_REGRESSIONS: Tuple[Tuple[str, Dict[str, Any], Dict[str, Any]], ...] = (
+    ("paden beton -> grind", _ALL_STRAATWERK, dict(_ALL_STRAATWERK, materiaal_paden="grind")),
+    ("terras beton -> keramiek", _ALL_STRAATWERK, dict(_ALL_STRAATWERK, materiaal_terras="keramiek")),
+    ("oprit-aandeel anders", _ALL_STRAATWERK, garden(200, oprit_paden_terras=(20, 40, 40),
+                                                       materialen=("beton", "gebakken", "beton"))),
+    ("twee hagen -> één haag", garden(200, erf=(("haag", 10, None), ("haag", 6, None))),
+     garden(200, erf=(("haag", 10, None),))),
+)
+
+
+def run(path_names: List[str], *, count: int, seed: int, flow_share: float,
+        dump: Optional[str] = None) -> Dict[str, Any]:
+    set_estimate_cache(None)  # de referentie rekent altijd echt
+    paths = {name: load_path(name) for name in path_names}
+    stats = {name: collections.Counter() for name in path_names}
+    elapsed = {name: 0.0 for name in path_names}
+    coverage: collections.Counter = collections.Counter()
+    dumped = 0
+    dump_fh = open(dump, "w", encoding="utf-8") if dump else None
+
+    compare: collections.Counter = collections.Counter()
+
+    def check_compare(name: str, costs_a: Any, costs_b: Any) -> None:
+        if not (isinstance(costs_a, dict) and isinstance(costs_b, dict)) or "error" in costs_a or "error" in costs_b:
+            return
+        compare["checked"] += 1
+        diff = compare_text_check(costs_a, costs_b)
+        if diff is not None:
+            compare["mismatch"] += 1
+            if compare["mismatch"] <= 3:
+                print(f"[compare] {name}: {diff}", file=sys.stderr)
+
+    for name, a, b in COMPARE_REGRESSIONS:
+        check_compare(name, estimate_tuinaanleg_costs(a), estimate_tuinaanleg_costs(b))
+
+    stream = with_repeats(answers_stream(seed, count, flow_share=flow_share), seed)
+    total = 0
+    prev_ref: Any = None
+    try:
+        while True:
+            batch = [a for _i, a in zip(range(CHUNK), stream)]
+            if not batch:
+                break
+            total += len(batch)
+            originals = [copy.deepcopy(a) for a in batch]
+            refs = [_outcome(copy.deepcopy(a)) for a in batch]
+            for a in batch:
+                coverage.update(features(a))
+            for ref in refs:
+                check_compare("opeenvolgende offertes", prev_ref, ref)
+                prev_ref = ref
+
+            for name, fn in paths.items():
+                inputs = [copy.deepcopy(a) for a in originals]
+                t0 = time.perf_counter()
+                got = fn(inputs)
+                elapsed[name] += time.perf_counter() - t0
+                st = stats[name]
+                for a, orig, ref, out in zip(inputs, originals, refs, got):
+                    st["checked"] += 1
+                    if isinstance(ref, tuple):
+                        st["raised"] += 1
+                    diff = first_diff(ref, out)
+                    if diff is None and a != orig:
+                        diff = "antwoorden zijn door het pad aangepast"
+                    if diff is None:
+                        continue
+                    st["mismatch"] += 1
+                    if dump_fh is not None and dumped < MAX_DUMP:
+                        dump_fh.write(json.dumps({"path": name, "diff": diff, "answers": orig},
+                                                 ensure_ascii=False, default=repr) + "\n")
+                        dumped += 1
+                    if st["mismatch"] <= 3:
+                        print(f"[{name}] verschil: {diff}", file=sys.stderr)
+    finally:
+        if dump_fh is not None:
+            dump_fh.close()
+
+    return {
+        "seed": seed,
+        "answers": total,
+        "paths": {
+            name: {
+                "checked": stats[name]["checked"],
+                "mismatches": stats[name]["mismatch"],
+                "reference_raised": stats[name]["raised"],
+                "sets_s": round(stats[name]["checked"] / elapsed[name], 1) if elapsed[name] else 0.0,
+            }
+            for name in path_names
+        },
+        "compare": {"checked": compare["checked"], "mismatches": compare["mismatch"]},
+        "coverage": dict(sorted(coverage.items())),
+        "missing_features": [f for f in REQUIRED_FEATURES if not coverage[f]],
+    }
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--path", action="append", help=f"pad (meerdere keren mogelijk); default: {', '.join(PATHS)}")
+    ap.add_argument("--count", type=int, default=20_000, help="aantal gegenereerde antwoordsets (plus herhalingen)")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--flow-share", type=float, default=0.5, help="aandeel via de echte flow (rest: randgevallen)")
+    ap.add_argument("--dump", help=f"eerste {MAX_DUMP} verschillen als JSONL (pad, verschil, antwoorden)")
+    ap.add_argument("--json", action="store_true", help="rapport als één JSON-regel")
+    args = ap.parse_args(argv)
+
+    report = run(args.path or list(PATHS), count=args.count, seed=args.seed, flow_share=args.flow_share,
+                 dump=args.dump)
+    failed = any(p["mismatches"] for p in report["paths"].values()) or bool(report["compare"]["mismatches"])
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False))
+        return 1 if failed else 0
+
+    print(f"seed {report['seed']}: {report['answers']} antwoordsets (incl. herhalingen)")
+    for name, p in report["paths"].items():
+        flag = "OK" if not p["mismatches"] else f"{p['mismatches']} VERSCHILLEN"
+        print(f"  {name:<24} {p['checked']:>8} gecontroleerd  {p['sets_s']:>9.0f} sets/s  "
+              f"(referentie faalde {p['reference_raised']}x)  {flag}")
+    c = report["compare"]
+    print(f"  {'variant_compare_text':<24} {c['checked']:>8} paren  "
+          f"{'OK' if not c['mismatches'] else str(c['mismatches']) + ' VERSCHILLEN'}")
+    if report["missing_features"]:
+        print("niet geraakt (meer --count?): " + ", ".join(report["missing_features"]))
+    else:
+        print(f"dekking: alle {len(REQUIRED_FEATURES)} takken geraakt")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,192 @@
+# tools/importtime.py
+"""
+Koude start meten: importtijd (python -X importtime) tot de eerste begroeting, met budget.
+
+    python -m tools.importtime                     # alle targets, mediaan van 5 runs
+    python -m tools.importtime --target main --top 15
+    python -m tools.importtime --runs 9 --json
+
+Per target een verse Python-subprocess (koude imports). Eerst één opwarmrun die de .pyc's
+schrijft; PYTHONDONTWRITEBYTECODE wordt voor de meting genegeerd, want zonder .pyc gaat de
+meeste tijd naar compileren (een image hoort ze mee te leveren: `python -m compileall -q .`).
+Gemeten:
+- import_ms:  som van de top-level imports van het target (zonder interpreter-startup/site)
+- wall_ms:    hele subprocess, incl. interpreter; bij `main` echt tot de begroeting ("stop" via stdin)
+- first_run_ms (alleen app): eerste scriptrun van app.py via AppTest = eerste begroeting in Streamlit
+
+Exitcode 1 als een target boven zijn budget zit, zodat regressies in CI als getal zichtbaar worden,
+of als het een module laadt die het niet hoort te laden (`forbidden`, bijv. hashlib in de engine).
+Die laatste controle is exact: de ms-budgetten moeten ruim zijn op een rumoerige container,
+een eager import van OpenSSL of multiprocessing valt daarin weg, in de modulelijst niet.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_APP_FIRST_RUN = (
+    "import time\n"
+    "from streamlit.testing.v1 import AppTest\n"
+    "at = AppTest.from_file({path!r}, default_timeout=60)\n"
+    "t0 = time.perf_counter()\n"
+    "at.run()\n"
+    "print('FIRST_RUN_MS=%.3f' % ((time.perf_counter() - t0) * 1000))\n"
+)
+
+
+@dataclass(frozen=True)
+class Target:
+    code: str                      # python -c ...
+    budget_ms: float               # op `metric`
+    metric: str = "import_ms"
+    argv: Tuple[str, ...] = ()     # i.p.v. -c: een script draaien (bijv. main.py)
+    stdin: str = ""
+    forbidden: Tuple[str, ...] = ()  # modules die bij deze start niet geladen mogen worden
+
+
+# Zware modules die de engine en de console alleen bij gebruik importeren (zie README: Koude start)
+_LAZY_MODULES = ("_hashlib", "hashlib", "sqlite3", "multiprocessing", "concurrent.futures", "aiohttp", "streamlit")
+
+
+# Budgetten ~1,5x de gemeten mediaan op een (rumoerige, trage) 1-core container (met .pyc's); bij een bewuste
+# verschuiving het budget in dezelfde commit aanpassen. Op die container schommelt de mediaan van 9 runs
+# tot ~1,5x tussen metingen, dus de budgetten vangen grove regressies; fijne komen uit `forbidden`.
+# Eerder op een snellere container: conversation ~25, main ~33, server ~210, app ~210 ms.
+TARGETS: Dict[str, Target] = {
+    "conversation": Target(
+        code="import conversation; conversation.first_question_text(conversation.new_flow())",
+        budget_ms=90,   # gemeten 51–61 ms (met budget/eventlog/hotpath, variantenboom en mandje)
+        forbidden=_LAZY_MODULES,
+    ),
+    "main": Target(code="", argv=("main.py",), stdin="stop\n", budget_ms=140,   # 76–116 ms
+                   forbidden=_LAZY_MODULES),
+    "server": Target(code="import server", budget_ms=1100,                      # 615–765 ms, vooral aiohttp
+                     forbidden=("sqlite3", "streamlit")),
+    "app": Target(                                                               # 760–970 ms eerste run
+        code=_APP_FIRST_RUN.format(path=os.path.join(REPO, "app.py")),
+        metric="first_run_ms",
+        budget_ms=1400,
+    ),
+}
+
+
+def _parse_importtime(stderr: str) -> List[Tuple[int, int, int, str]]:
+    """Regels 'import time: self | cumulative | name' -> (niveau, self_us, cum_us, naam)."""
+    out = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        parts = line[len("import time:"):].split("|")
+        if len(parts) != 3:
+            continue
+        raw_name = parts[2]
+        stripped = raw_name.lstrip(" ")
+        level = (len(raw_name) - len(stripped) - 1) // 2
+        out.append((level, int(parts[0]), int(parts[1]), stripped.strip()))
+    return out
+
+
+def _env() -> Dict[str, str]:
+    env = dict(os.environ)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    return env
+
+
+def _startup_modules() -> set:
+    """Modules die de interpreter zelf al laadt (site, encodings, ...): niet meetellen."""
+    proc = subprocess.run([sys.executable, "-X", "importtime", "-c", "pass"],
+                          capture_output=True, text=True, cwd=REPO, env=_env())
+    return {name for _lvl, _s, _c, name in _parse_importtime(proc.stderr)}
+
+
+def run_once(target: Target, startup: set) -> Dict[str, float]:
+    cmd = [sys.executable, "-X", "importtime"]
+    cmd += list(target.argv) if target.argv else ["-c", target.code]
+    t0 = time.perf_counter()
+    proc = subprocess.run(cmd, input=target.stdin, capture_output=True, text=True, cwd=REPO, env=_env())
+    wall_ms = (time.perf_counter() - t0) * 1000
+    if proc.returncode != 0:
+        raise RuntimeError(f"{' '.join(cmd)} faalde:\n{proc.stderr[-2000:]}")
+
+    rows = _parse_importtime(proc.stderr)
+    import_us = sum(cum for lvl, _s, cum, name in rows if lvl == 0 and name not in startup)
+    res: Dict[str, float] = {"wall_ms": wall_ms, "import_ms": import_us / 1000}
+    for line in proc.stdout.splitlines():
+        if line.startswith("FIRST_RUN_MS="):
+            res["first_run_ms"] = float(line.split("=", 1)[1])
+    res["_rows"] = rows  # type: ignore[assignment]
+    return res
+
+
+def measure(name: str, target: Target, *, runs: int, startup: set) -> Dict[str, object]:
+    run_once(target, startup)  # opwarmen: .pyc schrijven, OS-cache vullen
+    results = [run_once(target, startup) for _ in range(runs)]
+
+    summary: Dict[str, object] = {"target": name, "runs": runs, "metric": target.metric, "budget_ms": target.budget_ms}
+    for key in ("import_ms", "wall_ms", "first_run_ms"):
+        vals = [r[key] for r in results if key in r]
+        if vals:
+            summary[key] = round(statistics.median(vals), 2)
+
+    # grootste eigen (self) importtijd over de runs heen, mediaan per module
+    per_mod: Dict[str, List[int]] = {}
+    for r in results:
+        for _lvl, self_us, _cum, mod in r["_rows"]:  # type: ignore[index]
+            if mod not in startup:
+                per_mod.setdefault(mod, []).append(self_us)
+    summary["top_self_ms"] = sorted(
+        ((mod, round(statistics.median(v) / 1000, 2)) for mod, v in per_mod.items()),
+        key=lambda x: -x[1],
+    )
+    loaded = set(per_mod)
+    summary["forbidden_loaded"] = sorted(m for m in target.forbidden if m in loaded)
+    summary["within_budget"] = (
+        float(summary.get(target.metric, 0.0)) <= target.budget_ms  # type: ignore[arg-type]
+        and not summary["forbidden_loaded"]
+    )
+    return summary
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description="Importtijd / koude start per target, met budget")
+    ap.add_argument("--target", action="append", choices=sorted(TARGETS), help="target (meerdere keren mogelijk)")
+    ap.add_argument("--runs", type=int, default=5, help="runs per target (mediaan)")
+    ap.add_argument("--top", type=int, default=8, help="aantal modules met de meeste eigen importtijd")
+    ap.add_argument("--json", action="store_true", help="één JSON-regel per target")
+    args = ap.parse_args(argv)
+
+    startup = _startup_modules()
+    failed = 0
+    for name in args.target or list(TARGETS):
+        s = measure(name, TARGETS[name], runs=args.runs, startup=startup)
+        s["top_self_ms"] = s["top_self_ms"][: args.top]  # type: ignore[index]
+        failed += not s["within_budget"]
+        if args.json:
+            print(json.dumps(s, ensure_ascii=False))
+            continue
+        metric = s["metric"]
+        over = float(s.get(metric, 0.0)) > s["budget_ms"]  # type: ignore[arg-type]
+        flag = "OK" if s["within_budget"] else ("BOVEN BUDGET" if over else "VERBODEN MODULE")
+        extra = f" | first_run {s['first_run_ms']:.1f} ms" if "first_run_ms" in s else ""
+        print(
+            f"{name}: import {s['import_ms']:.1f} ms | wall {s['wall_ms']:.1f} ms{extra} | "
+            f"budget {metric} ≤ {s['budget_ms']:.0f} ms: {flag}"
+        )
+        if s["forbidden_loaded"]:
+            print(f"    laadt bij de start: {', '.join(s['forbidden_loaded'])} (hoort lazy te zijn)")  # type: ignore[arg-type]
+        for mod, ms in s["top_self_ms"]:  # type: ignore[union-attr]
+            print(f"    {ms:7.2f} ms  {mod}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
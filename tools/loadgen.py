@@ -0,0 +1,285 @@
+# tools/loadgen.py
+"""
+Loadgenerator: N synthetische klanten tegelijk, in-process of tegen een lokale server.
+
+    python -m tools.loadgen --customers 2000 --concurrency 200                 # engine in dit proces
+    python -m tools.loadgen --url http://127.0.0.1:8080 --customers 2000 --concurrency 200
+    python -m tools.loadgen --customers 500 --seed 7 --json
+
+Voor --url eerst de server starten, met het rekenbudget per adres op de synthetische adressen:
+    TRUST_X_FORWARDED_FOR=1 python server.py --port 8080
+(elke klant stuurt een eigen X-Forwarded-For; zonder die vlag deelt de hele test één adres en volgt er 429).
+
+Elke klant is een vooraf gegenereerd script (vast per --seed): een intake met willekeurige keuzes
+(eigen percentages, alle extra's, meerdere erfafscheidingen) en af en toe ongeldige invoer, daarna
+0–3 bespaarrondes door de menu's (met 'nee'/'terug', het mandje, varianten) en contact of afsluiten.
+De scripts worden tegen de engine zelf gegenereerd, dus beide modi spelen exact dezelfde gesprekken.
+
+Rapport: latency per beurt (p50/p90/p99/p99.9/max), beurten/s, geheugengroei per sessie (RSS) en
+daaruit een grove capaciteit: sessies per seconde per core en sessies per GB.
+- in-process: klanten lopen om beurten door één thread, net als op de event loop van server.py;
+  afgeronde sessies blijven bewaard (zoals in de SessionStore tot de TTL).
+- --url: RSS en aantal sessies komen uit GET /health van de server.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import gc
+import json
+import os
+import random
+import sys
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+
+from conversation import ConversationState, handle_turn, initial_state, menu_options, warm_profile_quotes
+from tools.answergen import INVALID_INPUTS, step_input
+from tools.loadtest_http import percentile
+
+# Kansen per beurt; bewust wat onhandiger dan een gemiddelde klant
+P_INVALID = 0.07
+P_BACK = 0.15
+P_VARIANT_COMMAND = 0.10
+MAX_TURNS = 80
+
+CONTACT_TEXT = "Jan de Vries, 3511 AB, 06-12345678, aanleg achtertuin met terras"
+
+
+# =====================
+# Synthetische klanten
+# =====================
+def _intake_input(rng: random.Random, state: ConversationState) -> str:
+    if state.flow is None:
+        return "tuinaanleg"
+    return step_input(rng, state.flow)
+
+
+def _post_offer_input(rng: random.Random, state: ConversationState, rounds_left: List[int]) -> Optional[str]:
+    """Keuze in een menu na de offerte; None = de klant is klaar."""
+    stage = state.stage
+    if stage == "end":
+        return None
+    if stage == "contact_details":
+        return CONTACT_TEXT
+
+    opts = menu_options(state)
+    if opts is not None and opts.commands and rng.random() < P_VARIANT_COMMAND:
+        return rng.choice(opts.commands)[0]
+    if stage == "menu":
+        if rounds_left[0] > 0:
+            rounds_left[0] -= 1
+            return "1"
+        return rng.choice(("2", "3", "3"))
+    if stage == "limit_followup":
+        return rng.choice(("1", "2"))
+    if opts is None or not opts.options:
+        return "nee"
+    if opts.back and rng.random() < P_BACK:
+        return rng.choice(("nee", "terug"))
+
+    values = [v for v, _label in opts.options]
+    if stage == "lc_basket" and any(v == "ok" for v, _l in opts.commands) and rng.random() < 0.5:
+        return "ok"
+    if opts.multi:
+        picked = sorted(rng.sample(values, rng.randint(1, min(3, len(values)))), key=values.index)
+        return ",".join(picked)
+    return rng.choice(values)
+
+
+def customer_script(rng: random.Random) -> List[str]:
+    """Speelt één klant af tegen de engine en geeft zijn invoer terug (zonder openingsbegroeting)."""
+    state = initial_state(start_intake=True)
+    rounds_left = [rng.choice((0, 1, 1, 2, 3))]
+    inputs: List[str] = []
+    while len(inputs) < MAX_TURNS:
+        if state.stage == "intake" or state.flow is not None and not state.flow.is_done():
+            text = _intake_input(rng, state)
+        else:
+            text = _post_offer_input(rng, state, rounds_left)
+            if text is None:
+                break
+        if rng.random() < P_INVALID:
+            text = rng.choice(INVALID_INPUTS)
+        inputs.append(text)
+        state, _msgs = handle_turn(state, text)
+    return inputs
+
+
+def make_scripts(customers: int, seed: int) -> List[List[str]]:
+    rng = random.Random(seed)
+    return [customer_script(rng) for _ in range(customers)]
+
+
+# =====================
+# Meten
+# =====================
+def rss_kb() -> int:
+    """Huidig RSS van dit proces (Linux: /proc); elders de piek via getrusage."""
+    try:
+        with open("/proc/self/statm", encoding="ascii") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError, IndexError):
+        import resource
+
+        return int(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+
+def _summary(mode: str, scripts: List[List[str]], concurrency: int, latencies: List[float], elapsed: float,
+             mem_kb: Tuple[int, int], sessions: int, errors: List[str]) -> Dict[str, Any]:
+    lat = sorted(latencies)
+    turns = len(lat)
+    growth_kb = (mem_kb[1] - mem_kb[0]) / sessions if sessions else 0.0
+    turns_per_session = turns / len(scripts) if scripts else 0.0
+    out: Dict[str, Any] = {
+        "mode": mode,
+        "customers": len(scripts),
+        "concurrency": concurrency,
+        "turns": turns,
+        "turns_per_session": round(turns_per_session, 1),
+        "elapsed_s": round(elapsed, 2),
+        "turns_s": round(turns / elapsed, 1) if elapsed else 0.0,
+        "errors": len(errors),
+        "rss_before_kb": mem_kb[0],
+        "rss_after_kb": mem_kb[1],
+        "kb_per_session": round(growth_kb, 2),
+    }
+    for p in (50, 90, 99, 99.9):
+        out[f"p{p:g}_ms"] = round(percentile(lat, p) * 1000, 3)
+    out["max_ms"] = round(lat[-1] * 1000, 3) if lat else 0.0
+    # grove capaciteit: één core, alleen engine/HTTP-werk (geen denktijd)
+    out["sessions_s"] = round(out["turns_s"] / turns_per_session, 1) if turns_per_session else 0.0
+    out["sessions_per_gb"] = int(1024 * 1024 / growth_kb) if growth_kb > 0 else None
+    out["error_samples"] = errors[:5]
+    return out
+
+
+def run_inprocess(scripts: List[List[str]], concurrency: int) -> Dict[str, Any]:
+    """
+    Om beurten: telkens de volgende klant in de rij één beurt laten doen (zoals de event loop).
+    Afgeronde sessies blijven in `done` staan, zodat RSS-groei = geheugen per bewaarde sessie.
+    """
+    warm_profile_quotes()
+    for script in scripts[:20]:  # opwarmen: lazy imports en gedeelde caches niet in de groei meetellen
+        state = initial_state(start_intake=True)
+        for text in script:
+            state, _msgs = handle_turn(state, text)
+    gc.collect()
+    rss_before = rss_kb()
+
+    pending: Deque[List[str]] = deque(scripts)
+    active: Deque[Tuple[ConversationState, List[str], int]] = deque()
+    done: List[ConversationState] = []
+    latencies: List[float] = []
+    errors: List[str] = []
+    perf = time.perf_counter
+
+    t_start = perf()
+    while pending or active:
+        while pending and len(active) < concurrency:
+            active.append((initial_state(start_intake=True), pending.popleft(), 0))
+        state, script, i = active.popleft()
+        t0 = perf()
+        try:
+            state, _msgs = handle_turn(state, script[i])
+        except Exception as e:  # een crash is een bevinding, geen reden om de test te stoppen
+            errors.append(f"{type(e).__name__}: {e} op {script[i]!r}")
+            continue
+        latencies.append(perf() - t0)
+        if i + 1 < len(script):
+            active.append((state, script, i + 1))
+        else:
+            done.append(state)
+    elapsed = perf() - t_start
+
+    gc.collect()
+    rss_after = rss_kb()
+    return _summary("inprocess", scripts, concurrency, latencies, elapsed, (rss_before, rss_after), len(done), errors)
+
+
+async def _run_http(url: str, scripts: List[List[str]], concurrency: int) -> Dict[str, Any]:
+    import aiohttp  # alleen nodig voor --url
+
+    latencies: List[float] = []
+    errors: List[str] = []
+    sem = asyncio.Semaphore(concurrency)
+    connector = aiohttp.TCPConnector(limit=concurrency)
+
+    async def health(http: "aiohttp.ClientSession") -> Dict[str, Any]:
+        async with http.get(f"{url}/health") as resp:
+            return await resp.json()
+
+    async def customer(http: "aiohttp.ClientSession", n: int, script: List[str]) -> None:
+        # eigen adres per klant: het rekenbudget per client geldt per bezoeker, niet voor de hele test
+        headers = {"X-Forwarded-For": f"10.{n >> 16 & 255}.{n >> 8 & 255}.{n & 255}"}
+        async with sem:
+            async with http.post(f"{url}/sessions", headers=headers) as resp:
+                if resp.status != 200:
+                    errors.append(f"{resp.status} bij nieuwe sessie")
+                    return
+                sid = (await resp.json())["session_id"]
+            for text in script:
+                t0 = time.perf_counter()
+                async with http.post(f"{url}/sessions/{sid}/turn", json={"text": text}, headers=headers) as resp:
+                    if resp.status != 200:
+                        errors.append(f"{resp.status} op {text!r}")
+                        return
+                    await resp.read()
+                latencies.append(time.perf_counter() - t0)
+
+    async with aiohttp.ClientSession(connector=connector) as http:
+        before = await health(http)
+        t0 = time.perf_counter()
+        await asyncio.gather(*(customer(http, n, s) for n, s in enumerate(scripts)))
+        elapsed = time.perf_counter() - t0
+        after = await health(http)
+
+    sessions = max(0, int(after.get("sessions", 0)) - int(before.get("sessions", 0)))
+    mem = (int(before.get("rss_kb", 0)), int(after.get("rss_kb", 0)))
+    return _summary("http", scripts, concurrency, latencies, elapsed, mem, sessions, errors)
+
+
+def run_http(url: str, scripts: List[List[str]], concurrency: int) -> Dict[str, Any]:
+    return asyncio.run(_run_http(url.rstrip("/"), scripts, concurrency))
+
+
+def _print_report(r: Dict[str, Any]) -> None:
+    print(f"modus: {r['mode']}  klanten: {r['customers']}  gelijktijdig: {r['concurrency']}  "
+          f"beurten: {r['turns']} ({r['turns_per_session']}/sessie)  fouten: {r['errors']}")
+    print(f"duur: {r['elapsed_s']:.2f} s  throughput: {r['turns_s']:.0f} beurten/s  ≈ {r['sessions_s']:.0f} sessies/s")
+    print("latency per beurt: " + "  ".join(
+        f"p{p:g} {r[f'p{p:g}_ms']:.2f} ms" for p in (50, 90, 99, 99.9)) + f"  max {r['max_ms']:.2f} ms")
+    per_gb = f"  ≈ {r['sessions_per_gb']:,} sessies/GB".replace(",", ".") if r["sessions_per_gb"] else ""
+    print(f"geheugen: RSS {r['rss_before_kb'] / 1024:.1f} -> {r['rss_after_kb'] / 1024:.1f} MB  "
+          f"{r['kb_per_session']:.1f} KB/sessie{per_gb}")
+    for e in r["error_samples"]:
+        print("fout:", e)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--url", help="server (bijv. http://127.0.0.1:8080); zonder: engine in dit proces")
+    ap.add_argument("--customers", type=int, default=1000)
+    ap.add_argument("--concurrency", type=int, default=100)
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--json", action="store_true", help="rapport als één JSON-regel")
+    args = ap.parse_args(argv)
+
+    t0 = time.perf_counter()
+    scripts = make_scripts(args.customers, args.seed)
+    print(f"{len(scripts)} klantscripts gegenereerd in {time.perf_counter() - t0:.1f} s", file=sys.stderr)
+
+    if args.url:
+        report = run_http(args.url, scripts, args.concurrency)
+    else:
+        report = run_inprocess(scripts, args.concurrency)
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False))
+    else:
+        _print_report(report)
+    return 1 if report["errors"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
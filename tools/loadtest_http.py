@@ -0,0 +1,88 @@
+# tools/loadtest_http.py
+"""
+Lokale loadtest voor server.py.
+
+Start eerst de server:
+    python server.py --port 8080
+En dan:
+    python -m tools.loadtest_http --url http://127.0.0.1:8080 --sessions 2000 --concurrency 500
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from typing import List
+
+import aiohttp
+
+
+# Volledige intake + twee bespaaracties + afronden
+SCRIPT: List[str] = [
+    "80", "1", "1", "1", "4", "4", "4", "ja", "ja", "ja", "123", "1", "10", "3", "1",
+    "1", "2", "1",
+    "1", "4", "1",
+    "3",
+]
+
+
+def percentile(sorted_vals: List[float], pct: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    idx = min(len(sorted_vals) - 1, max(0, int(round(pct / 100.0 * (len(sorted_vals) - 1)))))
+    return sorted_vals[idx]
+
+
+async def _one_session(http: aiohttp.ClientSession, url: str, latencies: List[float], errors: List[str]) -> None:
+    t0 = time.perf_counter()
+    async with http.post(f"{url}/sessions") as resp:
+        data = await resp.json()
+    latencies.append(time.perf_counter() - t0)
+    sid = data["session_id"]
+
+    for text in SCRIPT:
+        t0 = time.perf_counter()
+        async with http.post(f"{url}/sessions/{sid}/turn", json={"text": text}) as resp:
+            if resp.status != 200:
+                errors.append(f"{resp.status} op {text!r}")
+                return
+            await resp.read()
+        latencies.append(time.perf_counter() - t0)
+
+
+async def run(url: str, sessions: int, concurrency: int) -> None:
+    latencies: List[float] = []
+    errors: List[str] = []
+    sem = asyncio.Semaphore(concurrency)
+    connector = aiohttp.TCPConnector(limit=concurrency)
+
+    async with aiohttp.ClientSession(connector=connector) as http:
+        async def bounded() -> None:
+            async with sem:
+                await _one_session(http, url, latencies, errors)
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(bounded() for _ in range(sessions)))
+        elapsed = time.perf_counter() - t0
+
+    lat = sorted(latencies)
+    print(f"sessies: {sessions}  gelijktijdig: {concurrency}  requests: {len(lat)}  fouten: {len(errors)}")
+    print(f"duur: {elapsed:.2f} s  throughput: {len(lat) / elapsed:.0f} req/s")
+    for p in (50, 90, 99, 99.9):
+        print(f"p{p}: {percentile(lat, p) * 1000:.2f} ms")
+    print(f"max: {lat[-1] * 1000:.2f} ms" if lat else "max: -")
+    for e in errors[:5]:
+        print("fout:", e)
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--url", default="http://127.0.0.1:8080")
+    ap.add_argument("--sessions", type=int, default=1000)
+    ap.add_argument("--concurrency", type=int, default=200)
+    args = ap.parse_args()
+    asyncio.run(run(args.url.rstrip("/"), args.sessions, args.concurrency))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,335 @@
+# tools/memprofile.py
+"""
+Geheugen per sessie, gemeten met tracemalloc (bytes die na gc echt blijven staan) en RSS.
+
+    python -m tools.memprofile                         # 200 sessies per meting + piek-RSS van 1.000 sessies per front-end
+    python -m tools.memprofile --sessions 100 --top 5  # met de grootste allocatieplekken
+    python -m tools.memprofile --no-rss --json
+
+Gemeten (steeds: N objecten bewaren, gc, verschil in getraceerd geheugen / N):
+- flow:        TuinaanlegFlow midden in de intake en na een volledige intake
+- sessie:      per front-end wat er na een volledig gesprek per bezoeker blijft staan
+               console:   alleen de ConversationState (main.py)
+               server:    Session + plek in de SessionStore (server.py; overgeslagen zonder aiohttp)
+               streamlit: de st.session_state-velden van app.py, incl. chatrecords na compact()
+- kosten:      één costs-dict (verschillende antwoordsets) en de groei van een sessie per herberekening
+Gedeelde objecten (prijstabel, stappen, geïnternde teksten, Quotes die meerdere sessies delen) tellen één keer:
+dit is de marginale kost van één extra sessie. Vooraf wordt met andere gesprekken opgewarmd.
+Sessies zijn de synthetische klanten van tools/loadgen.py (zelfde --seed = zelfde gesprekken).
+
+tracemalloc maakt alles ~7x trager; 200 sessies per meting is ruim genoeg voor stabiele gemiddelden.
+
+Piek-RSS: per front-end een vers subprocess (zonder tracemalloc) dat --rss-sessions sessies afspeelt en bewaart;
+gerapporteerd: RSS na opwarmen, piek (VmHWM) en (piek - basis) / N.
+Streamlit zelf (ScriptRunner, widgetstate per sessie) zit hier niet in: dat kost per sessie een vaste
+hoeveelheid bovenop deze cijfers (zie README, bench_app_turn voor CPU).
+"""
+from __future__ import annotations
+
+import argparse
+import gc
+import json
+import os
+import random
+import secrets
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from chat_memory import assistant_record, compact, text_record, user_record
+from conversation import (
+    INTAKE_INTRO_TEXT,
+    ConversationState,
+    handle_turn,
+    initial_state,
+    lower_costs_options,
+    new_flow,
+    warm_profile_quotes,
+)
+from pricing import estimate_tuinaanleg_costs
+from profiles import profiles_hint_text
+from tools.answergen import answers_stream, step_input
+from tools.loadgen import make_scripts, rss_kb
+
+REPO = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FRONTENDS = ("console", "server", "streamlit")
+WARMUP_SEED_OFFSET = 1000  # opwarmen met andere gesprekken dan de meting
+
+
+# =====================
+# Sessies per front-end
+# =====================
+def _play(script: List[str]) -> ConversationState:
+    state = initial_state(start_intake=True)
+    for text in script:
+        state, _msgs = handle_turn(state, text)
+    return state
+
+
+def _streamlit_session(script: List[str]) -> Dict[str, Any]:
+    """Dezelfde velden en dezelfde bewerkingen als app.py (_submit + compact), zonder Streamlit."""
+    session: Dict[str, Any] = {
+        "conv": initial_state(start_intake=True),
+        "budget_key": secrets.token_urlsafe(12),
+        "messages": [text_record(
+            "assistant",
+            f"Hallo! {INTAKE_INTRO_TEXT}\n\nHoe groot is uw tuin in m²? (geef een getal)\n\n" + profiles_hint_text(),
+        )],
+        "history_shown": 12,
+        "compacted": 0,
+        "appended": 1,
+    }
+    messages = session["messages"]
+    for text in script:
+        messages.append(user_record(text))
+        session["conv"], replies = handle_turn(session["conv"], text)
+        for reply in replies:
+            messages.append(assistant_record(reply))
+        session["appended"] += 1 + len(replies)
+        session["compacted"] += compact(messages)
+    session["render_mark"] = session["appended"]
+    return session
+
+
+def _session_builder(frontend: str) -> Optional[Callable[[List[str]], Any]]:
+    if frontend == "console":
+        return _play
+    if frontend == "streamlit":
+        return _streamlit_session
+    try:
+        from server import SessionStore
+    except ImportError:
+        return None  # aiohttp niet geïnstalleerd
+    store = SessionStore(max_sessions=10 ** 9)
+
+    def build(script: List[str]) -> Any:
+        sid = store.create(_play(script), client=f"10.0.{len(store) >> 8 & 255}.{len(store) & 255}")
+        return sid  # de store houdt de sessie vast; de sleutel is onderdeel van de kosten
+    build.store = store  # type: ignore[attr-defined]
+    return build
+
+
+# =====================
+# Meten
+# =====================
+def retained(build: Callable[[int], Any], n: int, *, top: int = 0) -> Tuple[float, List[Tuple[str, int]], List[Any]]:
+    """
+    (bytes per object, grootste allocatieplekken, de objecten zelf).
+    De objecten worden teruggegeven zodat de aanroeper bepaalt wanneer ze vrijkomen.
+    """
+    gc.collect()
+    before_snap = tracemalloc.take_snapshot() if top else None
+    before, _peak = tracemalloc.get_traced_memory()
+    keep = [build(i) for i in range(n)]
+    gc.collect()
+    after, _peak = tracemalloc.get_traced_memory()
+
+    sites: List[Tuple[str, int]] = []
+    if before_snap is not None:
+        diff = tracemalloc.take_snapshot().compare_to(before_snap, "lineno")
+        for stat in diff[:top]:
+            frame = stat.traceback[0]
+            sites.append((f"{os.path.relpath(frame.filename, REPO)}:{frame.lineno}", stat.size_diff // n))
+    return (after - before) / n, sites, keep
+
+
+def _flows(scripts_rng: random.Random, n: int, *, half: bool) -> Callable[[int], Any]:
+    def build(_i: int) -> Any:
+        flow = new_flow()
+        steps = 0
+        while not flow.is_done():
+            if half and steps >= 8:
+                break
+            flow.handle(step_input(scripts_rng, flow))
+            steps += 1
+        return flow
+    return build
+
+
+def _offer_state(rng: random.Random) -> ConversationState:
+    state = initial_state(start_intake=True)
+    while state.stage == "intake":
+        state, _msgs = handle_turn(state, step_input(rng, state.flow))
+    return state
+
+
+def _recalc(state: ConversationState) -> ConversationState:
+    """Menu 1 -> overzicht -> grootste besparing: precies één herberekening."""
+    overview = next(d for d, c in lower_costs_options(state.last_answers).items() if c == "overview")
+    for text in ("1", overview, "1"):
+        state, _msgs = handle_turn(state, text)
+    return state
+
+
+def profile(sessions: int, seed: int, *, top: int = 0, recalcs: int = 3) -> Dict[str, Any]:
+    warm_profile_quotes()
+    warm = make_scripts(50, seed + WARMUP_SEED_OFFSET)
+    scripts = make_scripts(sessions, seed)
+    builders = {fe: _session_builder(fe) for fe in FRONTENDS}
+    for fe, build in builders.items():  # opwarmen: lazy imports, caches, geïnternde teksten
+        if build is not None:
+            for script in warm:
+                build(script)
+    for _ in answers_stream(seed + WARMUP_SEED_OFFSET, 50):
+        pass
+
+    tracemalloc.start()
+    out: Dict[str, Any] = {"sessions": sessions, "seed": seed, "bytes": {}, "sites": {}}
+
+    def record(name: str, build: Callable[[int], Any], n: int) -> List[Any]:
+        per, sites, keep = retained(build, n, top=top)
+        out["bytes"][name] = round(per)
+        if sites:
+            out["sites"][name] = sites
+        return keep
+
+    try:
+        rng = random.Random(seed)
+        record("flow_half_intake", _flows(rng, sessions, half=True), sessions)
+        record("flow_done", _flows(rng, sessions, half=False), sessions)
+
+        for fe, build in builders.items():
+            if build is None:
+                out["bytes"][f"session_{fe}"] = None
+                continue
+            record(f"session_{fe}", lambda i, build=build: build(scripts[i]), sessions)
+            store = getattr(build, "store", None)
+            if store is not None:
+                store._sessions.clear()  # noqa: SLF001 - alleen om het geheugen voor de volgende meting vrij te geven
+
+        answer_sets = list(answers_stream(seed, sessions))
+        record("costs_dict", lambda i: estimate_tuinaanleg_costs(answer_sets[i]), sessions)
+
+        # groei per herberekening: dezelfde sessies na 0 en na `recalcs` herberekeningen
+        rng = random.Random(seed)
+        offers = [_offer_state(rng) for _ in range(sessions)]
+        gc.collect()
+        base, _peak = tracemalloc.get_traced_memory()
+        states = offers
+        for _ in range(recalcs):
+            states = [_recalc(s) for s in states]
+        del offers
+        gc.collect()
+        after, _peak = tracemalloc.get_traced_memory()
+        # de states na de herberekeningen vervangen die bij de offerte; wat overblijft is de groei
+        out["bytes"]["per_recalc"] = round((after - base) / sessions / recalcs)
+        del states
+    finally:
+        tracemalloc.stop()
+    return out
+
+
+# =====================
+# Piek-RSS (subprocess per front-end)
+# =====================
+def _peak_rss_kb() -> int:
+    """
+    Piek-RSS van dit proces. Linux: VmHWM (ru_maxrss blijft over execve staan en zou de piek van
+    het ouderproces geven); elders ru_maxrss.
+    """
+    try:
+        with open("/proc/self/status", encoding="ascii") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1])
+    except (OSError, ValueError, IndexError):
+        pass
+    import resource
+
+    return int(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss)
+
+
+def _rss_child(frontend: str, scripts_path: str) -> Dict[str, Any]:
+    with open(scripts_path, encoding="utf-8") as f:
+        scripts = json.load(f)
+    build = _session_builder(frontend)
+    if build is None:
+        return {"frontend": frontend, "skipped": "aiohttp niet geïnstalleerd"}
+    warm_profile_quotes()
+    for script in make_scripts(20, WARMUP_SEED_OFFSET):
+        build(script)
+    gc.collect()
+    base = rss_kb()
+    keep = [build(s) for s in scripts]
+    gc.collect()
+    peak = _peak_rss_kb()
+    return {
+        "frontend": frontend,
+        "sessions": len(keep),
+        "rss_base_mb": round(base / 1024, 1),
+        "rss_peak_mb": round(peak / 1024, 1),
+        "kb_per_session": round((peak - base) / max(1, len(keep)), 1),
+    }
+
+
+def peak_rss(sessions: int, seed: int) -> List[Dict[str, Any]]:
+    scripts = make_scripts(sessions, seed)
+    with tempfile.NamedTemporaryFile("w", suffix=".json", delete=False, encoding="utf-8") as f:
+        json.dump(scripts, f)
+        path = f.name
+    try:
+        out = []
+        for fe in FRONTENDS:
+            proc = subprocess.run([sys.executable, "-m", "tools.memprofile", "--rss-child", fe, path],
+                                  capture_output=True, text=True, cwd=REPO)
+            if proc.returncode != 0:
+                raise RuntimeError(f"RSS-meting {fe} faalde:\n{proc.stderr[-2000:]}")
+            out.append(json.loads(proc.stdout.strip().splitlines()[-1]))
+        return out
+    finally:
+        os.unlink(path)
+
+
+def _print_report(report: Dict[str, Any]) -> None:
+    print(f"{report['sessions']} sessies per meting (seed {report['seed']}), bytes die blijven staan per object:")
+    labels = {
+        "flow_half_intake": "TuinaanlegFlow, halverwege de intake",
+        "flow_done": "TuinaanlegFlow, intake klaar",
+        "session_console": "sessie console (ConversationState)",
+        "session_server": "sessie server (Session in SessionStore)",
+        "session_streamlit": "sessie Streamlit (session_state + records)",
+        "costs_dict": "costs-dict",
+        "per_recalc": "groei van een sessie per herberekening",
+    }
+    for key, label in labels.items():
+        v = report["bytes"].get(key)
+        print(f"  {label:<46} {'-' if v is None else f'{v / 1024:8.1f} KB'}")
+        for site, size in report["sites"].get(key, []):
+            print(f"      {size / 1024:7.1f} KB  {site}")
+    for r in report.get("rss", []):
+        if "skipped" in r:
+            print(f"  piek-RSS {r['frontend']:<10} overgeslagen: {r['skipped']}")
+            continue
+        print(f"  piek-RSS {r['frontend']:<10} {r['sessions']} sessies: {r['rss_base_mb']:.1f} -> "
+              f"{r['rss_peak_mb']:.1f} MB ({r['kb_per_session']:.1f} KB/sessie)")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--sessions", type=int, default=200, help="objecten per tracemalloc-meting")
+    ap.add_argument("--rss-sessions", type=int, default=1000, help="sessies per front-end voor de piek-RSS")
+    ap.add_argument("--seed", type=int, default=1)
+    ap.add_argument("--top", type=int, default=0, help="grootste allocatieplekken per meting (trager)")
+    ap.add_argument("--no-rss", action="store_true", help="piek-RSS in subprocessen overslaan")
+    ap.add_argument("--json", action="store_true", help="rapport als één JSON-regel")
+    ap.add_argument("--rss-child", nargs=2, metavar=("FRONTEND", "SCRIPTS"), help=argparse.SUPPRESS)
+    args = ap.parse_args(argv)
+
+    if args.rss_child:
+        print(json.dumps(_rss_child(*args.rss_child)))
+        return 0
+
+    report = profile(args.sessions, args.seed, top=args.top)
+    if not args.no_rss:
+        report["rss"] = peak_rss(args.rss_sessions, args.seed)
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False))
+    else:
+        _print_report(report)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())